@@ -0,0 +1,218 @@
+"""
+管理API模块
+
+该模块提供仅限管理员使用的诊断接口（需要 X-Admin-Token 请求头），包括：
+1. 按需启动采样分析器，输出火焰图折叠栈或 speedscope JSON
+2. 查询事件循环延迟分布和最近的阻塞现场
+3. 启停 tracemalloc、保存命名快照并比较快照之间的分配差异
+4. 查询ADB命令超时估计所用的吞吐量和延迟
+"""
+
+import asyncio
+import logging
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.core.config import Settings
+from app.core.memory import memory_profiler
+from app.core.metrics import event_loop_lag_seconds
+from app.core.profiler import ProfilerBusyError, profile_async
+from app.core.security import require_admin
+from app.core.watchdog import watchdog
+from app.device.timeouts import command_timeouts
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/api/v1/admin",
+    tags=["Admin"],
+    dependencies=[Depends(require_admin)]
+)
+
+@router.get("/profile")
+async def run_profiler(
+    seconds: float = Query(10, gt=0, description="采样时长（秒）"),
+    interval: float = Query(0.01, ge=0.001, le=1, description="采样间隔（秒）"),
+    format: str = Query("collapsed", pattern="^(collapsed|speedscope)$", description="输出格式"),
+):
+    """
+    对所有线程（事件循环、线程池、调度器）进行采样分析
+
+    Returns:
+        collapsed: 纯文本折叠栈，每行 "线程;帧1;帧2;... 次数"
+        speedscope: speedscope 文件格式的 JSON，每个线程一个 profile
+    """
+    if seconds > Settings.PROFILER_MAX_SECONDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"采样时长不能超过 {Settings.PROFILER_MAX_SECONDS} 秒"
+        )
+    logger.info(f"开始采样分析 - 时长: {seconds}秒, 间隔: {interval}秒")
+    try:
+        profiler = await profile_async(seconds, interval)
+    except ProfilerBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    logger.info(f"采样分析完成 - 实际时长: {profiler.duration:.2f}秒, 不同调用栈: {len(profiler.samples)}")
+    if format == "speedscope":
+        return JSONResponse(profiler.to_speedscope(f"profile-{seconds:g}s"))
+    return PlainTextResponse(profiler.to_collapsed())
+
+@router.get("/loop")
+async def get_loop_stalls():
+    """
+    查询事件循环延迟分布和最近的阻塞记录
+
+    Returns:
+        dict: {
+            "code": 1,
+            "status": "success",
+            "data": {
+                "threshold": 0.5,
+                "lag": {"buckets": {"0.001": 10, ...}, "sum": 0.2, "count": 12},
+                "stalls": [{"time": ..., "blocked": ..., "duration": ..., "task": ..., "coroutine": ..., "stack": ...}]
+            }
+        }
+    """
+    return {
+        "code": 1,
+        "status": "success",
+        "data": {
+            "threshold": watchdog.threshold,
+            "lag": event_loop_lag_seconds.snapshot(),
+            "stalls": watchdog.get_stalls()
+        }
+    }
+
+@router.get("/adb/timeouts")
+async def get_adb_timeouts():
+    """
+    查询ADB命令超时估计的依据
+
+    Returns:
+        dict: {
+            "code": 1,
+            "status": "success",
+            "data": {"设备ID": {"throughput": 推送吞吐量EWMA（字节/秒）, "latency": {"shell:mkdir": 耗时分位数, ...}}}
+        }
+    """
+    return {
+        "code": 1,
+        "status": "success",
+        "data": command_timeouts.snapshot()
+    }
+
+@router.get("/memory")
+async def get_memory_status():
+    """
+    查询内存分析状态
+
+    Returns:
+        dict: {
+            "code": 1,
+            "status": "success",
+            "data": {
+                "tracing": true,
+                "traced_current": ..., "traced_peak": ..., "rss": ..., "peak_rss": ...,
+                "snapshots": [{"name": "before", "taken_at": ..., "size": ..., "count": ...}],
+                "requests": [{"name": "POST /api/v1/upload/", "peak_rss": ..., "rss_delta": ..., "allocated_blocks_delta": ..., ...}]
+            }
+        }
+    """
+    loop = asyncio.get_event_loop()
+    data = await loop.run_in_executor(None, memory_profiler.get_status)
+    return {
+        "code": 1,
+        "status": "success",
+        "data": data
+    }
+
+@router.post("/memory/tracemalloc/start")
+async def start_tracemalloc(frames: int = Query(1, ge=1, le=64, description="每次分配记录的调用栈深度")):
+    """启动 tracemalloc"""
+    memory_profiler.start(frames)
+    logger.info(f"tracemalloc 已启动 - 调用栈深度: {frames}")
+    return {
+        "code": 1,
+        "status": "success",
+        "data": {"tracing": True}
+    }
+
+@router.post("/memory/tracemalloc/stop")
+async def stop_tracemalloc():
+    """停止 tracemalloc 并丢弃所有快照"""
+    memory_profiler.stop()
+    logger.info("tracemalloc 已停止")
+    return {
+        "code": 1,
+        "status": "success",
+        "data": {"tracing": False}
+    }
+
+@router.post("/memory/snapshots/{name}")
+async def take_memory_snapshot(name: str):
+    """
+    拍摄命名快照（同名快照会被替换，最多保留 10 个）
+
+    Returns:
+        dict: {
+            "code": 1,
+            "status": "success",
+            "data": {"name": "before", "taken_at": ..., "size": ..., "count": ...}
+        }
+    """
+    loop = asyncio.get_event_loop()
+    try:
+        snapshot = await loop.run_in_executor(None, memory_profiler.take_snapshot, name)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return {
+        "code": 1,
+        "status": "success",
+        "data": snapshot
+    }
+
+@router.get("/memory/diff")
+async def diff_memory_snapshots(
+    base: str = Query(..., description="基准快照名称"),
+    target: Optional[str] = Query(None, description="目标快照名称，不指定时与当前内存比较"),
+    group_by: str = Query("lineno", pattern="^(lineno|filename)$", description="按行号或文件分组"),
+    limit: int = Query(20, ge=1, le=500),
+):
+    """
+    比较两个快照之间的分配差异，按变化量降序返回前N项
+
+    Returns:
+        dict: {
+            "code": 1,
+            "status": "success",
+            "data": {
+                "diff": [{"file": ..., "line": ..., "size": ..., "size_diff": ..., "count": ..., "count_diff": ...}]
+            }
+        }
+    """
+    loop = asyncio.get_event_loop()
+    try:
+        diff = await loop.run_in_executor(None, memory_profiler.diff, base, target, group_by, limit)
+    except KeyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=e.args[0]
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return {
+        "code": 1,
+        "status": "success",
+        "data": {
+            "diff": diff
+        }
+    }
@@ -0,0 +1,109 @@
+"""
+相册查询API模块
+
+该模块提供基于相册索引的查询接口，包括：
+1. 按设备、状态和时间范围分页查询相册
+2. 按设备和状态汇总相册数量与容量
+3. 查询单个相册的详情和文件列表
+"""
+
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from app.services.album_index import album_index
+
+router = APIRouter(
+    prefix="/api/v1/albums",
+    tags=["Albums"]
+)
+
+@router.get("/")
+async def list_albums(
+    device_name: Optional[str] = None,
+    status: Optional[str] = None,
+    since: Optional[int] = Query(None, description="起始时间戳（包含）"),
+    until: Optional[int] = Query(None, description="结束时间戳（不包含）"),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+):
+    """
+    分页查询相册，按时间倒序排列
+
+    Returns:
+        dict: {
+            "code": 1,
+            "status": "success",
+            "data": {
+                "albums": [...]
+            }
+        }
+    """
+    try:
+        albums = await album_index.list_albums(device_name, status, since, until, limit, offset)
+        return {
+            "code": 1,
+            "status": "success",
+            "data": {
+                "albums": albums
+            }
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"查询相册失败: {str(e)}"
+        )
+
+@router.get("/summary")
+async def get_album_summary():
+    """
+    按设备和状态汇总相册数量与容量
+
+    Returns:
+        dict: {
+            "code": 1,
+            "status": "success",
+            "data": {
+                "summary": [{"device_name": "deviceA", "status": "published", "albums": 3, ...}]
+            }
+        }
+    """
+    try:
+        summary = await album_index.summary()
+        return {
+            "code": 1,
+            "status": "success",
+            "data": {
+                "summary": summary
+            }
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"汇总相册失败: {str(e)}"
+        )
+
+@router.get("/{device_name}/{album}")
+async def get_album(device_name: str, album: str):
+    """
+    查询单个相册的详情和文件列表
+
+    Returns:
+        dict: {
+            "code": 1,
+            "status": "success",
+            "data": {...}
+        }
+    """
+    try:
+        result = await album_index.get_album(device_name, album)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"查询相册失败: {str(e)}"
+        )
+    if result is None:
+        raise HTTPException(status_code=404, detail="相册不存在")
+    return {
+        "code": 1,
+        "status": "success",
+        "data": result
+    }
@@ -4,10 +4,17 @@
 该模块提供设备相关的API接口，包括：
 1. 获取设备列表
 2. 设备信息查询
+3. 设备熔断状态
+4. Wi-Fi 设备连接状态
+5. 设备健康状态
 """
 
 from fastapi import APIRouter, HTTPException
 from app.core.config import Settings
+from app.device.breaker import device_breakers, CLOSED
+from app.device.supervisor import connection_supervisor, tcp_devices
+from app.device.health import device_health
+from app.device.adb import ADBException
 
 router = APIRouter(
     prefix="/api/v1/devices",
@@ -42,4 +49,100 @@ async def get_device_list():
         raise HTTPException(
             status_code=500,
             detail=f"获取设备列表失败: {str(e)}"
-        ) 
\ No newline at end of file
+        )
+
+@router.get("/breakers")
+async def get_device_breakers():
+    """
+    获取每台设备的熔断状态
+    
+    Returns:
+        dict: {
+            "code": 1,
+            "status": "success",
+            "data": {
+                "deviceA": {"state": "closed", "failures": 0, "last_error": null, "opened_at": null, "retry_in": null},
+                "deviceB": {"state": "open", "failures": 3, "last_error": "...", "opened_at": 1700000000.0, "retry_in": 8.5}
+            }
+        }
+    """
+    snapshot = device_breakers.snapshot()
+    idle = {"state": CLOSED, "failures": 0, "last_error": None, "opened_at": None, "retry_in": None}
+    data = {
+        device_name: snapshot.get(device_id, idle)
+        for device_name, device_id in Settings.DEVICE_MAPPING.items()
+    }
+    return {
+        "code": 1,
+        "status": "success",
+        "data": data
+    }
+
+@router.get("/connections")
+async def get_device_connections():
+    """
+    获取 TCP/IP（Wi-Fi ADB）设备的连接守护状态
+    
+    Returns:
+        dict: {
+            "code": 1,
+            "status": "success",
+            "data": {
+                "deviceC": {"connected": true, "keepalive_age": 12.3, "reconnect_attempts": 0, "next_attempt_in": null}
+            }
+        }
+    """
+    snapshot = connection_supervisor.snapshot()
+    data = {
+        device_name: snapshot.get(device_id)
+        for device_id, device_name in tcp_devices().items()
+    }
+    return {
+        "code": 1,
+        "status": "success",
+        "data": data
+    }
+
+@router.get("/{device_name}/health")
+async def get_device_health(device_name: str, refresh: bool = False):
+    """
+    获取设备健康状态（电量、屏幕和锁屏、存储剩余空间、前台应用、发布应用版本）
+    
+    Args:
+        device_name: 设备名称
+        refresh: 是否忽略缓存立即重新采集
+    
+    Returns:
+        dict: {
+            "code": 1,
+            "status": "success",
+            "data": {
+                "device_id": "XPL5T19A28003051",
+                "collected_at": 1700000000.0,
+                "age": 3.2,
+                "battery": {"level": 85, "status": "charging", "plugged": true, "temperature": 30.5},
+                "screen_on": false,
+                "locked": true,
+                "foreground_package": "NotificationShade",
+                "storage": {"path": "/storage/emulated/0/Pictures/", "total_bytes": 119000000000, "free_bytes": 52000000000},
+                "app": {"package": "com.xingin.xhs", "version": "8.1.0"}
+            }
+        }
+    """
+    if device_name not in Settings.DEVICE_CONFIG:
+        raise HTTPException(
+            status_code=404,
+            detail=f"设备 {device_name} 不存在"
+        )
+    try:
+        data = await device_health.get(device_name, refresh=refresh)
+    except ADBException as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"获取设备健康状态失败: {str(e)}"
+        )
+    return {
+        "code": 1,
+        "status": "success",
+        "data": data
+    }
@@ -1,38 +1,103 @@
-from fastapi import APIRouter, HTTPException, Query
+"""
+日志查询API模块
+
+该模块提供日志查询接口，从日志文件末尾反向分页读取，
+支持按时间范围、级别、记录器和设备过滤，并跨轮转的备份文件继续读取。
+有过滤条件时借助日志旁路索引直接 seek 到可能命中的位置。
+另提供基于 Server-Sent Events 的实时日志流。
+"""
+
+import asyncio
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
-import os
+from app.core.logging import LOG_FILE
+from app.services.log_reader import read_logs, LogQuery
+from app.services.log_stream import log_follower
+
+# SSE 心跳间隔（秒），防止代理因连接空闲而断开
+HEARTBEAT_INTERVAL = 15
 
 router = APIRouter(
     prefix="/api/v1/logs",
     tags=["Logs Info"]
 )
+
 @router.get("/", response_model=List[str])
 async def get_logs(
-    # page: Optional[int] = 1,  # 新增分页参数，默认第1页
-    # page_size: Optional[int] = 10,  # 默认每页10条
-    level: Optional[str] = None,
+    response: Response,
+    level: Optional[str] = Query(None, description="日志级别，多个级别用逗号分隔，如 ERROR,WARNING"),
+    logger: Optional[str] = Query(None, description="记录器名称，同时匹配其子记录器"),
+    device: Optional[str] = Query(None, description="设备名称或设备ID"),
+    since: Optional[float] = Query(None, description="起始时间戳（包含）"),
+    until: Optional[float] = Query(None, description="结束时间戳（不包含）"),
+    limit: int = Query(100, ge=1, le=1000, description="每页记录数"),
+    cursor: Optional[str] = Query(None, description="分页游标，取自上一页响应头 X-Next-Cursor"),
 ):
+    """
+    获取日志，从新到旧排列
+
+    下一页的游标通过响应头 X-Next-Cursor 返回，没有更多记录时不返回该响应头。
+    """
     try:
-        log_file_path = "logs/app.log"
-        if not os.path.exists(log_file_path):
+        if not LOG_FILE.exists():
             raise HTTPException(status_code=404, detail="日志文件不存在")
-        
-        with open(log_file_path, "r", encoding="utf-8") as f:
-            all_logs = f.readlines()[::-1]  # 反转以获取最新日志
-
-        # 根据级别过滤
-        if level:
-            filtered_logs = [log.strip() for log in all_logs if f" - {level.upper()} -" in log]
-        else:
-            filtered_logs = [log.strip() for log in all_logs]
-
-        # 分页处理
-        # start = (page - 1) * page_size
-        # end = start + page_size
-        # paginated_logs = filtered_logs[start:end]
-        filtered_logs = [log.strip() for log in all_logs]
-        
-        return filtered_logs
 
+        levels = {item.strip().upper() for item in level.split(",") if item.strip()} if level else None
+        query = LogQuery(levels, logger, device, since, until)
+
+        loop = asyncio.get_event_loop()
+        logs, next_cursor = await loop.run_in_executor(
+            None, lambda: read_logs(limit, cursor, query)
+        )
+
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return logs
+
+    except HTTPException:
+        raise
+    except ValueError:
+        raise HTTPException(status_code=400, detail="无效的分页游标")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"获取日志失败: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"获取日志失败: {str(e)}")
+
+@router.get("/stream")
+async def stream_logs(
+    request: Request,
+    level: Optional[str] = Query(None, description="日志级别，多个级别用逗号分隔，如 ERROR,WARNING"),
+    logger: Optional[str] = Query(None, description="记录器名称，同时匹配其子记录器"),
+    device: Optional[str] = Query(None, description="设备名称或设备ID"),
+):
+    """
+    以 Server-Sent Events 推送新写入的日志
+
+    所有连接共享同一个日志文件读取任务，过滤在服务端完成。
+    每条日志记录是一个事件，id 为可用于 GET /api/v1/logs/ 的分页游标；
+    因消费过慢被丢弃的记录数通过 dropped 事件通知。
+    """
+    levels = {item.strip().upper() for item in level.split(",") if item.strip()} if level else None
+    subscriber = log_follower.subscribe(LogQuery(levels, logger, device))
+
+    async def event_stream():
+        reported_dropped = 0
+        try:
+            while not await request.is_disconnected():
+                try:
+                    record = await asyncio.wait_for(subscriber.queue.get(), timeout=HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if subscriber.dropped != reported_dropped:
+                    reported_dropped = subscriber.dropped
+                    yield f"event: dropped\ndata: {reported_dropped}\n\n"
+                data = "\n".join(f"data: {line}" for line in record.text.split("\n"))
+                yield f"id: {record.cursor}\n{data}\n\n"
+        finally:
+            log_follower.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,31 @@
+"""
+运行指标API模块
+
+该模块以 Prometheus 文本格式输出运行指标，包括：
+1. 上传请求大小和耗时、单个文件的解码和写入耗时
+2. 每台设备的推送字节数、推送耗时和吞吐量
+3. 按子命令统计的ADB命令耗时
+4. 调度器队列深度、定时任务延迟和结果
+5. 按状态统计的自动化发布次数
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.core.metrics import registry
+
+router = APIRouter(
+    tags=["Metrics"]
+)
+
+# Prometheus 文本格式的内容类型
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    输出全部运行指标
+
+    Returns:
+        PlainTextResponse: Prometheus 文本格式的指标
+    """
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
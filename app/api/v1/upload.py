@@ -7,15 +7,21 @@
 3. 处理上传过程中的异常情况
 """
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Header, Request, Response, status
+from typing import Optional
 from app.scheduler.tasks import execute_immediate_tasks, execute_scheduled_tasks
 from app.models.request import UploadRequest
 from app.services.upload_service import process_upload
+from app.services.idempotency import run_idempotent
+from app.core.exceptions import IdempotencyError
+from app.core.metrics import upload_request_bytes, upload_request_duration_seconds
+from app.core.tracing import get_traceparent
 from app.scheduler.scheduler import add_job
+from app.device.health import device_health
 from datetime import datetime, timezone, timedelta
 import logging
-from app.device.del_img import delete_device_album
-from app.core.config import format_folder_name, get_shanghai_time, SHANGHAI_TIMEZONE, get_current_timestamp, debug_time_info
+import time
+from app.core.config import Settings, get_shanghai_time, SHANGHAI_TIMEZONE, get_current_timestamp, debug_time_info
 
 logger = logging.getLogger(__name__)
 
@@ -25,41 +31,48 @@ router = APIRouter(
 )
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
-async def upload_endpoint(request: UploadRequest):
+async def upload_endpoint(
+    request: UploadRequest,
+    response: Response,
+    http_request: Request,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     """
     设备上传数据接口
     
+    同一请求（相同的 Idempotency-Key，或未提供时内容完全相同）只处理一次，
+    重试时直接返回原始响应并带上 Idempotent-Replayed: true 响应头。
+    
     处理流程：
     1. 检查任务时间是否有效
     2. 处理文件上传请求
     3. 执行立即任务
     4. 创建定时任务
     """
+    started = time.perf_counter()
+    outcome = "error"
+    content_length = http_request.headers.get("content-length")
+    if content_length and content_length.isdigit():
+        upload_request_bytes.observe(int(content_length))
     try:
-        # 添加详细的时间调试信息
-        time_info = debug_time_info(request.timestamp)
-        logger.info(f"时间处理信息: {time_info}")
-        
-        # 检查任务时间是否已过期
-        current_timestamp = get_current_timestamp()
-        if request.timestamp <= current_timestamp:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"任务时间已过期，只能设置未来的任务。设定时间：{time_info['shanghai_time']}"
-            )
-        
-        # 处理上传
-        response_data = await handle_upload(request)
-        
-        # 执行立即任务
-        await execute_immediate_task(request)
-        
-        # 创建定时任务
-        await create_scheduled_task(request)
-        
+        response_data, replayed = await run_idempotent(
+            request,
+            idempotency_key,
+            lambda: process_upload_request(request)
+        )
+        outcome = "replayed" if replayed else "success"
+        if replayed:
+            response.headers["Idempotent-Replayed"] = "true"
         return response_data
         
-    except HTTPException:
+    except IdempotencyError as e:
+        outcome = "conflict"
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=e.message
+        )
+    except HTTPException as e:
+        outcome = "rejected" if e.status_code < 500 else "error"
         raise
     except Exception as e:
         logger.error(f"上传处理失败: {str(e)}")
@@ -67,19 +80,61 @@ async def upload_endpoint(request: UploadRequest):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"上传处理失败: {str(e)}"
         )
+    finally:
+        upload_request_duration_seconds.labels(outcome).observe(time.perf_counter() - started)
+
+async def process_upload_request(request: UploadRequest) -> dict:
+    """执行一次完整的上传处理"""
+    # 添加详细的时间调试信息
+    time_info = debug_time_info(request.timestamp)
+    logger.info(f"时间处理信息: {time_info}")
+    
+    # 检查任务时间是否已过期
+    current_timestamp = get_current_timestamp()
+    if request.timestamp <= current_timestamp:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"任务时间已过期，只能设置未来的任务。设定时间：{time_info['shanghai_time']}"
+        )
+    
+    # 设备存储放不下时直接拒绝，不再写入本地后推送失败
+    await check_device_capacity(request)
+    
+    # 处理上传
+    response_data = await handle_upload(request)
+    
+    # 执行立即任务
+    await execute_immediate_task(request, response_data["album_id"])
+    
+    # 创建定时任务
+    await create_scheduled_task(request, response_data["album_id"])
+    
+    return response_data
+
+def estimate_upload_bytes(request: UploadRequest) -> int:
+    """根据Base64长度计算上传文件解码后的总字节数"""
+    return sum(len(f.data) * 3 // 4 - f.data[-2:].count("=") for f in request.files)
+
+async def check_device_capacity(request: UploadRequest):
+    """检查设备存储路径的剩余空间，放不下时返回 507"""
+    if request.device_name not in Settings.DEVICE_CONFIG:
+        return
+    reason = await device_health.check_capacity(
+        request.device_name,
+        estimate_upload_bytes(request),
+        wait=Settings.DEVICE_HEALTH_UPLOAD_WAIT
+    )
+    if reason:
+        logger.warning(f"拒绝上传: {reason}")
+        raise HTTPException(
+            status_code=status.HTTP_507_INSUFFICIENT_STORAGE,
+            detail=reason
+        )
 
 async def handle_upload(request: UploadRequest) -> dict:
     """处理文件上传请求"""
     try:
-        # 使用统一的文件夹名称格式化函数
-        folder_name = format_folder_name(request.timestamp)
-        
-        # 如果有旧文件夹，先删除
-        delete_result = await delete_device_album(request.device_name, folder_name)
-        if not delete_result:
-            logger.warning(f"清理旧文件夹失败: {folder_name}")
-        
-        # 继续处理上传
+        # 上传内容先写入暂存目录，完成后原子地替换同名旧相册
         return await process_upload(request)
     except Exception as e:
         logger.error(f"Upload failed: {str(e)}")
@@ -88,18 +143,19 @@ async def handle_upload(request: UploadRequest) -> dict:
             detail=f"Upload failed: {str(e)}"
         )
 
-async def execute_immediate_task(request: UploadRequest):
+async def execute_immediate_task(request: UploadRequest, album_id: str):
     """执行立即任务"""
     try:
         await execute_immediate_tasks(
             device_name=request.device_name,
-            upload_time=request.timestamp
+            upload_time=request.timestamp,
+            album_id=album_id
         )
     except Exception as e:
         logger.error(f"Immediate task failed: {str(e)}")
         # 这里我们不抛出异常，因为这是次要任务，不应影响上传响应
         
-async def create_scheduled_task(request: UploadRequest):
+async def create_scheduled_task(request: UploadRequest, album_id: str):
     """创建定时任务"""
     try:
         # 直接使用时间戳创建触发时间
@@ -109,7 +165,9 @@ async def create_scheduled_task(request: UploadRequest):
             execute_scheduled_tasks,
             trigger_time,
             device_name=request.device_name,
-            task_time=request.timestamp
+            task_time=request.timestamp,
+            traceparent=get_traceparent(),
+            album_id=album_id
         )
     except Exception as e:
         logger.error(f"Task scheduling failed: {str(e)}")
@@ -9,7 +9,7 @@
 
 from pathlib import Path
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import os
 from dotenv import load_dotenv
 
@@ -24,6 +24,15 @@ PROJECT_DIR = Path(__file__).parent.parent.parent
 UPLOAD_DIR = PROJECT_DIR / os.getenv('UPLOAD_DIR', 'uploads')
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+# 回收站目录（与上传目录位于同一文件系统，保证 rename 为原子操作）
+TRASH_DIR = UPLOAD_DIR / ".trash"
+
+# 暂存目录（上传在此写完后再原子地发布到最终目录）
+STAGING_DIR = UPLOAD_DIR / ".staging"
+
+# 相册元数据索引（SQLite）
+INDEX_DB_PATH = PROJECT_DIR / os.getenv('INDEX_DB_PATH', str(UPLOAD_DIR / ".index.db"))
+
 # 定义上海时区
 SHANGHAI_TIMEZONE = timezone(timedelta(hours=8))
 
@@ -89,9 +98,80 @@ class Settings:
     # 基础自动化配置（默认值）
     AUTOMATION_CONFIG = {
         'APP_PACKAGE': os.getenv('AUTOMATION_APP_PACKAGE', 'com.xingin.xhs'),
-        'WAIT_TIMEOUT': 10
+        'WAIT_TIMEOUT': 10,
+        # ui：在应用内相册选择图片；share：单张图片通过分享 Intent 直接打开发布页，多张图片仍在应用内选择
+        # （在设备配置中以 publish_mode 逐台开启）
+        'PUBLISH_MODE': os.getenv('AUTOMATION_PUBLISH_MODE', 'ui')
     }
 
+    # 数据保留策略配置（0 表示不启用该策略）
+    RETENTION_MAX_AGE_DAYS = int(os.getenv('RETENTION_MAX_AGE_DAYS', '7'))  # 相册最长保留天数
+    RETENTION_MAX_ALBUMS_PER_DEVICE = int(os.getenv('RETENTION_MAX_ALBUMS_PER_DEVICE', '30'))  # 每台设备最多保留的相册数
+    RETENTION_MAX_TOTAL_MB = int(os.getenv('RETENTION_MAX_TOTAL_MB', '0'))  # 上传目录总容量上限（MB）
+
+    # 后台回收配置
+    TRASH_REAP_INTERVAL = float(os.getenv('TRASH_REAP_INTERVAL', '5'))  # 回收周期（秒）
+    TRASH_REAP_BATCH = int(os.getenv('TRASH_REAP_BATCH', '10'))  # 每轮最多清理的回收站目录数
+    TRASH_REAP_PAUSE = float(os.getenv('TRASH_REAP_PAUSE', '0.1'))  # 清理两个目录之间的间隔（秒）
+    STAGING_MAX_AGE = int(os.getenv('STAGING_MAX_AGE', '3600'))  # 暂存目录超过该时长（秒）视为残留
+
+    # 幂等上传配置
+    IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', '86400'))  # 幂等响应保留时长（秒）
+
+    # 日志配置
+    LOG_JSON = os.getenv('LOG_JSON', 'false').lower() == 'true'  # 文件日志使用JSON行格式
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))  # 日志队列容量，队列已满时丢弃新记录
+    LOG_RATE_LIMIT = int(os.getenv('LOG_RATE_LIMIT', '20'))  # 同一代码位置每秒最多输出的INFO/DEBUG日志数，0 表示不限流
+
+    # 事件循环看门狗配置
+    LOOP_WATCHDOG_ENABLED = os.getenv('LOOP_WATCHDOG_ENABLED', 'true').lower() == 'true'
+    LOOP_WATCHDOG_INTERVAL = float(os.getenv('LOOP_WATCHDOG_INTERVAL', '0.1'))  # 心跳间隔（秒）
+    LOOP_STALL_THRESHOLD = float(os.getenv('LOOP_STALL_THRESHOLD', '0.5'))  # 阻塞超过该时长（秒）时采集调用栈
+
+    # 链路追踪配置
+    TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'true').lower() == 'true'
+    TRACE_SERVICE_NAME = os.getenv('TRACE_SERVICE_NAME', 'device-data-api')
+    TRACE_EXPORT_PATH = Path(os.getenv('TRACE_EXPORT_PATH', 'logs/traces.jsonl'))  # OTLP/JSON 行格式
+    TRACE_EXPORT_MAX_BYTES = int(os.getenv('TRACE_EXPORT_MAX_BYTES', str(50 * 1024 * 1024)))  # 超过后轮转为 .1
+
+    # 管理接口配置（未设置令牌时管理接口不可用）
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')  # 通过 X-Admin-Token 请求头传入
+    PROFILER_MAX_SECONDS = int(os.getenv('PROFILER_MAX_SECONDS', '60'))  # 单次采样的最长时长（秒）
+
+    # ADB 推送压缩配置
+    ADB_PUSH_COMPRESSION = os.getenv('ADB_PUSH_COMPRESSION', 'auto').lower()  # auto: 按设备特性和文件内容选择；none: 不压缩；也可以指定 brotli、lz4、zstd
+    ADB_FEATURES_TTL = int(os.getenv('ADB_FEATURES_TTL', '3600'))  # 设备特性（adb features）的缓存时长（秒）
+
+    # ADB 命令超时配置（按设备和命令类别自适应）
+    ADB_TIMEOUT_DEFAULT = float(os.getenv('ADB_TIMEOUT_DEFAULT', '30'))  # 样本不足时的超时（秒）
+    ADB_TIMEOUT_MIN = float(os.getenv('ADB_TIMEOUT_MIN', '5'))  # 超时下限（秒）
+    ADB_TIMEOUT_MAX = float(os.getenv('ADB_TIMEOUT_MAX', '900'))  # 超时上限（秒）
+    ADB_TIMEOUT_MULTIPLIER = float(os.getenv('ADB_TIMEOUT_MULTIPLIER', '3'))  # 超时为预计耗时的倍数
+    ADB_TIMEOUT_PERCENTILE = float(os.getenv('ADB_TIMEOUT_PERCENTILE', '99'))  # 预计耗时取同类命令耗时的分位数
+    ADB_PUSH_MIN_THROUGHPUT = int(os.getenv('ADB_PUSH_MIN_THROUGHPUT', str(256 * 1024)))  # 没有吞吐量样本时假设的带宽（字节/秒）
+    ADB_THROUGHPUT_EWMA_ALPHA = float(os.getenv('ADB_THROUGHPUT_EWMA_ALPHA', '0.3'))  # 吞吐量EWMA的平滑系数
+
+    # 设备熔断配置
+    BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', '3'))  # 连续失败达到该次数后熔断
+    BREAKER_COOLDOWN = float(os.getenv('BREAKER_COOLDOWN', '10'))  # 熔断后首次探测前的冷却时间（秒），探测失败后加倍
+    BREAKER_MAX_COOLDOWN = float(os.getenv('BREAKER_MAX_COOLDOWN', '300'))  # 冷却时间上限（秒）
+    BREAKER_PROBE_INTERVAL = float(os.getenv('BREAKER_PROBE_INTERVAL', '1'))  # 后台探测任务的检查间隔（秒）
+    BREAKER_PROBE_TIMEOUT = float(os.getenv('BREAKER_PROBE_TIMEOUT', '5'))  # 单次探测的超时（秒）
+    ADB_MAX_INFLIGHT_PER_DEVICE = int(os.getenv('ADB_MAX_INFLIGHT_PER_DEVICE', '4'))  # 每台设备同时执行的ADB命令数上限
+
+    # Wi-Fi ADB 连接守护配置
+    ADB_SUPERVISOR_ENABLED = os.getenv('ADB_SUPERVISOR_ENABLED', 'true').lower() == 'true'  # 是否守护 TCP/IP 设备的连接
+    ADB_SUPERVISOR_INTERVAL = float(os.getenv('ADB_SUPERVISOR_INTERVAL', '5'))  # 连接检查间隔（秒）
+    ADB_KEEPALIVE_INTERVAL = float(os.getenv('ADB_KEEPALIVE_INTERVAL', '30'))  # 在线设备的保活间隔（秒）
+    ADB_RECONNECT_BACKOFF_MIN = float(os.getenv('ADB_RECONNECT_BACKOFF_MIN', '2'))  # 重连失败后的初始退避（秒），之后每次加倍
+    ADB_RECONNECT_BACKOFF_MAX = float(os.getenv('ADB_RECONNECT_BACKOFF_MAX', '120'))  # 重连退避上限（秒）
+    ADB_PRECONNECT_LEAD = float(os.getenv('ADB_PRECONNECT_LEAD', '60'))  # 定时任务开始前多少秒内预先连接设备
+
+    # 设备健康状态配置
+    DEVICE_HEALTH_TTL = float(os.getenv('DEVICE_HEALTH_TTL', '30'))  # 健康状态的缓存时长（秒）
+    DEVICE_HEALTH_UPLOAD_WAIT = float(os.getenv('DEVICE_HEALTH_UPLOAD_WAIT', '2'))  # 上传时等待健康状态采集的最长时间（秒）
+    DEVICE_MIN_FREE_BYTES = int(os.getenv('DEVICE_MIN_FREE_BYTES', str(200 * 1024 * 1024)))  # 设备存储至少保留的剩余空间（字节）
+
     # 其他配置参数
     # ... 保留其他配置参数 ...
 
@@ -131,6 +211,23 @@ def format_folder_name(utc_timestamp: int) -> str:
     shanghai_time = get_shanghai_time(utc_timestamp)
     return shanghai_time.strftime("%Y%m%d%H%M%S")
 
+def parse_folder_name(folder_name: str) -> Optional[int]:
+    """
+    解析文件夹名称，是 format_folder_name 的逆操作
+    
+    Args:
+        folder_name (str): 格式为 YYYYMMDDHHmmss 的文件夹名称
+        
+    Returns:
+        Optional[int]: 对应的时间戳，名称不合法时返回None
+    """
+    try:
+        folder_time = datetime.strptime(folder_name, "%Y%m%d%H%M%S")
+    except ValueError:
+        return None
+    # 与 get_shanghai_time 保持一致：文件夹时间即时间戳的UTC表示
+    return int(folder_time.replace(tzinfo=timezone.utc).timestamp())
+
 def get_current_timestamp() -> int:
     """
     获取当前的UTC时间戳
@@ -27,6 +27,10 @@ class TaskError(AppException):
     """任务执行错误"""
     pass
 
+class IdempotencyError(AppException):
+    """幂等键冲突错误（同一幂等键用于不同的请求）"""
+    pass
+
 class ConfigError(AppException):
     """配置错误"""
     pass 
\ No newline at end of file
@@ -0,0 +1,285 @@
+"""
+日志索引模块
+
+在写入日志的同时增量维护一个旁路索引文件（app.log.idx），包括：
+1. 将连续写入的日志记录划分为块（按时间桶和块大小切分）
+2. 记录每个块所在的日志文件（inode）、字节范围和时间范围
+3. 记录块内出现的日志级别、记录器名称和设备标识
+
+查询日志时先用索引筛选出可能命中的块，再只对这些字节范围 seek 读取，
+无需线性扫描全部日志文件。索引文件在日志轮转时同步清理。
+"""
+
+import json
+import logging
+import os
+import re
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from app.core.config import Settings
+
+# 单个索引块覆盖的最大字节数
+BLOCK_MAX_BYTES = 64 * 1024
+
+# 单个索引块覆盖的时间桶（秒）
+BLOCK_SECONDS = 60
+
+def get_stat_id(stat: os.stat_result) -> str:
+    """
+    根据文件状态生成文件标识（设备号 + inode）
+
+    Args:
+        stat: os.stat 的结果
+
+    Returns:
+        str: 文件标识
+    """
+    return f"{stat.st_dev:x}-{stat.st_ino:x}"
+
+class DeviceMatcher:
+    """
+    从日志文本中识别设备
+
+    同时识别设备名称和设备ID，设备ID会映射回所有使用它的设备名称。
+    """
+
+    def __init__(self, device_mapping: Dict[str, str]):
+        """
+        初始化设备匹配器
+
+        Args:
+            device_mapping: 设备名称到设备ID的映射
+        """
+        self.names_by_term: Dict[str, Set[str]] = {}
+        for name, device_id in device_mapping.items():
+            self.names_by_term.setdefault(name, set()).add(name)
+            if device_id:
+                self.names_by_term.setdefault(device_id, set()).add(name)
+        # 较长的标识优先匹配，避免 deviceA 抢先匹配 deviceA_sys2
+        terms = sorted(self.names_by_term, key=len, reverse=True)
+        self.pattern = re.compile(
+            r"(?<![\w])(" + "|".join(re.escape(term) for term in terms) + r")(?![\w])"
+        ) if terms else None
+
+    def find(self, text: str) -> Set[str]:
+        """
+        查找文本中出现的设备名称
+
+        Args:
+            text: 日志文本
+
+        Returns:
+            set: 设备名称集合
+        """
+        if self.pattern is None or not text:
+            return set()
+        names: Set[str] = set()
+        for term in set(self.pattern.findall(text)):
+            names |= self.names_by_term[term]
+        return names
+
+    def terms_for(self, device: str) -> List[str]:
+        """
+        获取用于在日志文本中查找指定设备的所有标识
+
+        Args:
+            device: 设备名称或设备ID
+
+        Returns:
+            list: 设备名称及其设备ID
+        """
+        terms = {device}
+        device_id = Settings.DEVICE_MAPPING.get(device)
+        if device_id:
+            terms.add(device_id)
+        return sorted(terms)
+
+    def names_for(self, device: str) -> Set[str]:
+        """
+        将设备名称或设备ID规范化为设备名称集合
+
+        Args:
+            device: 设备名称或设备ID
+
+        Returns:
+            set: 设备名称集合
+        """
+        return self.names_by_term.get(device, {device})
+
+# 全局设备匹配器
+device_matcher = DeviceMatcher(Settings.DEVICE_MAPPING)
+
+class LogIndexWriter:
+    """
+    日志索引写入器
+
+    在内存中累积当前块，块结束时以一行JSON追加到索引文件。
+    """
+
+    def __init__(self, index_path: Path):
+        """
+        初始化索引写入器
+
+        Args:
+            index_path: 索引文件路径
+        """
+        self.index_path = index_path
+        self._block: Optional[dict] = None
+
+    def observe(self, file_id: str, start: int, end: int, record: logging.LogRecord):
+        """
+        记录一条刚写入日志文件的记录
+
+        Args:
+            file_id: 日志文件标识
+            start: 记录在文件中的起始偏移
+            end: 记录在文件中的结束偏移
+            record: 日志记录
+        """
+        block = self._block
+        bucket = int(record.created // BLOCK_SECONDS)
+        if block is not None and (
+            block["f"] != file_id
+            or block["e"] != start
+            or block["bucket"] != bucket
+            or end - block["s"] > BLOCK_MAX_BYTES
+        ):
+            self.flush()
+            block = None
+
+        if block is None:
+            block = self._block = {
+                "f": file_id, "s": start, "e": end,
+                "t0": record.created, "t1": record.created, "bucket": bucket,
+                "l": set(), "n": set(), "d": set(), "c": 0
+            }
+
+        block["e"] = end
+        block["t1"] = max(block["t1"], record.created)
+        block["l"].add(record.levelname)
+        block["n"].add(record.name)
+        device = getattr(record, "device", None)
+        if device:
+            block["d"] |= device_matcher.names_for(str(device))
+        block["d"] |= device_matcher.find(getattr(record, "message", None) or record.getMessage())
+        block["c"] += 1
+
+    def flush(self):
+        """将当前块写入索引文件"""
+        block, self._block = self._block, None
+        if block is None:
+            return
+        line = json.dumps({
+            "f": block["f"], "s": block["s"], "e": block["e"],
+            "t0": round(block["t0"], 3), "t1": round(block["t1"], 3),
+            "l": sorted(block["l"]), "n": sorted(block["n"]), "d": sorted(block["d"]),
+            "c": block["c"]
+        }, ensure_ascii=False, separators=(',', ':'))
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def prune(self, valid_file_ids: Set[str]):
+        """
+        删除已不存在的日志文件对应的索引块
+
+        Args:
+            valid_file_ids: 仍然存在的日志文件标识
+        """
+        blocks = [block for block in load_blocks(self.index_path) if block["f"] in valid_file_ids]
+        tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for block in blocks:
+                f.write(json.dumps(block, ensure_ascii=False, separators=(',', ':')) + "\n")
+        os.replace(tmp_path, self.index_path)
+
+class IndexedRotatingFileHandler(RotatingFileHandler):
+    """
+    维护旁路索引的轮转文件日志处理器
+
+    每写入一条记录就把它的字节范围登记到索引写入器中。
+    """
+
+    def __init__(self, filename, index_path: Path, **kwargs):
+        """
+        初始化处理器
+
+        Args:
+            filename: 日志文件路径
+            index_path: 索引文件路径
+            **kwargs: 传递给 RotatingFileHandler 的参数
+        """
+        super().__init__(filename, **kwargs)
+        self.index = LogIndexWriter(index_path)
+        self._file_id: Optional[str] = None
+        self._file_id_stream = None
+
+    def _current_file_id(self) -> str:
+        """获取当前日志文件的标识（文件重新打开后刷新）"""
+        if self._file_id_stream is not self.stream:
+            self._file_id = get_stat_id(os.fstat(self.stream.fileno()))
+            self._file_id_stream = self.stream
+        return self._file_id
+
+    def emit(self, record: logging.LogRecord):
+        """写入日志记录并更新索引"""
+        try:
+            if self.shouldRollover(record):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            start = self.stream.tell()
+            logging.FileHandler.emit(self, record)
+            self.index.observe(self._current_file_id(), start, self.stream.tell(), record)
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def doRollover(self):
+        """轮转日志文件，并清理已被删除的文件对应的索引"""
+        self.index.flush()
+        super().doRollover()
+        valid_file_ids = set()
+        for i in range(0, self.backupCount + 1):
+            path = self.baseFilename if i == 0 else f"{self.baseFilename}.{i}"
+            try:
+                valid_file_ids.add(get_stat_id(os.stat(path)))
+            except FileNotFoundError:
+                continue
+        try:
+            self.index.prune(valid_file_ids)
+        except Exception:
+            pass
+
+    def close(self):
+        """关闭处理器，写出未完成的索引块"""
+        self.acquire()
+        try:
+            self.index.flush()
+        finally:
+            self.release()
+        super().close()
+
+def load_blocks(index_path: Path) -> List[dict]:
+    """
+    读取索引文件中的所有块
+
+    Args:
+        index_path: 索引文件路径
+
+    Returns:
+        list: 索引块列表，忽略写了一半的行
+    """
+    blocks = []
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    blocks.append(json.loads(line))
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return blocks
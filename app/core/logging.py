@@ -3,46 +3,229 @@
 
 配置应用程序的日志系统，包括：
 1. 控制台日志
-2. 文件日志
-3. 日志格式化
+2. 文件日志（附带按时间、级别、记录器和设备的旁路索引）
+3. 日志格式化（文本格式或紧凑的JSON行格式）
 4. 日志级别控制
+
+业务代码只把日志记录放入有界队列，格式化和磁盘写入都由后台监听线程完成，
+事件循环不会因为日志 I/O 而阻塞。队列已满时丢弃新记录并计数；
+同一代码位置在短时间内重复输出的 INFO/DEBUG 日志会被限流。
 """
 
+import atexit
+import json
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from typing import Dict, List, Optional, Tuple
 from app.core.config import Settings
+from app.core.log_index import IndexedRotatingFileHandler
+from app.core.metrics import log_queue_depth, log_records_dropped_total
+from app.core.tracing import TraceContextFilter
+
+# 日志文件配置
+LOG_DIR = Path("logs")
+LOG_FILE = LOG_DIR / "app.log"
+LOG_INDEX_FILE = LOG_DIR / "app.log.idx"
+LOG_MAX_BYTES = 10*1024*1024  # 10MB
+LOG_BACKUP_COUNT = 5
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 限流统计窗口（秒）
+RATE_LIMIT_PERIOD = 1.0
+
+# JSON格式中输出的结构化字段（通过 extra 传入）
+STRUCTURED_FIELDS = ("device", "job_id", "stage", "duration", "trace_id", "span_id", "suppressed")
+
+class MessageFormatter(logging.Formatter):
+    """
+    入队前使用的消息格式化器
+
+    只合并消息参数和异常堆栈，被限流抑制过的记录附加抑制条数。
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            message += f" (同一位置此前 {suppressed} 条日志被限流)"
+        return message
+
+class JsonFormatter(logging.Formatter):
+    """
+    JSON行格式化器
+
+    每条记录输出为一行紧凑JSON，时间格式与文本格式保持一致，
+    并附带 STRUCTURED_FIELDS 中出现的结构化字段。
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record),
+            "logger": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["message"] += "\n" + record.exc_text
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str)
+
+class RateLimitFilter(logging.Filter):
+    """
+    按代码位置限流的过滤器
+
+    同一代码位置（文件 + 行号）每个统计窗口最多放行 rate 条 INFO/DEBUG 日志，
+    WARNING 及以上级别不受限制。窗口结束后放行的第一条记录携带此前被抑制的条数。
+    """
+
+    def __init__(self, rate: int, period: float = RATE_LIMIT_PERIOD):
+        """
+        初始化过滤器
+
+        Args:
+            rate: 每个窗口允许的记录数，0 表示不限流
+            period: 窗口长度（秒）
+        """
+        super().__init__()
+        self.rate = rate
+        self.period = period
+        self.suppressed = 0
+        # 代码位置 -> [窗口起始时间, 已放行条数, 已抑制条数]
+        self._windows: Dict[Tuple[str, int], List] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno >= logging.WARNING:
+            return True
+        key = (record.pathname, record.lineno)
+        window = self._windows.get(key)
+        if window is None or record.created - window[0] >= self.period:
+            if window is not None and window[2]:
+                record.suppressed = window[2]
+            self._windows[key] = [record.created, 1, 0]
+            return True
+        if window[1] < self.rate:
+            window[1] += 1
+            return True
+        window[2] += 1
+        self.suppressed += 1
+        return False
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    有界队列日志处理器
+
+    队列已满时丢弃新记录而不是阻塞调用方，恢复后补发一条丢弃计数的警告
+    （每个统计窗口最多一条）。
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._reported = 0
+        self._reported_at = 0.0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self._reported != self.dropped and record.created - self._reported_at >= RATE_LIMIT_PERIOD:
+            self._reported, self._reported_at = self.dropped, record.created
+            warning = logging.LogRecord(
+                __name__, logging.WARNING, __file__, 0,
+                "日志队列已满，累计丢弃 %d 条日志", (self.dropped,), None
+            )
+            try:
+                self.queue.put_nowait(warning)
+            except queue.Full:
+                pass
+
+# 后台日志监听器及其组件
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[DroppingQueueHandler] = None
+_rate_limit_filter: Optional[RateLimitFilter] = None
 
 def setup_logging():
     """配置日志系统"""
-    
+    global _listener, _queue_handler, _rate_limit_filter
+    if _listener is not None:
+        return
+
     # 创建日志目录
-    log_dir = Path("logs")
+    log_dir = LOG_DIR
     log_dir.mkdir(exist_ok=True)
-    
-    # 基础配置
-    logging.basicConfig(
-        level=logging.DEBUG if Settings.DEBUG else logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
+
+    # 控制台处理器
+    console_handler = logging.StreamHandler(sys.stderr)
+    console_handler.setFormatter(
+        logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
     )
-    
-    # 创建文件处理器
-    file_handler = RotatingFileHandler(
-        log_dir / "app.log",
-        maxBytes=10*1024*1024,  # 10MB
-        backupCount=5,
+
+    # 创建文件处理器（同时维护旁路索引）
+    file_handler = IndexedRotatingFileHandler(
+        LOG_FILE,
+        index_path=LOG_INDEX_FILE,
+        maxBytes=LOG_MAX_BYTES,
+        backupCount=LOG_BACKUP_COUNT,
         encoding='utf-8'
     )
     file_handler.setFormatter(
-        logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        JsonFormatter() if Settings.LOG_JSON else logging.Formatter(LOG_FORMAT)
     )
-    
+
+    # 调用方只负责入队，由监听线程写出
+    log_queue: queue.Queue = queue.Queue(maxsize=Settings.LOG_QUEUE_SIZE)
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _queue_handler.setFormatter(MessageFormatter())
+    _rate_limit_filter = RateLimitFilter(Settings.LOG_RATE_LIMIT)
+    _queue_handler.addFilter(_rate_limit_filter)
+    _queue_handler.addFilter(TraceContextFilter())
+
+    _listener = QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
     # 添加处理器到根日志记录器
     root_logger = logging.getLogger()
-    root_logger.addHandler(file_handler)
-    
+    root_logger.setLevel(logging.DEBUG if Settings.DEBUG else logging.INFO)
+    root_logger.addHandler(_queue_handler)
+    log_queue_depth.set_function(lambda: get_logging_stats()["queued"])
+    log_records_dropped_total.set_function(lambda: get_logging_stats()["dropped"])
+
     # 设置第三方库的日志级别
     logging.getLogger("uvicorn").setLevel(logging.INFO)
-    logging.getLogger("fastapi").setLevel(logging.INFO) 
\ No newline at end of file
+    logging.getLogger("fastapi").setLevel(logging.INFO)
+
+def stop_logging():
+    """停止后台日志监听器，写出队列中剩余的记录"""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is None:
+        return
+    logging.getLogger().removeHandler(_queue_handler)
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+def get_logging_stats() -> dict:
+    """
+    获取日志队列的运行统计
+
+    Returns:
+        dict: {"queued": 队列中的记录数, "dropped": 因队列已满丢弃的记录数, "suppressed": 被限流的记录数}
+    """
+    return {
+        "queued": _queue_handler.queue.qsize() if _queue_handler else 0,
+        "dropped": _queue_handler.dropped if _queue_handler else 0,
+        "suppressed": _rate_limit_filter.suppressed if _rate_limit_filter else 0,
+    }
@@ -0,0 +1,276 @@
+"""
+内存分析模块
+
+提供定位内存增长的工具，包括：
+1. 按需启动和停止 tracemalloc
+2. 保存命名快照，按文件或行号比较两个快照之间的分配差异
+3. 统计单个请求的 RSS 变化、峰值 RSS 和内存块分配数量
+
+tracemalloc 只在显式启动后才会跟踪分配，平时没有额外开销；
+请求级统计只读取进程的 RSS 和已分配内存块数，开销可以忽略。
+"""
+
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from app.core.metrics import request_peak_rss_bytes, request_allocated_blocks
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 最多保留的命名快照数，超出时丢弃最早的快照
+MAX_SNAPSHOTS = 10
+
+# 保留的请求内存记录条数
+REQUEST_HISTORY = 50
+
+# 比较快照时忽略的分配来源
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+def get_rss() -> Optional[int]:
+    """
+    获取进程当前的常驻内存（字节）
+
+    Returns:
+        Optional[int]: 当前RSS，系统不支持时返回None
+    """
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, IndexError, ValueError, AttributeError):
+        return None
+
+def get_peak_rss() -> Optional[int]:
+    """
+    获取进程运行以来的峰值常驻内存（字节）
+
+    Returns:
+        Optional[int]: 峰值RSS，系统不支持时返回None
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return peak if sys.platform == "darwin" else peak * 1024
+
+class MemoryProfiler:
+    """
+    tracemalloc 快照管理
+
+    属性:
+        snapshots (OrderedDict): 快照名称到 (拍摄时间, 快照) 的映射
+        requests (deque): 最近的请求内存记录
+    """
+
+    def __init__(self):
+        self.snapshots: "OrderedDict[str, tuple]" = OrderedDict()
+        self.requests: deque = deque(maxlen=REQUEST_HISTORY)
+        self._active_requests = 0
+
+    @property
+    def is_tracing(self) -> bool:
+        """tracemalloc 是否正在跟踪"""
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1):
+        """
+        启动 tracemalloc
+
+        Args:
+            frames: 每次分配记录的调用栈深度
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self):
+        """停止 tracemalloc 并丢弃所有快照"""
+        tracemalloc.stop()
+        self.snapshots.clear()
+
+    def take_snapshot(self, name: str) -> dict:
+        """
+        拍摄命名快照（同名快照会被替换）
+
+        Args:
+            name: 快照名称
+
+        Returns:
+            dict: 快照信息
+
+        Raises:
+            ValueError: tracemalloc 未启动
+        """
+        if not tracemalloc.is_tracing():
+            raise ValueError("tracemalloc 未启动")
+        snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        self.snapshots.pop(name, None)
+        self.snapshots[name] = (time.time(), snapshot)
+        while len(self.snapshots) > MAX_SNAPSHOTS:
+            self.snapshots.popitem(last=False)
+        return self._describe(name)
+
+    def _describe(self, name: str) -> dict:
+        """生成快照的摘要信息"""
+        taken_at, snapshot = self.snapshots[name]
+        stats = snapshot.statistics("filename")
+        return {
+            "name": name,
+            "taken_at": round(taken_at, 3),
+            "size": sum(stat.size for stat in stats),
+            "count": sum(stat.count for stat in stats),
+        }
+
+    def list_snapshots(self) -> List[dict]:
+        """
+        列出所有快照
+
+        Returns:
+            list: 快照信息，按拍摄顺序排列
+        """
+        return [self._describe(name) for name in self.snapshots]
+
+    def diff(self, base: str, target: Optional[str] = None, group_by: str = "lineno",
+             limit: int = 20) -> List[dict]:
+        """
+        比较两个快照之间的分配差异
+
+        Args:
+            base: 基准快照名称
+            target: 目标快照名称，为None时与当前内存比较
+            group_by: 分组方式，lineno（文件和行号）或 filename（文件）
+            limit: 返回差异最大的前N项
+
+        Returns:
+            list: [{"file", "line", "size", "size_diff", "count", "count_diff"}]，按 size_diff 绝对值降序
+
+        Raises:
+            KeyError: 快照不存在
+            ValueError: tracemalloc 未启动
+        """
+        if base not in self.snapshots:
+            raise KeyError(f"快照不存在: {base}")
+        if target is None:
+            if not tracemalloc.is_tracing():
+                raise ValueError("tracemalloc 未启动")
+            target_snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        elif target not in self.snapshots:
+            raise KeyError(f"快照不存在: {target}")
+        else:
+            target_snapshot = self.snapshots[target][1]
+
+        results = []
+        for stat in target_snapshot.compare_to(self.snapshots[base][1], group_by)[:limit]:
+            frame = stat.traceback[0]
+            results.append({
+                "file": frame.filename,
+                "line": frame.lineno if group_by == "lineno" else None,
+                "size": stat.size,
+                "size_diff": stat.size_diff,
+                "count": stat.count,
+                "count_diff": stat.count_diff,
+            })
+        return results
+
+    @contextmanager
+    def track_request(self, name: str) -> Iterator[dict]:
+        """
+        统计一次请求期间的内存变化
+
+        峰值RSS为下界：请求期间进程峰值被刷新时使用新的峰值，否则取请求开始和结束时RSS的较大者。
+        tracemalloc 正在跟踪且没有其他并发请求时，额外记录请求期间的 Python 分配峰值。
+
+        Args:
+            name: 请求名称
+
+        Yields:
+            dict: 请求内存记录，请求结束后填充
+        """
+        usage = {"name": name, "time": round(time.time(), 3)}
+        rss_start = get_rss()
+        peak_start = get_peak_rss()
+        blocks_start = sys.getallocatedblocks()
+        self._active_requests += 1
+        exclusive = self._active_requests == 1 and tracemalloc.is_tracing()
+        if exclusive:
+            traced_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        try:
+            yield usage
+        finally:
+            self._active_requests -= 1
+            rss_end = get_rss()
+            peak_end = get_peak_rss()
+            usage["rss_start"] = rss_start
+            usage["rss_end"] = rss_end
+            usage["rss_delta"] = rss_end - rss_start if rss_start is not None and rss_end is not None else None
+            if peak_end is not None and peak_end > peak_start:
+                usage["peak_rss"] = peak_end
+            else:
+                usage["peak_rss"] = max(rss_start or 0, rss_end or 0) or None
+            usage["allocated_blocks_delta"] = sys.getallocatedblocks() - blocks_start
+            usage["traced_peak"] = (
+                tracemalloc.get_traced_memory()[1] - traced_start
+                if exclusive and tracemalloc.is_tracing() else None
+            )
+            self.requests.append(usage)
+            if usage["peak_rss"] is not None:
+                request_peak_rss_bytes.labels(name).observe(usage["peak_rss"])
+            request_allocated_blocks.labels(name).observe(max(0, usage["allocated_blocks_delta"]))
+
+    def get_status(self) -> Dict[str, object]:
+        """
+        获取内存分析的整体状态
+
+        Returns:
+            dict: tracemalloc 状态、当前和峰值RSS、快照列表以及最近的请求内存记录
+        """
+        traced = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else None
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "traced_current": traced[0] if traced else None,
+            "traced_peak": traced[1] if traced else None,
+            "rss": get_rss(),
+            "peak_rss": get_peak_rss(),
+            "snapshots": self.list_snapshots(),
+            "requests": list(reversed(self.requests)),
+        }
+
+# 全局内存分析实例
+memory_profiler = MemoryProfiler()
+
+class MemoryTrackingMiddleware:
+    """
+    请求内存统计中间件（ASGI）
+
+    覆盖请求体读取和模型解析在内的整个请求过程，只统计指定前缀的路径。
+    """
+
+    def __init__(self, app, paths: Iterable[str]):
+        """
+        初始化中间件
+
+        Args:
+            app: 下游ASGI应用
+            paths: 需要统计的路径前缀
+        """
+        self.app = app
+        self.paths = tuple(paths)
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or not path.startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+        with memory_profiler.track_request(f"{scope.get('method', '')} {path}"):
+            await self.app(scope, receive, send)
@@ -0,0 +1,382 @@
+"""
+运行指标模块
+
+提供 Prometheus 文本格式兼容的指标，包括：
+1. 计数器（Counter）
+2. 仪表（Gauge）
+3. 直方图（Histogram），使用固定分桶
+
+由其他模块自行维护的数值（如队列长度）可以通过取值函数在采集时读取。
+
+指标既在事件循环线程中记录，也在线程池中记录（例如 uiautomator2 自动化步骤更新熔断状态）：
+首次出现新的标签组合时在锁内创建子指标，采集时在锁内复制子指标列表；
+已有子指标的数值更新只做字典查找和数值累加，不加锁。
+"""
+
+import abc
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# 耗时类直方图的默认分桶（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 大小类直方图的分桶（字节）
+SIZE_BUCKETS = tuple(float(1024 * 4 ** i) for i in range(1, 10))  # 4KB ~ 256MB
+
+# 定时任务延迟的分桶（秒）
+LATENESS_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+def _escape(value: str) -> str:
+    """转义标签值"""
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    """格式化标签部分，例如 {device="deviceA"}"""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    """格式化数值"""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class _CounterValue:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+class _GaugeValue:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+class Metric(abc.ABC):
+    """
+    指标基类
+
+    属性:
+        name (str): 指标名称
+        documentation (str): 指标说明
+        labelnames (tuple): 标签名称
+    """
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        self._function: Optional[Callable[[], float]] = None
+
+    def labels(self, *values):
+        """
+        获取指定标签组合的子指标
+
+        Args:
+            *values: 标签值，与 labelnames 一一对应
+
+        Returns:
+            子指标对象
+        """
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"指标 {self.name} 需要标签: {self.labelnames}")
+            with self._lock:
+                # 其他线程可能已经创建了同一标签组合的子指标
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child()
+        return child
+
+    @abc.abstractmethod
+    def _new_child(self):
+        """创建一个新的子指标（由具体指标类型实现）"""
+
+    def _default(self):
+        """无标签指标的唯一子指标"""
+        return self.labels()
+
+    def set_function(self, function: Callable[[], float]):
+        """
+        设置采集时调用的取值函数（仅用于无标签的计数器和仪表）
+
+        适用于由其他模块自行维护的数值，例如队列长度。
+
+        Args:
+            function: 返回当前值的函数
+        """
+        self._function = function
+
+    def collect(self) -> List[str]:
+        """
+        生成该指标的文本格式输出
+
+        Returns:
+            list: 输出行
+        """
+        if self._function is not None:
+            try:
+                self._default().value = float(self._function())
+            except Exception:
+                pass
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            children = list(self._children.items())
+        for key, child in children:
+            lines.extend(self._collect_child(key, child))
+        return lines
+
+    def _collect_child(self, key: Tuple[str, ...], child) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"]
+
+class Counter(Metric):
+    """只增不减的计数器"""
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterValue()
+
+    def inc(self, amount: float = 1.0):
+        """无标签计数器加 amount"""
+        self._default().inc(amount)
+
+class Gauge(Metric):
+    """可增可减的仪表"""
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _GaugeValue()
+
+    def set(self, value: float):
+        """设置无标签仪表的值"""
+        self._default().set(value)
+
+class Histogram(Metric):
+    """固定分桶的直方图"""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        """为无标签直方图记录一个观测值"""
+        self._default().observe(value)
+
+    def snapshot(self, *values) -> dict:
+        """
+        获取指定标签组合的直方图数据
+
+        Args:
+            *values: 标签值
+
+        Returns:
+            dict: {"buckets": {上界: 累计次数}, "sum": 总和, "count": 次数}
+        """
+        child = self.labels(*values)
+        buckets = {}
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), list(child.counts)):
+            cumulative += count
+            buckets[_format_value(bound)] = cumulative
+        return {"buckets": buckets, "sum": child.sum, "count": cumulative}
+
+    def _collect_child(self, key: Tuple[str, ...], child: _HistogramValue) -> List[str]:
+        lines = []
+        cumulative = 0
+        counts = list(child.counts)
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        """
+        注册指标
+
+        Args:
+            metric: 指标对象
+
+        Returns:
+            Metric: 已注册的同名指标（重复注册时返回已有对象）
+        """
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """创建并注册计数器"""
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """创建并注册仪表"""
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        """创建并注册直方图"""
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """
+        生成 Prometheus 文本格式（0.0.4）的全部指标
+
+        Returns:
+            str: 指标文本
+        """
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+# 全局指标注册表
+registry = MetricsRegistry()
+
+# 上传
+upload_request_bytes = registry.histogram(
+    "upload_request_bytes", "上传请求体大小（字节）", buckets=SIZE_BUCKETS
+)
+upload_request_duration_seconds = registry.histogram(
+    "upload_request_duration_seconds", "上传请求处理耗时（秒）", ["outcome"]
+)
+upload_file_decode_seconds = registry.histogram(
+    "upload_file_decode_seconds", "单个文件Base64解码和哈希耗时（秒）"
+)
+upload_file_write_seconds = registry.histogram(
+    "upload_file_write_seconds", "单个文件写入磁盘耗时（秒）"
+)
+upload_file_bytes_total = registry.counter(
+    "upload_file_bytes_total", "已保存的上传文件字节数"
+)
+
+# 推送
+device_push_bytes_total = registry.counter(
+    "device_push_bytes_total", "推送到设备的字节数", ["device"]
+)
+device_push_duration_seconds = registry.histogram(
+    "device_push_duration_seconds", "单个文件推送耗时（秒）", ["device"]
+)
+device_push_throughput_bytes_per_second = registry.gauge(
+    "device_push_throughput_bytes_per_second", "最近一次推送任务的平均吞吐量（字节/秒）", ["device"]
+)
+device_push_files_total = registry.counter(
+    "device_push_files_total", "推送到设备的文件数（按传输压缩算法）", ["device", "compression"]
+)
+
+# ADB
+adb_command_duration_seconds = registry.histogram(
+    "adb_command_duration_seconds", "ADB命令耗时（秒）", ["subcommand", "outcome"]
+)
+adb_command_timeout_seconds = registry.gauge(
+    "adb_command_timeout_seconds", "最近一次为ADB命令估计的超时时长（秒）", ["device", "subcommand"]
+)
+device_breaker_state = registry.gauge(
+    "device_breaker_state", "设备熔断器状态（0 关闭，1 半开，2 打开）", ["device"]
+)
+device_breaker_rejections_total = registry.counter(
+    "device_breaker_rejections_total", "因设备熔断被直接拒绝的操作数", ["device"]
+)
+device_connected = registry.gauge(
+    "device_connected", "TCP/IP 设备最近一次检查时是否在线（1 在线，0 离线）", ["device"]
+)
+device_reconnects_total = registry.counter(
+    "device_reconnects_total", "TCP/IP 设备的重连次数", ["device", "outcome"]
+)
+device_battery_level = registry.gauge(
+    "device_battery_level", "最近一次采集的设备电量（%）", ["device"]
+)
+device_storage_free_bytes = registry.gauge(
+    "device_storage_free_bytes", "最近一次采集的设备存储路径剩余空间（字节）", ["device", "path"]
+)
+
+# 定时任务
+scheduler_jobs_pending = registry.gauge(
+    "scheduler_jobs_pending", "调度器中等待执行的任务数"
+)
+scheduled_task_lateness_seconds = registry.histogram(
+    "scheduled_task_lateness_seconds", "定时任务实际开始时间相对计划时间的延迟（秒）",
+    buckets=LATENESS_BUCKETS
+)
+scheduled_tasks_total = registry.counter(
+    "scheduled_tasks_total", "已执行的定时任务数", ["task_type", "outcome"]
+)
+
+# 自动化发布
+automation_publish_total = registry.counter(
+    "automation_publish_total", "内容自动化发布次数", ["device", "status"]
+)
+automation_share_intent_total = registry.counter(
+    "automation_share_intent_total", "通过分享 Intent 打开发布页的次数（opened 成功，fallback 改为应用内选择）", ["device", "outcome"]
+)
+
+# 请求内存
+request_peak_rss_bytes = registry.histogram(
+    "request_peak_rss_bytes", "请求期间的进程峰值RSS（字节，下界）", ["request"],
+    buckets=tuple(float(2 ** i * 1024 * 1024) for i in range(5, 13))  # 32MB ~ 4GB
+)
+request_allocated_blocks = registry.histogram(
+    "request_allocated_blocks", "请求结束时相对开始时新增的Python内存块数", ["request"],
+    buckets=(100.0, 1000.0, 10000.0, 100000.0, 1000000.0)
+)
+
+# 事件循环
+event_loop_lag_seconds = registry.histogram(
+    "event_loop_lag_seconds", "事件循环调度延迟（秒）",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+event_loop_stalls_total = registry.counter(
+    "event_loop_stalls_total", "事件循环阻塞超过阈值的次数"
+)
+
+# 日志
+log_queue_depth = registry.gauge(
+    "log_queue_depth", "日志队列中等待写出的记录数"
+)
+log_records_dropped_total = registry.counter(
+    "log_records_dropped_total", "因日志队列已满而丢弃的记录数"
+)
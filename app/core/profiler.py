@@ -0,0 +1,228 @@
+"""
+采样分析器模块
+
+按固定间隔采集进程内所有线程的调用栈，包括：
+1. 事件循环线程
+2. run_in_executor 使用的线程池线程（ADB命令、文件操作等）
+3. 调度器及其他后台线程
+
+结果可以输出为火焰图工具使用的折叠栈格式，或 speedscope 的 JSON 格式。
+采样线程只在分析期间存在，未分析时没有任何开销。
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import PROJECT_DIR
+
+# 默认采样间隔（秒）
+DEFAULT_INTERVAL = 0.01
+
+# 折叠栈的帧：(函数名, 文件, 起始行号)
+Frame = Tuple[str, str, int]
+
+class ProfilerBusyError(Exception):
+    """已有采样正在进行"""
+    pass
+
+def _short_path(filename: str) -> str:
+    """项目内文件使用相对路径，其他文件只保留最后两级"""
+    try:
+        relative = os.path.relpath(filename, PROJECT_DIR)
+    except ValueError:
+        relative = filename
+    if not relative.startswith(".."):
+        return relative
+    return os.path.join(*filename.replace("\\", "/").split("/")[-2:])
+
+class SamplingProfiler:
+    """
+    采样分析器
+
+    属性:
+        interval (float): 采样间隔（秒）
+        samples (Counter): 每个 (线程名, 调用栈) 被采到的次数
+        duration (float): 实际采样时长（秒）
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.duration = 0.0
+        self._frames: Dict[object, Frame] = {}
+
+    def _frame(self, code) -> Frame:
+        """将代码对象转换为帧描述（按函数聚合）"""
+        frame = self._frames.get(code)
+        if frame is None:
+            frame = self._frames[code] = (
+                getattr(code, "co_qualname", code.co_name),
+                _short_path(code.co_filename),
+                code.co_firstlineno,
+            )
+        return frame
+
+    def sample(self):
+        """采集一次所有线程（不包括采样线程自身）的调用栈"""
+        own_ident = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            stack: List[Frame] = []
+            while frame is not None:
+                stack.append(self._frame(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.samples[(names.get(ident, f"thread-{ident}"), tuple(stack))] += 1
+
+    def run(self, seconds: float):
+        """
+        在当前线程中持续采样
+
+        Args:
+            seconds: 采样时长（秒）
+        """
+        started = time.perf_counter()
+        deadline = started + seconds
+        next_sample = started
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            if now >= next_sample:
+                self.sample()
+                next_sample += self.interval
+                if next_sample < now:
+                    # 采样本身耗时超过间隔时不补采
+                    next_sample = now + self.interval
+            time.sleep(max(0.0, min(next_sample, deadline) - time.perf_counter()))
+        self.duration = time.perf_counter() - started
+
+    def to_collapsed(self) -> str:
+        """
+        输出折叠栈格式（flamegraph.pl、speedscope、inferno 均可读取）
+
+        Returns:
+            str: 每行为 "线程;帧1;帧2;... 次数"
+        """
+        lines = []
+        for (thread_name, stack), count in self.samples.most_common():
+            parts = [thread_name.replace(";", ":").replace(" ", "_")] + [
+                f"{name} ({path}:{line})".replace(";", ":") for name, path, line in stack
+            ]
+            lines.append(f"{';'.join(parts)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def to_speedscope(self, name: str = "profile") -> dict:
+        """
+        输出 speedscope 文件格式，每个线程一个 sampled 类型的 profile
+
+        Args:
+            name: 文件名称
+
+        Returns:
+            dict: speedscope JSON
+        """
+        frame_index: Dict[Frame, int] = {}
+        frames: List[dict] = []
+        profiles: Dict[str, dict] = {}
+        for (thread_name, stack), count in self.samples.items():
+            indexes = []
+            for frame in stack:
+                index = frame_index.get(frame)
+                if index is None:
+                    index = frame_index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                indexes.append(index)
+            profile = profiles.setdefault(thread_name, {
+                "type": "sampled",
+                "name": thread_name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": 0,
+                "samples": [],
+                "weights": [],
+            })
+            profile["samples"].append(indexes)
+            profile["weights"].append(round(count * self.interval, 6))
+            profile["endValue"] = round(profile["endValue"] + count * self.interval, 6)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "device-data-api",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": list(profiles.values()),
+        }
+
+# 同一时间只允许一次采样
+_active: Optional[SamplingProfiler] = None
+_active_lock = threading.Lock()
+
+def profile(seconds: float, interval: float = DEFAULT_INTERVAL) -> SamplingProfiler:
+    """
+    在调用线程中采样指定时长（阻塞）
+
+    Args:
+        seconds: 采样时长（秒）
+        interval: 采样间隔（秒）
+
+    Returns:
+        SamplingProfiler: 已完成采样的分析器
+
+    Raises:
+        ProfilerBusyError: 已有采样正在进行
+    """
+    global _active
+    profiler = SamplingProfiler(interval)
+    with _active_lock:
+        if _active is not None:
+            raise ProfilerBusyError("已有采样正在进行")
+        _active = profiler
+    try:
+        profiler.run(seconds)
+        return profiler
+    finally:
+        with _active_lock:
+            _active = None
+
+async def profile_async(seconds: float, interval: float = DEFAULT_INTERVAL) -> SamplingProfiler:
+    """
+    在独立线程中采样，不占用事件循环和默认线程池
+
+    Args:
+        seconds: 采样时长（秒）
+        interval: 采样间隔（秒）
+
+    Returns:
+        SamplingProfiler: 已完成采样的分析器
+
+    Raises:
+        ProfilerBusyError: 已有采样正在进行
+    """
+    loop = asyncio.get_event_loop()
+    future = loop.create_future()
+
+    def resolve(result, error):
+        if not future.done():
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def target():
+        try:
+            result = profile(seconds, interval)
+        except Exception as e:
+            loop.call_soon_threadsafe(resolve, None, e)
+        else:
+            loop.call_soon_threadsafe(resolve, result, None)
+
+    threading.Thread(target=target, name="sampling-profiler", daemon=True).start()
+    return await future
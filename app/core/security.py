@@ -0,0 +1,32 @@
+"""
+安全模块
+
+提供管理接口的访问控制：请求头 X-Admin-Token 必须与配置的 ADMIN_TOKEN 一致，
+未配置 ADMIN_TOKEN 时所有管理接口均不可用。
+"""
+
+import hmac
+from typing import Optional
+from fastapi import Header, HTTPException, status
+from app.core.config import Settings
+
+async def require_admin(x_admin_token: Optional[str] = Header(None, alias="X-Admin-Token")):
+    """
+    校验管理员令牌的依赖项
+
+    Args:
+        x_admin_token: 请求头中的管理员令牌
+
+    Raises:
+        HTTPException: 管理接口未启用或令牌无效时返回 403
+    """
+    if not Settings.ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="管理接口未启用"
+        )
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, Settings.ADMIN_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="管理员令牌无效"
+        )
@@ -0,0 +1,375 @@
+"""
+链路追踪模块
+
+为一次上传从接收到发布的全过程记录耗时，包括：
+1. 每个 HTTP 请求生成一个追踪ID（或沿用请求头 traceparent 中的追踪ID）
+2. 通过 contextvars 在协程之间传递当前 span，上传处理、设备推送、ADB 命令等步骤记录为子 span
+3. 定时任务通过任务参数携带 traceparent，数小时后执行时仍归入同一条链路
+4. 结束的 span 由后台线程批量写入本地文件（每行一个 OTLP/JSON 的 ExportTraceServiceRequest）
+5. API 响应附带 Server-Timing 和 traceparent 响应头
+"""
+
+import inspect
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import Settings
+
+# span 类型（与 OTLP 的 SpanKind 取值一致）
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+
+# span 状态（与 OTLP 的 StatusCode 取值一致）
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+# 导出队列容量，队列已满时丢弃新的 span
+EXPORT_QUEUE_SIZE = 10000
+
+# 每次写入的最大 span 数
+EXPORT_BATCH_SIZE = 512
+
+# Server-Timing 中最多列出的条目数
+SERVER_TIMING_MAX_ENTRIES = 20
+
+# W3C traceparent: 版本-追踪ID-父spanID-标志
+TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+class Span:
+    """
+    一个计时区间
+
+    属性:
+        trace_id (str): 追踪ID（32位十六进制）
+        span_id (str): spanID（16位十六进制）
+        parent_span_id (Optional[str]): 父spanID
+        name (str): 名称
+        attributes (dict): 附加属性
+        root (Span): 本进程内所属链路的根 span，用于汇总 Server-Timing
+    """
+    __slots__ = ("trace_id", "span_id", "parent_span_id", "name", "kind", "start_ns", "end_ns",
+                 "attributes", "status", "status_message", "root", "timings")
+
+    def __init__(self, name: str, trace_id: str, parent_span_id: Optional[str],
+                 root: Optional["Span"], kind: int):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, object] = {}
+        self.status = STATUS_OK
+        self.status_message = ""
+        self.root = root or self
+        self.timings: List[Tuple[str, float]] = []
+
+    @property
+    def duration_ms(self) -> float:
+        """耗时（毫秒），未结束时计算到当前"""
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    @property
+    def traceparent(self) -> str:
+        """W3C traceparent 格式的上下文"""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set_attribute(self, key: str, value):
+        """设置附加属性"""
+        self.attributes[key] = value
+
+    def to_otlp(self) -> dict:
+        """转换为 OTLP/JSON 的 span 结构"""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": self.status},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+def _otlp_attribute(key: str, value) -> dict:
+    """转换为 OTLP/JSON 的属性结构"""
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+class SpanExporter:
+    """
+    本地文件导出器
+
+    结束的 span 放入有界队列，由后台线程批量写入文件，文件超过上限时轮转为 .1。
+    """
+
+    def __init__(self, path: Path, max_bytes: int):
+        """
+        初始化导出器
+
+        Args:
+            path: 导出文件路径
+            max_bytes: 单个文件的最大字节数
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=EXPORT_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        """提交一个已结束的 span"""
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        """启动写入线程"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+
+    def shutdown(self):
+        """写出队列中剩余的 span 并停止写入线程"""
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout=5)
+
+    def _run(self):
+        """写入线程主循环"""
+        while True:
+            span = self._queue.get()
+            if span is None:
+                return
+            batch = [span]
+            stop = False
+            while len(batch) < EXPORT_BATCH_SIZE:
+                try:
+                    span = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if span is None:
+                    stop = True
+                    break
+                batch.append(span)
+            try:
+                self._write(batch)
+            except Exception:
+                logging.getLogger(__name__).exception("写入追踪数据失败")
+            if stop:
+                return
+
+    def _write(self, batch: List[Span]):
+        """以一行 ExportTraceServiceRequest 写入一批 span"""
+        line = json.dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", Settings.TRACE_SERVICE_NAME)]},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [span.to_otlp() for span in batch]
+                }]
+            }]
+        }, ensure_ascii=False, separators=(',', ':'))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            if self.path.stat().st_size + len(line) > self.max_bytes:
+                os.replace(self.path, self.path.with_name(self.path.name + ".1"))
+        except FileNotFoundError:
+            pass
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+# 全局导出器
+exporter = SpanExporter(Settings.TRACE_EXPORT_PATH, Settings.TRACE_EXPORT_MAX_BYTES)
+
+def get_current_span() -> Optional[Span]:
+    """获取当前协程中正在进行的 span"""
+    return _current_span.get()
+
+def get_traceparent() -> Optional[str]:
+    """
+    获取当前 span 的 traceparent，用于跨任务传递
+
+    Returns:
+        Optional[str]: traceparent，没有进行中的 span 时返回None
+    """
+    span = _current_span.get()
+    return span.traceparent if span is not None else None
+
+def set_attribute(key: str, value):
+    """为当前 span 设置属性，没有进行中的 span 时忽略"""
+    span = _current_span.get()
+    if span is not None:
+        span.set_attribute(key, value)
+
+@contextmanager
+def start_span(name: str, traceparent: Optional[str] = None, kind: int = SPAN_KIND_INTERNAL,
+               **attributes) -> Iterator[Optional[Span]]:
+    """
+    开始一个 span，退出时结束并导出
+
+    Args:
+        name: span 名称
+        traceparent: 远程父上下文（来自请求头或定时任务参数），指定时开始一段新的本地链路
+        kind: span 类型
+        **attributes: 附加属性
+
+    Yields:
+        Optional[Span]: 当前 span，未启用追踪时为None
+    """
+    if not Settings.TRACING_ENABLED:
+        yield None
+        return
+
+    parent = _current_span.get()
+    match = TRACEPARENT.match(traceparent) if traceparent else None
+    if match:
+        span = Span(name, match.group(1), match.group(2), None, kind)
+    elif parent is not None:
+        span = Span(name, parent.trace_id, parent.span_id, parent.root, kind)
+    else:
+        span = Span(name, os.urandom(16).hex(), None, None, kind)
+    span.attributes.update(attributes)
+
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.status = STATUS_ERROR
+        span.status_message = str(e) or type(e).__name__
+        raise
+    finally:
+        span.end_ns = time.time_ns()
+        _current_span.reset(token)
+        if span.root is not span:
+            span.root.timings.append((span.name, span.duration_ms))
+        exporter.export(span)
+
+def traced(name: str):
+    """
+    将协程函数的每次调用记录为一个 span 的装饰器
+
+    被装饰函数有 device_name 参数时，其值记录为 span 的 device 属性。
+
+    Args:
+        name: span 名称
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        has_device = "device_name" in signature.parameters
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            attributes = {}
+            if has_device:
+                device_name = signature.bind_partial(*args, **kwargs).arguments.get("device_name")
+                if device_name is not None:
+                    attributes["device"] = device_name
+            with start_span(name, **attributes):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def format_server_timing(span: Span) -> str:
+    """
+    生成 Server-Timing 响应头
+
+    同名子 span 的耗时合并，按耗时降序列出，最后附上请求总耗时。
+
+    Args:
+        span: 请求的根 span
+
+    Returns:
+        str: Server-Timing 头的值
+    """
+    totals: Dict[str, List[float]] = {}
+    for name, duration in list(span.timings):
+        entry = totals.setdefault(name, [0.0, 0])
+        entry[0] += duration
+        entry[1] += 1
+    entries = sorted(totals.items(), key=lambda item: item[1][0], reverse=True)[:SERVER_TIMING_MAX_ENTRIES]
+    parts = [
+        f'{re.sub(r"[^A-Za-z0-9_.-]", "_", name)};dur={total:.1f}' + (f';desc="x{count}"' if count > 1 else "")
+        for name, (total, count) in entries
+    ]
+    parts.append(f"total;dur={span.duration_ms:.1f}")
+    return ", ".join(parts)
+
+class TracingMiddleware:
+    """
+    请求追踪中间件（ASGI）
+
+    为每个 HTTP 请求开始一个根 span，响应时附带 Server-Timing 和 traceparent 响应头。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not Settings.TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for key, value in scope.get("headers", []):
+            if key == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        with start_span(
+            f"{scope.get('method', '')} {scope.get('path', '')}",
+            traceparent=traceparent,
+            kind=SPAN_KIND_SERVER,
+            **{"http.method": scope.get("method", ""), "http.target": scope.get("path", "")}
+        ) as span:
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", format_server_timing(span).encode("latin-1")))
+                    headers.append((b"traceparent", span.traceparent.encode("latin-1")))
+                    message = dict(message, headers=headers)
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
+
+class TraceContextFilter(logging.Filter):
+    """为日志记录附加当前的追踪ID和spanID"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        span = _current_span.get()
+        if span is not None:
+            record.trace_id = span.trace_id
+            record.span_id = span.span_id
+        return True
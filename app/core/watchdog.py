@@ -0,0 +1,157 @@
+"""
+事件循环看门狗模块
+
+持续测量事件循环的调度延迟，定位阻塞事件循环的同步调用：
+1. 事件循环中的心跳任务按固定间隔唤醒，记录实际唤醒延迟
+2. 独立的看门狗线程检查心跳，超过阈值时采集事件循环线程的调用栈和正在运行的协程
+3. 阻塞记录写入日志，并保留最近的若干条供管理接口查询
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import List, Optional
+
+from app.core.config import Settings
+from app.core.metrics import event_loop_lag_seconds, event_loop_stalls_total
+
+logger = logging.getLogger(__name__)
+
+# 保留的阻塞记录条数
+STALL_HISTORY = 50
+
+class LoopWatchdog:
+    """
+    事件循环看门狗
+
+    属性:
+        interval (float): 心跳间隔（秒）
+        threshold (float): 阻塞阈值（秒）
+        stalls (deque): 最近的阻塞记录
+    """
+
+    def __init__(self, interval: float, threshold: float):
+        """
+        初始化看门狗
+
+        Args:
+            interval: 心跳间隔（秒）
+            threshold: 阻塞阈值（秒）
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.stalls: deque = deque(maxlen=STALL_HISTORY)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = 0.0
+        self._current_stall: Optional[dict] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """在当前事件循环中启动心跳任务和看门狗线程"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_event_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.ensure_future(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(f"事件循环看门狗已启动 - 心跳间隔: {self.interval}秒, 阈值: {self.threshold}秒")
+
+    async def stop(self):
+        """停止心跳任务和看门狗线程"""
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
+            self._thread = None
+
+    async def _heartbeat(self):
+        """心跳任务：测量每次唤醒相对预期时间的延迟"""
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            event_loop_lag_seconds.observe(lag)
+            self._last_beat = now
+
+            stall, self._current_stall = self._current_stall, None
+            if stall is not None:
+                stall["duration"] = round(lag, 3)
+                logger.warning(f"事件循环已恢复 - 阻塞 {lag:.3f} 秒, 协程: {stall['coroutine']}")
+
+    def _watch(self):
+        """看门狗线程：心跳超时时采集事件循环线程的现场"""
+        while not self._stop.wait(self.interval):
+            last_beat = self._last_beat
+            blocked = time.monotonic() - last_beat - self.interval
+            if blocked < self.threshold or self._current_stall is not None:
+                continue
+            stall = self._capture(blocked)
+            if self._last_beat != last_beat:
+                # 采集期间事件循环已经恢复，现场已不可信
+                continue
+            self._current_stall = stall
+            self.stalls.append(stall)
+            event_loop_stalls_total.inc()
+            logger.warning(
+                f"事件循环阻塞超过 {blocked:.3f} 秒 - 任务: {stall['task']}, 协程: {stall['coroutine']}\n"
+                f"{stall['stack']}"
+            )
+
+    def _capture(self, blocked: float) -> dict:
+        """
+        采集事件循环线程的调用栈和正在运行的协程
+
+        Args:
+            blocked: 已阻塞时长（秒）
+
+        Returns:
+            dict: 阻塞记录
+        """
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+        task_name = coroutine = None
+        try:
+            task = asyncio.current_task(self._loop)
+        except Exception:
+            task = None
+        if task is not None:
+            task_name = task.get_name()
+            coro = task.get_coro()
+            coroutine = getattr(coro, "__qualname__", repr(coro))
+        return {
+            "time": round(time.time() - blocked, 3),
+            "blocked": round(blocked, 3),
+            "duration": None,
+            "task": task_name,
+            "coroutine": coroutine,
+            "stack": stack,
+        }
+
+    def get_stalls(self) -> List[dict]:
+        """
+        获取最近的阻塞记录
+
+        Returns:
+            list: 阻塞记录，从新到旧；duration 为 None 表示仍在阻塞
+        """
+        return list(reversed(self.stalls))
+
+# 全局事件循环看门狗
+watchdog = LoopWatchdog(Settings.LOOP_WATCHDOG_INTERVAL, Settings.LOOP_STALL_THRESHOLD)
@@ -1,4 +1,4 @@
-from .adb import adb, ADBInterface, ADBException
+from .adb import adb, ADBInterface, ADBException, ADBTimeoutError, DeviceUnavailableError
 from .automation import AndroidAutomation
 
-__all__ = ['adb', 'ADBInterface', 'ADBException', 'AndroidAutomation'] 
\ No newline at end of file
+__all__ = ['adb', 'ADBInterface', 'ADBException', 'ADBTimeoutError', 'DeviceUnavailableError', 'AndroidAutomation'] 
\ No newline at end of file
@@ -5,21 +5,87 @@ ADB调试桥模块
 1. 设备连接管理
 2. ADB命令执行
 3. 异步通信支持
+4. 设备特性协商（adb features）和推送压缩选择
+5. 按设备和命令类别自适应的命令超时
+6. 设备熔断：不可用的设备直接拒绝命令，每台设备同时执行的命令数有上限
 """
 
 import subprocess
 import asyncio
 import logging
+import time
+import zlib
+import contextlib
 from typing import List, Set, Optional, Dict, Union
 from app.core.exceptions import ADBError
 from app.core.config import Settings
+from app.core.metrics import adb_command_duration_seconds
+from app.core.tracing import start_span
+from app.device.timeouts import command_timeouts, describe_command
+from app.device.breaker import device_breakers, is_device_failure_output
 
 logger = logging.getLogger(__name__)
 
+# 自动选择时的压缩算法优先级（需要设备支持 sendrecv_v2_算法 特性）
+COMPRESSION_ALGORITHMS = ("zstd", "lz4", "brotli")
+
+# 判断文件是否值得压缩时读取的样本大小
+COMPRESSION_SAMPLE_BYTES = 64 * 1024
+
+# 样本压缩后与原大小之比低于该值时视为可压缩
+COMPRESSIBLE_RATIO = 0.9
+
+# 小于该大小的文件不压缩
+COMPRESSION_MIN_BYTES = 16 * 1024
+
 class ADBException(Exception):
     """ADB操作异常"""
     pass
 
+class ADBTimeoutError(ADBException):
+    """ADB命令超时"""
+    pass
+
+class DeviceUnavailableError(ADBException):
+    """设备已熔断，命令未执行"""
+    pass
+
+def get_subcommand(cmd: List[str]) -> str:
+    """
+    获取ADB命令的子命令名称（跳过 -s 设备ID）
+
+    Args:
+        cmd: 完整命令列表
+
+    Returns:
+        str: 子命令名称，例如 push、shell、devices
+    """
+    args = cmd[1:]
+    if args[:1] == ['-s']:
+        args = args[2:]
+    return args[0] if args else ""
+
+def is_compressible(path: str) -> bool:
+    """
+    判断文件内容是否值得压缩传输
+
+    用快速压缩级别压缩文件开头的样本，JPEG、PNG 等已压缩格式几乎不会变小。
+
+    Args:
+        path: 本地文件路径
+
+    Returns:
+        bool: 样本压缩比低于 COMPRESSIBLE_RATIO 时返回True
+    """
+    try:
+        with open(path, "rb") as f:
+            sample = f.read(COMPRESSION_SAMPLE_BYTES)
+    except OSError:
+        return False
+    if len(sample) < COMPRESSION_MIN_BYTES:
+        return False
+    return len(zlib.compress(sample, 1)) < len(sample) * COMPRESSIBLE_RATIO
+
 class ADBInterface:
     """
     ADB调试桥接口类
@@ -32,6 +98,10 @@ class ADBInterface:
         self.adb_path = Settings.ADB_PATH or "adb"
         self.device_mapping = Settings.DEVICE_MAPPING
         self.connected_devices: Set[str] = set()
+        # 设备ID -> (特性集合, 查询时间)
+        self.device_features: Dict[str, tuple] = {}
+        # 设备ID -> 限制同时执行命令数的信号量，卡死的设备最多占用这么多个线程池线程
+        self._device_slots: Dict[str, asyncio.Semaphore] = {}
         
         # 启动ADB服务器并初始化设备列表
         self._start_adb_server()
@@ -69,12 +139,20 @@ class ADBInterface:
 
             # 解析ADB输出
             lines = result.stdout.strip().split('\n')[1:]  # 跳过标题行
+            previous = self.connected_devices
             self.connected_devices = {
                 line.split()[0] for line in lines 
                 if line.strip() and 'device' in line  # 过滤掉未授权设备
             }
+            # 断开的设备重新连接后可能换了系统或 adbd 版本，特性需要重新查询
+            for device_id in set(self.device_features) - self.connected_devices:
+                self.device_features.pop(device_id, None)
             
-            logger.info(f"当前连接的设备: {self.connected_devices}")
+            # 连接守护每隔几秒查询一次，只在设备列表变化时输出 INFO 日志
+            if self.connected_devices != previous:
+                logger.info(f"当前连接的设备: {self.connected_devices}")
+            else:
+                logger.debug(f"当前连接的设备: {self.connected_devices}")
             return self.connected_devices
 
         except Exception as e:
@@ -107,6 +185,8 @@ class ADBInterface:
     async def is_device_connected_async(self, device_name: str) -> bool:
         """
         异步检查指定设备是否在线
+
+        不在线只是查询结果，不计入熔断器：随后的重连命令会记录一次成功或失败。
         
         Args:
             device_name: 设备名称或别名
@@ -114,8 +194,10 @@ class ADBInterface:
         Returns:
             设备是否连接
         """
-        devices = await self.get_connected_devices_async()
         device_id = self._get_device_id(device_name)
+        if not device_breakers.allow(device_id):
+            return False
+        devices = await self.get_connected_devices_async()
         return device_id in devices
     
     async def connect_device_async(self, device_name: str) -> bool:
@@ -129,6 +211,9 @@ class ADBInterface:
             连接是否成功
         """
         device_id = self._get_device_id(device_name)
+        if not device_breakers.allow(device_id):
+            logger.warning(f"设备 {device_id} 已熔断，跳过连接")
+            return False
         
         # 检查设备是否已连接
         if await self.is_device_connected_async(device_name):
@@ -184,51 +269,188 @@ class ADBInterface:
         cmd = [self.adb_path, '-s', device_id] + command_args
         return await self._run_command_async(cmd)
     
-    async def _run_command_async(self, cmd: List[str]) -> str:
+    async def _run_command_async(self, cmd: List[str], timeout: Optional[float] = None, probe: bool = False) -> str:
         """
         异步执行命令的核心实现
         
+        超时时长由 command_timeouts 按设备和命令类别估计，命令结束后记录实际耗时。
+        设备已熔断时直接抛出 DeviceUnavailableError，不占用线程池；
+        超时和说明设备不可用的错误输出计入该设备的熔断器。
+        探测命令的结果不计入熔断器，由 DeviceBreakers.probe 根据探测结果决定状态。
+        
         Args:
             cmd: 完整命令列表
+            timeout: 指定超时时长（秒），None 时自动估计
+            probe: 是否为熔断探测命令（不受熔断限制，也不记录成功和失败）
             
         Returns:
             命令执行结果
             
         Raises:
+            DeviceUnavailableError: 设备已熔断
+            ADBTimeoutError: 命令执行超时
             ADBException: 命令执行失败
         """
         cmd_str = ' '.join(cmd)
-        logger.info(f"执行命令: {cmd_str}")
+        device_id, command_class, nbytes = describe_command(cmd)
+        if device_id and not probe and not device_breakers.allow(device_id):
+            raise DeviceUnavailableError(f"设备 {device_id} 已熔断，跳过命令: {cmd_str}")
         
-        try:
-            # 在异步环境中运行同步代码
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(None, lambda: subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=False,
-                timeout=30
-            ))
+        # 探测过程中记录成功会提前关闭熔断器并重置冷却时间，探测命令不记录
+        breaker_id = "" if probe else device_id
+        
+        logger.debug("执行命令: %s", cmd_str)
+        subcommand = get_subcommand(cmd)
+        if timeout is None:
+            timeout = command_timeouts.estimate(device_id, command_class, nbytes)
+        slot = self._device_slot(device_id)
+        with start_span(f"adb.{subcommand}", command=cmd_str, timeout=round(timeout, 3)):
+            # 排队等待设备信号量的时间不计入耗时，避免污染耗时指标和超时估计
+            started: Optional[float] = None
+            outcome = "error"
             
-            # 检查命令执行结果
-            if result.returncode != 0:
-                error_output = result.stderr or result.stdout or f"命令执行失败，返回码: {result.returncode}"
-                logger.error(f"命令执行失败: {error_output}")
-                raise ADBException(f"命令执行失败: {error_output}")
+            try:
+                async with slot:
+                    started = time.perf_counter()
+                    # 在异步环境中运行同步代码
+                    loop = asyncio.get_event_loop()
+                    result = await loop.run_in_executor(None, lambda: subprocess.run(
+                        cmd,
+                        capture_output=True,
+                        text=True,
+                        check=False,
+                        timeout=timeout
+                    ))
+                
+                # 检查命令执行结果
+                if result.returncode != 0:
+                    error_output = result.stderr or result.stdout or f"命令执行失败，返回码: {result.returncode}"
+                    logger.error(f"命令执行失败: {error_output}, 命令: {cmd_str}")
+                    if is_device_failure_output(error_output):
+                        device_breakers.record_failure(breaker_id, error_output.strip())
+                    else:
+                        device_breakers.record_success(breaker_id)
+                    raise ADBException(f"命令执行失败: {error_output}")
                 
-            return result.stdout.strip()
+                outcome = "success"
+                output = result.stdout.strip()
+                command_timeouts.record(device_id, command_class, time.perf_counter() - started, nbytes)
+                if subcommand == "connect" and is_device_failure_output(output):
+                    # adb connect 连接失败时返回码仍可能为0
+                    device_breakers.record_failure(breaker_id, output)
+                else:
+                    device_breakers.record_success(breaker_id)
+                return output
             
-        except subprocess.TimeoutExpired:
-            error_msg = f"命令执行超时: {cmd_str}"
-            logger.error(error_msg)
-            raise ADBException(error_msg)
-        except ADBException:
-            raise
-        except Exception as e:
-            error_msg = str(e) or f"未知错误 (类型: {type(e).__name__})"
-            logger.error(f"执行命令时发生错误: {error_msg}, 命令: {cmd_str}", exc_info=True)
-            raise ADBException(f"执行命令时出错: {error_msg}")
+            except subprocess.TimeoutExpired:
+                outcome = "timeout"
+                command_timeouts.record(device_id, command_class, timeout, nbytes, timed_out=True)
+                error_msg = f"命令执行超时（{timeout:.1f}秒）: {cmd_str}"
+                device_breakers.record_failure(breaker_id, error_msg)
+                logger.error(error_msg)
+                raise ADBTimeoutError(error_msg)
+            except ADBException:
+                raise
+            except Exception as e:
+                error_msg = str(e) or f"未知错误 (类型: {type(e).__name__})"
+                logger.error(f"执行命令时发生错误: {error_msg}, 命令: {cmd_str}", exc_info=True)
+                raise ADBException(f"执行命令时出错: {error_msg}")
+            finally:
+                if started is not None:
+                    adb_command_duration_seconds.labels(subcommand, outcome).observe(time.perf_counter() - started)
+
+    def _device_slot(self, device_id: str):
+        """获取设备的命令信号量（主机命令不限制）"""
+        if not device_id:
+            return contextlib.nullcontext()
+        slot = self._device_slots.get(device_id)
+        if slot is None:
+            slot = self._device_slots[device_id] = asyncio.Semaphore(Settings.ADB_MAX_INFLIGHT_PER_DEVICE)
+        return slot
+
+    async def probe_device_async(self, device_id: str) -> bool:
+        """
+        探测设备是否可用，供熔断器在后台调用
+        
+        TCP/IP 设备先执行一次 adb connect，然后检查 adb get-state 是否为 device。
+        
+        Args:
+            device_id: 设备ID
+            
+        Returns:
+            设备是否可用
+        """
+        timeout = Settings.BREAKER_PROBE_TIMEOUT
+        try:
+            if ":" in device_id:
+                await self._run_command_async([self.adb_path, 'connect', device_id], timeout=timeout, probe=True)
+            state = await self._run_command_async(
+                [self.adb_path, '-s', device_id, 'get-state'], timeout=timeout, probe=True
+            )
+        except ADBException as e:
+            logger.info(f"设备 {device_id} 探测失败: {str(e)}")
+            return False
+        return state.strip() == "device"
+
+    async def get_device_features_async(self, device_name: str, refresh: bool = False) -> Set[str]:
+        """
+        获取设备支持的 adb 特性，结果按设备缓存 Settings.ADB_FEATURES_TTL 秒
+        
+        adb features 返回的是主机端 adb 与设备端 adbd 都支持的特性。
+        
+        Args:
+            device_name: 设备名称或别名
+            refresh: 是否忽略缓存重新查询
+            
+        Returns:
+            特性集合，查询失败时返回空集合（不缓存）
+        """
+        device_id = self._get_device_id(device_name)
+        cached = self.device_features.get(device_id)
+        if cached and not refresh and time.monotonic() - cached[1] < Settings.ADB_FEATURES_TTL:
+            return cached[0]
+        
+        try:
+            output = await self.execute_device_command_async(device_name, ['features'])
+        except ADBException as e:
+            logger.warning(f"查询设备特性失败: {device_id}, {str(e)}")
+            return set()
+        
+        features = {line.strip() for line in output.splitlines() if line.strip()}
+        self.device_features[device_id] = (features, time.monotonic())
+        logger.info(f"设备 {device_id} 支持的特性: {', '.join(sorted(features))}")
+        return features
+    
+    async def get_push_options_async(self, device_name: str, local_path: str) -> List[str]:
+        """
+        根据设备特性和文件内容选择 push 的压缩参数
+        
+        只有设备支持 sendrecv_v2 时才传压缩参数：可压缩的文件使用 -z 算法，
+        已压缩的文件（例如 JPEG）使用 -Z 关闭 adb 默认的压缩，避免浪费两端的CPU。
+        
+        Args:
+            device_name: 设备名称或别名
+            local_path: 本地文件路径
+            
+        Returns:
+            push 子命令的参数，例如 ['-z', 'zstd']、['-Z'] 或 []
+        """
+        mode = Settings.ADB_PUSH_COMPRESSION
+        features = await self.get_device_features_async(device_name)
+        if "sendrecv_v2" not in features:
+            return []
+        if mode == "none":
+            return ['-Z']
+        
+        algorithms = COMPRESSION_ALGORITHMS if mode == "auto" else (mode,)
+        supported = [algorithm for algorithm in algorithms if f"sendrecv_v2_{algorithm}" in features]
+        if not supported:
+            return ['-Z']
+        
+        loop = asyncio.get_event_loop()
+        if not await loop.run_in_executor(None, is_compressible, local_path):
+            return ['-Z']
+        return ['-z', supported[0]]
     
     async def push_file_async(self, device_name: str, local_path: str, remote_path: str) -> bool:
         """
@@ -243,8 +465,15 @@ class ADBInterface:
             推送是否成功
         """
         try:
-            await self.execute_device_command_async(device_name, ['push', local_path, remote_path])
+            options = await self.get_push_options_async(device_name, local_path)
+            await self.execute_device_command_async(device_name, ['push', *options, local_path, remote_path])
             return True
+        except ADBTimeoutError as e:
+            logger.error(f"推送文件超时: {str(e)}")
+            # 回收器依赖本模块，在这里导入以避免循环导入
+            from app.services.reaper import reaper
+            reaper.schedule_remote_delete(device_name, [remote_path])
+            return False
         except Exception as e:
             logger.error(f"推送文件失败: {str(e)}")
             return False
@@ -9,12 +9,32 @@
 
 import logging
 import os
+import posixpath
+import re
 import time
 import uiautomator2 as u2
+from adbutils import AdbError
+from uiautomator2.exceptions import DeviceError as U2DeviceError
 from app.core.config import Settings
+from app.core.metrics import automation_share_intent_total
+from app.device.breaker import device_breakers
 
 logger = logging.getLogger(__name__)
 
+# 发布方式：通过分享 Intent 直接打开发布页，或在应用内的相册中选择图片
+# share 只用于单张图片（am start 无法传递 ACTION_SEND_MULTIPLE 需要的 Uri 列表），需在设备配置中逐台开启
+PUBLISH_MODE_SHARE = "share"
+PUBLISH_MODE_UI = "ui"
+
+# 媒体库中图片的 URI
+MEDIA_IMAGES_URI = "content://media/external/images/media"
+
+# content query 的输出行，例如 Row: 0 _id=1024, _data=/storage/emulated/0/Pictures/20240101000000/001.jpg
+MEDIA_ROW_PATTERN = re.compile(r"_id=(\d+), _data=(.+)$", re.MULTILINE)
+
+# 说明设备本身不可用（而不是页面元素找不到）的异常，计入设备熔断
+DEVICE_ERRORS = (U2DeviceError, AdbError, ConnectionError)
+
 class AndroidAutomation:
     def __init__(self, device_name: str):
         """
@@ -32,20 +52,224 @@ class AndroidAutomation:
         self.app_package = device_config.get('app_package', Settings.AUTOMATION_CONFIG['APP_PACKAGE'])
         self.lock_password = device_config['lock_password']
         self.wait_timeout = device_config.get('wait_timeout', Settings.AUTOMATION_CONFIG['WAIT_TIMEOUT'])
+        self.publish_mode = device_config.get('publish_mode', Settings.AUTOMATION_CONFIG['PUBLISH_MODE'])
+        self.share_activity = device_config.get('share_activity')
+        self.storage_path = device_config['storage_path']
         
         logger.info(f"初始化设备: {device_name} (ID: {self.device_id})")
-        logger.debug(f"使用配置 - 应用包名: {self.app_package}, 等待超时: {self.wait_timeout}秒")
+        logger.debug(f"使用配置 - 应用包名: {self.app_package}, 等待超时: {self.wait_timeout}秒, 发布方式: {self.publish_mode}")
 
     def connect_device(self):
         """连接设备"""
+        if not device_breakers.allow(self.device_id):
+            logger.warning(f"设备 {self.device_id} 已熔断，跳过连接")
+            return False
         try:
             self.d = u2.connect(self.device_id)
             logger.info(f"成功连接设备: {self.device_id}")
+            device_breakers.record_success(self.device_id)
             return True
         except Exception as e:
             logger.error(f"设备连接失败: {str(e)}")
+            if isinstance(e, DEVICE_ERRORS):
+                device_breakers.record_failure(self.device_id, str(e))
+            return False
+
+    def unlock_screen(self):
+        """
+        亮屏并输入锁屏密码解锁
+
+        Raises:
+            Exception: 密码输入失败
+        """
+        self.d.screen_on()
+        self.d.swipe(500, 2500, 500, 500, duration=1.0)
+        
+        # 添加等待和重试机制
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                # 等待密码输入界面
+                if self.d(resourceId="com.android.systemui:id/digit_text", text="0").exists(timeout=5):
+                    for digit in self.lock_password:
+                        self.d(resourceId="com.android.systemui:id/digit_text", text=str(digit)).click()
+                    break
+            except Exception as e:
+                if attempt == max_retries - 1:
+                    raise Exception(f"密码输入失败: {str(e)}")
+                time.sleep(1)
+
+    def select_images_in_app(self, time_str):
+        """
+        启动应用，在应用内的相册中进入时间文件夹并逐个选择图片
+
+        Args:
+            time_str: 时间文件夹名
+
+        Returns:
+            Optional[str]: 成功时返回None，失败时返回状态消息
+        """
+        max_retries = 3
+
+        # 启动应用
+        self.d.app_start(self.app_package)
+        self.d.wait_activity(self.app_package, timeout=self.wait_timeout)
+        logger.debug("应用启动成功")
+
+        # 点击发布按钮
+        self.d.xpath('//*[@content-desc="发布"]/android.widget.ImageView[1]').click()
+        logger.debug("点击发布按钮")
+
+        # 尝试多种方式点击"全部"按钮
+        try:
+            # 方式1：使用原有的xpath
+            all_photos = self.d.xpath('//*[@resource-id="android:id/content"]/android.widget.FrameLayout[1]/android.widget.FrameLayout[3]/android.widget.RelativeLayout[1]/android.widget.RelativeLayout[1]/android.widget.RelativeLayout[1]/android.widget.LinearLayout[1]')
+            if all_photos.exists:
+                all_photos.click()
+            else:
+                # 方式2：尝试使用文本定位
+                self.d(text="全部").click()
+        except Exception as e:
+            logger.error(f"点击'全部'按钮失败: {str(e)}")
+            return "SELECT_ALBUM_FAILED"
+        
+        logger.debug("点击'全部'按钮成功")
+
+        # 等待文件夹列表加载
+        time.sleep(1)
+
+        # 选择时间文件夹
+        logger.debug(f"准备选择文件夹: {time_str}")
+
+        # 添加重试机制选择文件夹
+        for attempt in range(max_retries):
+            try:
+                target_element = self.d(resourceId=f"{self.app_package}:id/-", text=time_str)
+                if target_element.exists(timeout=5):
+                    target_element.click()
+                    logger.debug(f"成功选择文件夹: {time_str}")
+                    break
+                else:
+                    # 如果找不到，尝试滚动列表
+                    self.d.swipe(500, 1000, 500, 200)
+                    time.sleep(0.5)
+            except Exception as e:
+                if attempt == max_retries - 1:
+                    logger.error(f"选择文件夹失败: {str(e)}")
+                    return "FOLDER_NOT_FOUND"
+                time.sleep(1)
+
+        self.d.wait_activity('', timeout=self.wait_timeout)
+
+        # 选择图片
+        base_xpath = '//androidx.viewpager.widget.ViewPager/androidx.recyclerview.widget.RecyclerView[1]/android.widget.FrameLayout[1]/androidx.recyclerview.widget.RecyclerView[1]/android.widget.FrameLayout[{}]/android.widget.FrameLayout[1]/android.widget.RelativeLayout[1]/android.widget.FrameLayout[1]/android.widget.FrameLayout[1]/android.widget.ImageView[1]'
+        
+        index = 1
+        while True:
+            xpath = base_xpath.format(index)
+            if self.d.xpath(xpath).exists:
+                logger.debug(f"选择第 {index} 张图片")
+                self.d.xpath(xpath).click()
+                index += 1
+            else:
+                logger.info(f"共选择 {index - 1} 张图片")
+                break
+
+        if index - 1 == 0:
+            logger.error("未能选择任何图片")
+            return "NO_IMAGES_SELECTED"
+
+        self.d.click(0.741, 0.964)  # 点击确认按钮
+        return None
+
+    def resolve_media_uris(self, remote_paths):
+        """
+        通过一次 content query 查询设备端图片在媒体库中的 URI
+
+        Args:
+            remote_paths: 设备端图片路径列表（同一目录下）
+
+        Returns:
+            Optional[List[str]]: 按 remote_paths 顺序排列的 URI，有图片尚未被媒体库收录时返回None
+        """
+        remote_dir = posixpath.dirname(remote_paths[0])
+        response = self.d.shell([
+            'content', 'query', '--uri', MEDIA_IMAGES_URI, '--projection', '_id:_data',
+            '--where', f"_data LIKE '{remote_dir}/%'"
+        ])
+        media_ids = {match.group(2).strip(): match.group(1) for match in MEDIA_ROW_PATTERN.finditer(response.output)}
+        missing = [path for path in remote_paths if path not in media_ids]
+        if missing:
+            logger.warning(f"{len(missing)} 张图片尚未被媒体库收录: {missing[:3]}")
+            return None
+        return [f"{MEDIA_IMAGES_URI}/{media_ids[path]}" for path in remote_paths]
+
+    def open_with_share_intent(self, time_str, image_paths):
+        """
+        通过分享 Intent 启动应用，应用直接打开带有图片的编辑页，不经过应用内的相册
+
+        am start 只能通过 --eu 传递单个 Uri，无法构造 ACTION_SEND_MULTIPLE 需要的 Uri 列表，
+        因此只用于单张图片（ACTION_SEND）；多张图片返回False，由调用方改为在应用内选择。
+
+        Args:
+            time_str: 时间文件夹名
+            image_paths: 本地图片路径列表
+
+        Returns:
+            bool: 应用是否已经打开并带有图片
+        """
+        if len(image_paths) != 1:
+            logger.debug(f"{len(image_paths)} 张图片无法通过 am start 分享，在应用内选择")
             return False
 
+        remote_dir = posixpath.join(self.storage_path, time_str)
+        remote_paths = [posixpath.join(remote_dir, os.path.basename(path)) for path in image_paths]
+        uris = self.resolve_media_uris(remote_paths)
+        if uris is None:
+            automation_share_intent_total.labels(self.device_name, "fallback").inc()
+            return False
+
+        # 应用有多个分享入口时可在设备配置中用 share_activity 指定，否则由系统按包名解析
+        target = ['-n', f"{self.app_package}/{self.share_activity}"] if self.share_activity else ['-p', self.app_package]
+        response = self.d.shell([
+            'am', 'start', '-W', '-a', 'android.intent.action.SEND', '-t', 'image/*', *target,
+            '--eu', 'android.intent.extra.STREAM', uris[0], '--grant-read-uri-permission', '-f', '0x10000000'
+        ])
+        if response.exit_code != 0 or 'Error' in response.output:
+            logger.warning(f"分享 Intent 启动失败: {response.output.strip()}")
+            automation_share_intent_total.labels(self.device_name, "fallback").inc()
+            return False
+        if self.d.app_current().get('package') != self.app_package:
+            logger.warning(f"分享 Intent 未打开应用 {self.app_package}")
+            automation_share_intent_total.labels(self.device_name, "fallback").inc()
+            return False
+
+        logger.debug(f"通过分享 Intent 打开发布页: {uris}")
+        automation_share_intent_total.labels(self.device_name, "opened").inc()
+        return True
+
+    def wait_share_landing(self):
+        """
+        等待分享 Intent 打开的页面
+
+        分享进入的页面取决于应用版本：可能先进入图片编辑页（需要点击下一步），
+        也可能直接进入笔记编辑页，两种都接受，不假设与应用内选择图片后的页面相同。
+
+        Returns:
+            Optional[str]: "preview"（图片编辑页）或 "editor"（笔记编辑页），超时返回None
+        """
+        next_button = self.d(resourceId=f"{self.app_package}:id/-", text="下一步")
+        publish_button = self.d(resourceId=f"{self.app_package}:id/-", text="发布笔记")
+        deadline = time.time() + self.wait_timeout
+        while True:
+            if next_button.exists:
+                return "preview"
+            if publish_button.exists:
+                return "editor"
+            if time.time() >= deadline:
+                return None
+            time.sleep(0.5)
+
     def post_content(self, title, content, image_paths):
         """
         发布内容
@@ -75,101 +299,32 @@ class AndroidAutomation:
             logger.debug(f"解析到的时间文件夹: {time_str}")
 
             # 解锁屏幕
-            self.d.screen_on()
-            self.d.swipe(500, 2500, 500, 500, duration=1.0)
-            
-            # 添加等待和重试机制
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    # 等待密码输入界面
-                    if self.d(resourceId="com.android.systemui:id/digit_text", text="0").exists(timeout=5):
-                        for digit in self.lock_password:
-                            self.d(resourceId="com.android.systemui:id/digit_text", text=str(digit)).click()
-                        break
-                except Exception as e:
-                    if attempt == max_retries - 1:
-                        raise Exception(f"密码输入失败: {str(e)}")
-                    time.sleep(1)
-
-            # 启动应用
-            self.d.app_start(self.app_package)
-            self.d.wait_activity(self.app_package, timeout=self.wait_timeout)
-            logger.debug("应用启动成功")
-
-            # 点击发布按钮
-            self.d.xpath('//*[@content-desc="发布"]/android.widget.ImageView[1]').click()
-            logger.debug("点击发布按钮")
-
-            # 尝试多种方式点击"全部"按钮
-            try:
-                # 方式1：使用原有的xpath
-                all_photos = self.d.xpath('//*[@resource-id="android:id/content"]/android.widget.FrameLayout[1]/android.widget.FrameLayout[3]/android.widget.RelativeLayout[1]/android.widget.RelativeLayout[1]/android.widget.RelativeLayout[1]/android.widget.LinearLayout[1]')
-                if all_photos.exists:
-                    all_photos.click()
-                else:
-                    # 方式2：尝试使用文本定位
-                    self.d(text="全部").click()
-            except Exception as e:
-                logger.error(f"点击'全部'按钮失败: {str(e)}")
-                return False, "SELECT_ALBUM_FAILED"
-            
-            logger.debug("点击'全部'按钮成功")
-
-            # 等待文件夹列表加载
-            time.sleep(1)
-
-            # 选择时间文件夹
-            logger.debug(f"准备选择文件夹: {time_str}")
-
-            # 添加重试机制选择文件夹
-            for attempt in range(max_retries):
-                try:
-                    target_element = self.d(resourceId=f"{self.app_package}:id/-", text=time_str)
-                    if target_element.exists(timeout=5):
-                        target_element.click()
-                        logger.debug(f"成功选择文件夹: {time_str}")
-                        break
-                    else:
-                        # 如果找不到，尝试滚动列表
-                        self.d.swipe(500, 1000, 500, 200)
-                        time.sleep(0.5)
-                except Exception as e:
-                    if attempt == max_retries - 1:
-                        logger.error(f"选择文件夹失败: {str(e)}")
-                        return False, "FOLDER_NOT_FOUND"
-                    time.sleep(1)
-
-            self.d.wait_activity('', timeout=self.wait_timeout)
-
-            # 选择图片
-            base_xpath = '//androidx.viewpager.widget.ViewPager/androidx.recyclerview.widget.RecyclerView[1]/android.widget.FrameLayout[1]/androidx.recyclerview.widget.RecyclerView[1]/android.widget.FrameLayout[{}]/android.widget.FrameLayout[1]/android.widget.RelativeLayout[1]/android.widget.FrameLayout[1]/android.widget.FrameLayout[1]/android.widget.ImageView[1]'
-            
-            index = 1
-            while True:
-                xpath = base_xpath.format(index)
-                if self.d.xpath(xpath).exists:
-                    logger.debug(f"选择第 {index} 张图片")
-                    self.d.xpath(xpath).click()
-                    index += 1
-                else:
-                    logger.info(f"共选择 {index - 1} 张图片")
-                    break
+            self.unlock_screen()
 
-            if index - 1 == 0:
-                logger.error("未能选择任何图片")
-                return False, "NO_IMAGES_SELECTED"
-
-            self.d.click(0.741, 0.964)  # 点击确认按钮
+            # 设备配置为 share 且只有一张图片时通过分享 Intent 直接打开发布页，否则在应用内的相册中选择图片
+            opened = False
+            if self.publish_mode == PUBLISH_MODE_SHARE:
+                opened = self.open_with_share_intent(time_str, image_paths)
+            if opened:
+                landing = self.wait_share_landing()
+                if landing is None:
+                    logger.error("分享 Intent 打开后找不到下一步按钮或笔记编辑页")
+                    return False, "NEXT_BUTTON_NOT_FOUND"
+            else:
+                status = self.select_images_in_app(time_str)
+                if status is not None:
+                    return False, status
+                landing = "preview"
 
-            # 点击下一步
-            next_button = self.d(resourceId=f"{self.app_package}:id/-", text="下一步")
-            if not next_button.exists(timeout=5):
-                logger.error("找不到下一步按钮")
-                return False, "NEXT_BUTTON_NOT_FOUND"
+            if landing == "preview":
+                # 点击下一步
+                next_button = self.d(resourceId=f"{self.app_package}:id/-", text="下一步")
+                if not next_button.exists(timeout=5):
+                    logger.error("找不到下一步按钮")
+                    return False, "NEXT_BUTTON_NOT_FOUND"
 
-            next_button.click()
-            logger.debug("点击下一步")
+                next_button.click()
+                logger.debug("点击下一步")
 
             # 根据是否有标题和正文来决定操作流程
             if title or content:
@@ -199,4 +354,6 @@ class AndroidAutomation:
 
         except Exception as e:
             logger.error(f"发布内容失败: {str(e)}")
+            if isinstance(e, DEVICE_ERRORS):
+                device_breakers.record_failure(self.device_id, str(e))
             return False, "AUTOMATION_FAILED" 
\ No newline at end of file
@@ -0,0 +1,229 @@
+"""
+设备熔断模块
+
+为每台设备维护一个熔断器，避免拔掉、未授权或卡死的设备拖慢所有相关任务：
+1. 关闭（closed）：正常执行，连续失败达到阈值后打开
+2. 打开（open）：直接拒绝该设备的ADB命令和 uiautomator2 连接，不占用线程池
+3. 半开（half_open）：冷却时间到期后由后台任务探测一次，成功则关闭，失败则重新打开并加倍冷却时间
+
+失败来自ADB命令（超时、设备不存在、离线、未授权）和 uiautomator2 的设备错误，
+普通的命令失败（例如删除不存在的文件）说明设备可以响应，不计入失败。
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from app.core.config import Settings
+from app.core.metrics import device_breaker_state, device_breaker_rejections_total
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# 状态对应的指标值
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# 说明设备不可用的ADB错误输出（小写）
+DEVICE_FAILURE_MARKERS = (
+    "not found",
+    "offline",
+    "unauthorized",
+    "no devices/emulators",
+    "device still authorizing",
+    "connection refused",
+    "connection reset",
+    "failed to connect",
+    "cannot connect",
+    "error: closed",
+    "protocol fault",
+)
+
+def is_device_failure_output(output: str) -> bool:
+    """
+    ADB命令的错误输出是否说明设备不可用
+
+    Args:
+        output: 命令的错误输出
+
+    Returns:
+        bool: 设备不存在、离线、未授权或连接断开时返回True
+    """
+    text = output.lower()
+    return any(marker in text for marker in DEVICE_FAILURE_MARKERS)
+
+class CircuitBreaker:
+    """
+    单台设备的熔断器
+
+    属性:
+        device_id (str): 设备ID
+        state (str): closed、open 或 half_open
+        failures (int): 连续失败次数
+        cooldown (float): 当前的冷却时间（秒）
+        retry_at (float): 打开状态下下次探测的时间（monotonic）
+        last_error (Optional[str]): 最近一次失败的原因
+    """
+
+    def __init__(self, device_id: str):
+        self.device_id = device_id
+        self.state = CLOSED
+        self.failures = 0
+        self.cooldown = Settings.BREAKER_COOLDOWN
+        self.retry_at = 0.0
+        self.opened_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def _set_state(self, state: str):
+        self.state = state
+        device_breaker_state.labels(self.device_id).set(STATE_VALUES[state])
+
+    def open(self, reason: str):
+        """打开熔断器，冷却时间后探测"""
+        if self.state == CLOSED:
+            logger.warning(f"设备 {self.device_id} 熔断 - 连续失败 {self.failures} 次, 原因: {reason}, {self.cooldown:.0f}秒后探测")
+            self.opened_at = time.time()
+        self._set_state(OPEN)
+        self.retry_at = time.monotonic() + self.cooldown
+
+    def close(self):
+        """关闭熔断器并重置计数"""
+        if self.state != CLOSED:
+            logger.info(f"设备 {self.device_id} 已恢复，熔断关闭")
+        self.failures = 0
+        self.cooldown = Settings.BREAKER_COOLDOWN
+        self.opened_at = None
+        self._set_state(CLOSED)
+
+    def to_dict(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "opened_at": self.opened_at,
+            "retry_in": max(0.0, self.retry_at - time.monotonic()) if self.state == OPEN else None,
+        }
+
+class DeviceBreakers:
+    """
+    所有设备的熔断器和后台探测任务
+
+    探测函数由 ADB 层在启动时传入（例如执行 adb get-state），返回设备是否可用。
+    uiautomator2 的自动化步骤在线程池中执行并记录成功和失败，状态变更由锁保护。
+    """
+
+    def __init__(self):
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self._probe: Optional[Callable[[str], Awaitable[bool]]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def get(self, device_id: str) -> CircuitBreaker:
+        breaker = self.breakers.get(device_id)
+        if breaker is None:
+            breaker = self.breakers.setdefault(device_id, CircuitBreaker(device_id))
+        return breaker
+
+    def allow(self, device_id: str) -> bool:
+        """
+        是否允许对设备执行操作（只读字典，不做任何IO）
+
+        Args:
+            device_id: 设备ID
+
+        Returns:
+            bool: 熔断器关闭时返回True；打开和半开时返回False
+        """
+        breaker = self.breakers.get(device_id)
+        if breaker is None or breaker.state == CLOSED:
+            return True
+        device_breaker_rejections_total.labels(device_id).inc()
+        return False
+
+    def record_success(self, device_id: str):
+        """记录一次成功的设备操作"""
+        breaker = self.breakers.get(device_id)
+        if breaker is not None and (breaker.failures or breaker.state != CLOSED):
+            with self._lock:
+                breaker.close()
+
+    def record_failure(self, device_id: str, reason: str):
+        """
+        记录一次说明设备不可用的失败
+
+        Args:
+            device_id: 设备ID
+            reason: 失败原因
+        """
+        if not device_id:
+            return
+        breaker = self.get(device_id)
+        with self._lock:
+            breaker.failures += 1
+            breaker.last_error = reason[:200]
+            if breaker.state == CLOSED and breaker.failures >= Settings.BREAKER_FAILURE_THRESHOLD:
+                breaker.open(reason)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """获取所有熔断器的状态"""
+        return {device_id: breaker.to_dict() for device_id, breaker in self.breakers.items()}
+
+    def start(self, probe: Callable[[str], Awaitable[bool]]):
+        """
+        启动后台探测任务（需在事件循环中调用）
+
+        Args:
+            probe: 探测函数，参数为设备ID，返回设备是否可用
+        """
+        self._probe = probe
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+            logger.info("设备熔断探测任务已启动")
+
+    async def stop(self):
+        """停止后台探测任务"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        """周期性地探测冷却时间已到的设备"""
+        while True:
+            await asyncio.sleep(Settings.BREAKER_PROBE_INTERVAL)
+            now = time.monotonic()
+            due = [b for b in self.breakers.values() if b.state == OPEN and b.retry_at <= now]
+            if due:
+                await asyncio.gather(*(self.probe(breaker) for breaker in due))
+
+    async def probe(self, breaker: CircuitBreaker) -> bool:
+        """
+        探测一台设备，成功时关闭熔断器，失败时加倍冷却时间后重新打开
+
+        Returns:
+            bool: 设备是否已恢复
+        """
+        with self._lock:
+            breaker._set_state(HALF_OPEN)
+        try:
+            healthy = await self._probe(breaker.device_id)
+        except Exception as e:
+            breaker.last_error = str(e)[:200]
+            healthy = False
+        with self._lock:
+            if healthy:
+                breaker.close()
+                return True
+            breaker.cooldown = min(breaker.cooldown * 2, Settings.BREAKER_MAX_COOLDOWN)
+            breaker.open(breaker.last_error or "探测失败")
+        return False
+
+# 全局设备熔断器
+device_breakers = DeviceBreakers()
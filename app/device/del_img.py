@@ -1,73 +1,73 @@
 import os
-import shutil
 from app.core.config import settings
 from app.core.config import UPLOAD_DIR
 import logging
-import asyncio
 from pathlib import Path
-from app.device.adb import adb
+from typing import Optional
+from app.utils.file_utils import move_to_trash
+from app.services.reaper import reaper
 
 logger = logging.getLogger(__name__)
 
 async def delete_device_album(device_name: str, album_name: str) -> bool:
     """
     删除指定设备的本地相册文件夹和设备端文件夹
-    
+
+    本地文件夹被原子地移入回收站后立即返回，真正的删除由后台回收器在线程中完成；
+    设备端文件的删除被登记给后台回收器，按设备合并后延迟执行。
+
     Args:
         device_name (str): 设备名称
         album_name (str): 相册文件夹名称
-        
+
     Returns:
         bool: 删除成功返回True，失败返回False
     """
     try:
-        success = True
-        
-        # 1. 删除本地文件夹
-        # 构建本地上传目录的路径
+        # 1. 将本地文件夹移入回收站
         local_album_path = UPLOAD_DIR / device_name / album_name
-        logger.info(f"准备删除本地文件夹: {local_album_path}")
-        
-        # 删除本地上传目录
-        if local_album_path.exists():
-            shutil.rmtree(local_album_path)
-            logger.info(f"成功删除本地文件夹: {local_album_path}")
-        else:
+        trash_path = move_to_trash(local_album_path)
+        if trash_path is None:
             logger.info(f"本地文件夹不存在，无需删除: {local_album_path}")
+            return True
+        logger.info(f"已将本地文件夹移入回收站: {local_album_path}")
+
+        # 2. 登记设备端文件删除
+        retire_remote_album(device_name, album_name, trash_path)
+        return True
 
-        # 2. 删除设备端文件夹
-        try:
-            # 检查设备是否在配置中
-            if device_name in settings.DEVICE_CONFIG:
-                # 获取设备存储路径
-                device_storage = settings.DEVICE_CONFIG[device_name]["storage_path"]
-                device_album_path = os.path.join(device_storage, album_name)
-                
-                # 检查设备连接状态
-                is_connected = await adb.is_device_connected_async(device_name)
-                
-                if is_connected:
-                    # 执行删除命令
-                    try:
-                        await adb.execute_device_command_async(
-                            device_name,
-                            ["shell", f"rm -rf '{device_album_path}'"]
-                        )
-                        logger.info(f"成功删除设备端文件夹: {device_album_path}")
-                    except Exception as e:
-                        logger.error(f"删除设备端文件夹失败: {str(e)}")
-                        success = False
-                else:
-                    logger.warning(f"设备 {device_name} 未连接，跳过设备端文件夹删除")
-            else:
-                logger.warning(f"设备 {device_name} 未在配置中找到，跳过设备端文件夹删除")
-                
-        except Exception as e:
-            logger.error(f"处理设备端文件夹时发生错误: {str(e)}")
-            success = False
-            
-        return success
-            
     except Exception as e:
         logger.error(f"删除相册时发生错误: {str(e)}")
         return False
+
+def retire_remote_album(device_name: str, album_name: str, trash_path: Path) -> Optional[int]:
+    """
+    根据已移入回收站的本地相册，登记设备端对应文件的延迟删除
+
+    只删除该相册推送过的文件，目录仅在为空时删除，
+    因此不会误删同名文件夹中随后推送的新文件。
+
+    Args:
+        device_name (str): 设备名称
+        album_name (str): 相册文件夹名称
+        trash_path (Path): 相册在回收站中的路径
+
+    Returns:
+        Optional[int]: 登记删除的文件数量，设备未配置时返回None
+    """
+    if device_name not in settings.DEVICE_CONFIG:
+        logger.warning(f"设备 {device_name} 未在配置中找到，跳过设备端文件夹删除")
+        return None
+
+    device_storage = settings.DEVICE_CONFIG[device_name]["storage_path"]
+    device_album_path = os.path.join(device_storage, album_name)
+    imgs_dir = trash_path / "imgs"
+    file_names = os.listdir(imgs_dir) if imgs_dir.exists() else []
+
+    reaper.schedule_remote_delete(
+        device_name,
+        [f"{device_album_path}/{name}" for name in file_names],
+        directory=device_album_path
+    )
+    logger.info(f"已登记设备端删除: {device_album_path} ({len(file_names)} 个文件)")
+    return len(file_names)
@@ -0,0 +1,333 @@
+"""
+设备健康状态模块
+
+推送和发布之前了解设备的状态：电量、屏幕和锁屏、各存储路径的剩余空间、前台应用和发布应用的版本。
+每台设备的所有信息由一次 adb shell 调用采集（多个 dumpsys 和 df 合并成一个脚本），
+结果按 DEVICE_HEALTH_TTL 缓存，同一设备的并发请求共享同一次采集。
+"""
+
+import asyncio
+import logging
+import re
+import shlex
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.core.config import Settings
+from app.core.metrics import device_battery_level, device_storage_free_bytes
+from app.device.adb import adb, ADBException, ADBTimeoutError, DeviceUnavailableError
+
+logger = logging.getLogger(__name__)
+
+# 采集脚本中各段输出的分隔标记
+SECTION_MARKER = "@@"
+
+# 说明处于锁屏状态的 dumpsys window 字段
+LOCKSCREEN_FLAGS = ("mDreamingLockscreen", "mShowingLockscreen", "isStatusBarKeyguard", "mKeyguardShowing")
+
+# dumpsys battery 的 status 字段
+BATTERY_STATUS = {"1": "unknown", "2": "charging", "3": "discharging", "4": "not_charging", "5": "full"}
+
+FOCUS_PATTERN = re.compile(r"mCurrentFocus=Window\{\S+ \S+ ([^/\s}]+)")
+
+def device_targets(device_id: str) -> Tuple[List[str], List[str]]:
+    """
+    获取需要采集的存储路径和应用包名
+
+    同一台设备可能对应多个设备名称（例如双系统），采集所有名称配置的路径和包名。
+
+    Args:
+        device_id: 设备ID
+
+    Returns:
+        tuple: (存储路径列表, 应用包名列表)，均已去重并保持配置顺序
+    """
+    paths: List[str] = []
+    packages: List[str] = []
+    for device_name, mapped_id in Settings.DEVICE_MAPPING.items():
+        if mapped_id != device_id or device_name not in Settings.DEVICE_CONFIG:
+            continue
+        config = Settings.DEVICE_CONFIG[device_name]
+        if config['storage_path'] not in paths:
+            paths.append(config['storage_path'])
+        package = config.get('app_package', Settings.AUTOMATION_CONFIG['APP_PACKAGE'])
+        if package not in packages:
+            packages.append(package)
+    return paths, packages
+
+def build_health_script(paths: List[str], packages: List[str]) -> str:
+    """
+    构建采集脚本
+
+    存储路径可能还没有创建，df 查询最近的已存在的上级目录。
+
+    Args:
+        paths: 存储路径列表
+        packages: 应用包名列表
+
+    Returns:
+        str: 在设备端 shell 中执行的脚本
+    """
+    lines = [
+        f"echo {SECTION_MARKER}battery; dumpsys battery",
+        f"echo {SECTION_MARKER}power; dumpsys power | grep -E 'mWakefulness=|Display Power: state='",
+        f"echo {SECTION_MARKER}window; dumpsys window | grep -E 'mCurrentFocus=|"
+        + "|".join(f"{flag}=" for flag in LOCKSCREEN_FLAGS) + "'",
+    ]
+    for index, path in enumerate(paths):
+        lines.append(
+            f"echo {SECTION_MARKER}df {index}; d={shlex.quote(path)}; "
+            f"while [ ! -e \"$d\" ]; do d=$(dirname \"$d\"); done; df -k \"$d\" | tail -n 1"
+        )
+    for package in packages:
+        lines.append(
+            f"echo {SECTION_MARKER}package {package}; dumpsys package {shlex.quote(package)} | grep -m 1 versionName"
+        )
+    # 最后一条 grep 没有匹配时退出码为1，不应视为采集失败
+    lines.append("true")
+    return "; ".join(lines)
+
+def split_sections(output: str) -> Dict[str, List[str]]:
+    """按分隔标记拆分采集脚本的输出"""
+    sections: Dict[str, List[str]] = {}
+    current: Optional[List[str]] = None
+    for line in output.splitlines():
+        if line.startswith(SECTION_MARKER):
+            current = sections.setdefault(line[len(SECTION_MARKER):].strip(), [])
+        elif current is not None and line.strip():
+            current.append(line.strip())
+    return sections
+
+def parse_battery(lines: List[str]) -> dict:
+    """解析 dumpsys battery"""
+    fields = {}
+    for line in lines:
+        key, sep, value = line.partition(":")
+        if sep:
+            fields[key.strip()] = value.strip()
+    level = fields.get("level")
+    temperature = fields.get("temperature")
+    return {
+        "level": int(level) if level and level.isdigit() else None,
+        "status": BATTERY_STATUS.get(fields.get("status", ""), "unknown"),
+        "plugged": any(fields.get(key) == "true" for key in ("AC powered", "USB powered", "Wireless powered")),
+        "temperature": int(temperature) / 10 if temperature and temperature.lstrip("-").isdigit() else None,
+    }
+
+def parse_screen(lines: List[str]) -> Optional[bool]:
+    """解析 dumpsys power，返回屏幕是否亮着（无法判断时为None）"""
+    for line in lines:
+        if "mWakefulness=" in line:
+            return line.split("mWakefulness=", 1)[1].split()[0] == "Awake"
+    for line in lines:
+        if "Display Power: state=" in line:
+            return line.split("state=", 1)[1].split()[0] == "ON"
+    return None
+
+def parse_window(lines: List[str]) -> Tuple[Optional[bool], Optional[str]]:
+    """
+    解析 dumpsys window
+
+    Returns:
+        tuple: (是否锁屏（无法判断时为None）, 前台窗口所属的包名)
+    """
+    locked: Optional[bool] = None
+    foreground: Optional[str] = None
+    for line in lines:
+        for flag in LOCKSCREEN_FLAGS:
+            match = re.search(rf"{flag}=(true|false)", line)
+            if match:
+                locked = bool(locked) or match.group(1) == "true"
+        match = FOCUS_PATTERN.search(line)
+        if match and foreground is None:
+            foreground = match.group(1)
+    return locked, foreground
+
+def parse_df(lines: List[str]) -> Optional[Dict[str, int]]:
+    """解析 df -k 的最后一行，返回总空间和可用空间（字节）"""
+    if not lines:
+        return None
+    fields = lines[-1].split()
+    try:
+        # 最后三列为 可用 使用率 挂载点（部分 df 会把过长的文件系统名单独放在一行）
+        return {"total_bytes": int(fields[-5]) * 1024, "free_bytes": int(fields[-3]) * 1024}
+    except (IndexError, ValueError):
+        return None
+
+def parse_version(lines: List[str]) -> Optional[str]:
+    """解析 dumpsys package 的 versionName"""
+    for line in lines:
+        if "versionName=" in line:
+            return line.split("versionName=", 1)[1].strip() or None
+    return None
+
+def parse_health(output: str, paths: List[str], packages: List[str]) -> dict:
+    """
+    解析采集脚本的输出
+
+    Args:
+        output: 采集脚本的输出
+        paths: 采集的存储路径列表
+        packages: 采集的应用包名列表
+
+    Returns:
+        dict: 设备健康状态
+    """
+    sections = split_sections(output)
+    locked, foreground = parse_window(sections.get("window", []))
+    return {
+        "battery": parse_battery(sections.get("battery", [])),
+        "screen_on": parse_screen(sections.get("power", [])),
+        "locked": locked,
+        "foreground_package": foreground,
+        "storage": {path: parse_df(sections.get(f"df {index}", [])) for index, path in enumerate(paths)},
+        "app_versions": {package: parse_version(sections.get(f"package {package}", [])) for package in packages},
+    }
+
+class DeviceHealthCollector:
+    """
+    设备健康状态采集器
+
+    属性:
+        cache (dict): 设备ID -> (健康状态, 采集时间（monotonic）)
+    """
+
+    def __init__(self):
+        """初始化采集器"""
+        self.cache: Dict[str, Tuple[dict, float]] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # 空间检查无法获取健康状态的设备名称，只在状态变化时输出日志
+        self._unavailable: Set[str] = set()
+
+    async def collect(self, device_id: str) -> dict:
+        """
+        采集一台设备的健康状态（一次 adb shell 调用）
+
+        Args:
+            device_id: 设备ID
+
+        Returns:
+            dict: 健康状态
+
+        Raises:
+            ADBException: 采集命令执行失败
+        """
+        paths, packages = device_targets(device_id)
+        output = await adb.execute_device_command_async(device_id, ['shell', build_health_script(paths, packages)])
+        health = parse_health(output, paths, packages)
+        health["collected_at"] = time.time()
+        self.cache[device_id] = (health, time.monotonic())
+
+        if health["battery"]["level"] is not None:
+            device_battery_level.labels(device_id).set(health["battery"]["level"])
+        for path, storage in health["storage"].items():
+            if storage is not None:
+                device_storage_free_bytes.labels(device_id, path).set(storage["free_bytes"])
+        return health
+
+    async def get_device_health(self, device_id: str, refresh: bool = False) -> dict:
+        """
+        获取设备健康状态，缓存未过期时直接返回
+
+        Args:
+            device_id: 设备ID
+            refresh: 是否忽略缓存重新采集
+
+        Returns:
+            dict: 健康状态
+
+        Raises:
+            ADBException: 采集命令执行失败
+        """
+        cached = self.cache.get(device_id)
+        if not refresh and cached is not None and time.monotonic() - cached[1] < Settings.DEVICE_HEALTH_TTL:
+            return cached[0]
+        task = self._inflight.get(device_id)
+        if task is None:
+            task = self._inflight[device_id] = asyncio.ensure_future(self.collect(device_id))
+            task.add_done_callback(lambda _: self._inflight.pop(device_id, None))
+        # 调用方超时取消时不中断采集，结果仍会写入缓存
+        return await asyncio.shield(task)
+
+    async def get(self, device_name: str, refresh: bool = False) -> dict:
+        """
+        获取设备名称对应的健康状态
+
+        Args:
+            device_name: 设备名称
+            refresh: 是否忽略缓存重新采集
+
+        Returns:
+            dict: 健康状态，storage 和 app_version 只包含该设备名称配置的存储路径和应用
+
+        Raises:
+            ADBException: 采集命令执行失败
+        """
+        device_id = Settings.DEVICE_MAPPING[device_name]
+        health = await self.get_device_health(device_id, refresh)
+        config = Settings.DEVICE_CONFIG[device_name]
+        package = config.get('app_package', Settings.AUTOMATION_CONFIG['APP_PACKAGE'])
+        storage = health["storage"].get(config['storage_path'])
+        return {
+            "device_id": device_id,
+            "collected_at": health["collected_at"],
+            "age": round(time.time() - health["collected_at"], 1),
+            "battery": health["battery"],
+            "screen_on": health["screen_on"],
+            "locked": health["locked"],
+            "foreground_package": health["foreground_package"],
+            "storage": dict(storage or {}, path=config['storage_path']),
+            "app": {"package": package, "version": health["app_versions"].get(package)},
+        }
+
+    async def check_capacity(self, device_name: str, nbytes: int, wait: Optional[float] = None,
+                             refresh: bool = False) -> Optional[str]:
+        """
+        检查设备存储路径是否放得下指定大小的内容
+
+        无法及时获取健康状态（设备熔断、离线、采集超时）时不做判断，由推送阶段处理。
+        每次上传都会检查，同一设备连续失败只在第一次输出警告。
+
+        Args:
+            device_name: 设备名称
+            nbytes: 需要写入的字节数
+            wait: 等待采集的最长时间（秒），None 表示一直等待
+            refresh: 是否忽略缓存重新采集
+
+        Returns:
+            Optional[str]: 放不下时返回原因，否则返回None
+        """
+        try:
+            health = await asyncio.wait_for(self.get(device_name, refresh), wait)
+        except DeviceUnavailableError:
+            # 熔断器已经记录了设备不可用，不重复输出
+            logger.debug(f"设备 {device_name} 已熔断，跳过空间检查")
+            return None
+        except (ADBException, asyncio.TimeoutError) as e:
+            # 异常信息包含整个采集脚本，只输出原因
+            if isinstance(e, (ADBTimeoutError, asyncio.TimeoutError)):
+                reason = "采集超时"
+            else:
+                reason = str(e).splitlines()[0][:200] if str(e) else type(e).__name__
+            if device_name not in self._unavailable:
+                self._unavailable.add(device_name)
+                logger.warning(f"无法获取设备 {device_name} 的健康状态，跳过空间检查: {reason}")
+            else:
+                logger.debug(f"无法获取设备 {device_name} 的健康状态，跳过空间检查: {reason}")
+            return None
+        if device_name in self._unavailable:
+            self._unavailable.discard(device_name)
+            logger.info(f"设备 {device_name} 的健康状态已恢复，继续检查存储空间")
+        free = health["storage"].get("free_bytes")
+        if free is None:
+            return None
+        available = free - Settings.DEVICE_MIN_FREE_BYTES
+        if nbytes > available:
+            return (
+                f"设备 {device_name} 存储空间不足: 需要 {nbytes / 1024 / 1024:.1f}MB, "
+                f"可用 {max(available, 0) / 1024 / 1024:.1f}MB（保留 {Settings.DEVICE_MIN_FREE_BYTES / 1024 / 1024:.0f}MB）"
+            )
+        return None
+
+# 全局设备健康状态采集器
+device_health = DeviceHealthCollector()
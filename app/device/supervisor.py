@@ -0,0 +1,218 @@
+"""
+Wi-Fi ADB 连接守护模块
+
+为 DEVICE_MAPPING 中通过 TCP/IP 连接的设备（设备ID形如 IP:端口）维持连接：
+1. 保活：在线设备超过 ADB_KEEPALIVE_INTERVAL 没有保活时执行一条轻量命令，避免路由器或设备回收空闲连接
+2. 重连：设备掉线后按指数退避执行 adb connect，残留的离线连接先 adb disconnect
+3. 预连接：定时任务开始前 ADB_PRECONNECT_LEAD 秒内忽略退避立即重连并保活，任务开始时连接已经就绪
+
+熔断打开的设备由熔断器的后台探测负责重连，守护任务不重复处理。
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Set
+
+from app.core.config import Settings
+from app.core.metrics import device_connected, device_reconnects_total
+from app.device.adb import adb, ADBException
+from app.device.breaker import device_breakers
+from app.scheduler.scheduler import scheduler
+
+logger = logging.getLogger(__name__)
+
+def tcp_devices() -> Dict[str, str]:
+    """
+    获取需要守护的 TCP/IP 设备
+
+    Returns:
+        dict: 设备ID -> 设备名称（同一设备的多个名称只保留第一个）
+    """
+    devices: Dict[str, str] = {}
+    for device_name, device_id in Settings.DEVICE_MAPPING.items():
+        if ":" in device_id:
+            devices.setdefault(device_id, device_name)
+    return devices
+
+class DeviceConnection:
+    """
+    单台设备的连接状态
+
+    属性:
+        device_id (str): 设备ID
+        connected (bool): 最近一次检查时是否在线
+        last_keepalive (float): 最近一次保活成功的时间（monotonic）
+        backoff (float): 当前的重连退避时长（秒）
+        next_attempt (float): 下次允许重连的时间（monotonic）
+        attempts (int): 本次掉线以来的重连次数
+    """
+
+    def __init__(self, device_id: str):
+        self.device_id = device_id
+        self.connected = False
+        self.last_keepalive = 0.0
+        self.backoff = Settings.ADB_RECONNECT_BACKOFF_MIN
+        self.next_attempt = 0.0
+        self.attempts = 0
+
+    def to_dict(self) -> dict:
+        now = time.monotonic()
+        return {
+            "connected": self.connected,
+            "keepalive_age": round(now - self.last_keepalive, 1) if self.last_keepalive else None,
+            "reconnect_attempts": self.attempts,
+            "next_attempt_in": round(max(0.0, self.next_attempt - now), 1) if not self.connected else None,
+        }
+
+class ConnectionSupervisor:
+    """
+    TCP/IP 设备连接守护任务
+
+    每 ADB_SUPERVISOR_INTERVAL 秒执行一次 adb devices，对每台设备保活或重连。
+    """
+
+    def __init__(self):
+        """初始化守护任务"""
+        self.connections: Dict[str, DeviceConnection] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """启动守护任务（需在事件循环中调用）"""
+        if not tcp_devices():
+            logger.info("没有 TCP/IP 设备，跳过连接守护")
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+            logger.info("Wi-Fi ADB 连接守护任务已启动")
+
+    async def stop(self):
+        """停止守护任务"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        """周期性地检查所有 TCP/IP 设备"""
+        while True:
+            try:
+                await self.check_all()
+            except Exception as e:
+                logger.error(f"连接守护检查失败: {str(e)}", exc_info=True)
+            await asyncio.sleep(Settings.ADB_SUPERVISOR_INTERVAL)
+
+    def upcoming_devices(self) -> Set[str]:
+        """
+        获取即将执行定时任务的设备
+
+        Returns:
+            set: ADB_PRECONNECT_LEAD 秒内有定时任务的设备ID
+        """
+        deadline = datetime.now(tz=Settings.SCHEDULER_TIMEZONE) + timedelta(seconds=Settings.ADB_PRECONNECT_LEAD)
+        devices = set()
+        for job in scheduler.get_jobs():
+            device_name = job.kwargs.get("device_name")
+            if device_name and job.next_run_time is not None and job.next_run_time <= deadline:
+                devices.add(Settings.DEVICE_MAPPING.get(device_name, device_name))
+        return devices
+
+    async def check_all(self):
+        """检查一次所有 TCP/IP 设备：一次 adb devices，然后并发保活或重连"""
+        devices = tcp_devices()
+        online = await adb.get_connected_devices_async()
+        upcoming = self.upcoming_devices() if scheduler.running else set()
+        await asyncio.gather(*(
+            self.check(device_id, device_id in online, device_id in upcoming)
+            for device_id in devices
+        ))
+
+    async def check(self, device_id: str, online: bool, upcoming: bool = False):
+        """
+        检查一台设备
+
+        Args:
+            device_id: 设备ID
+            online: 是否在 adb devices 的在线列表中
+            upcoming: 是否即将执行定时任务（忽略退避和保活间隔）
+        """
+        connection = self.connections.get(device_id)
+        if connection is None:
+            connection = self.connections[device_id] = DeviceConnection(device_id)
+        if not device_breakers.allow(device_id):
+            self._set_connected(connection, False)
+            return
+
+        now = time.monotonic()
+        if online:
+            self._set_connected(connection, True)
+            if upcoming or now - connection.last_keepalive >= Settings.ADB_KEEPALIVE_INTERVAL:
+                await self.keepalive(connection)
+            return
+
+        self._set_connected(connection, False)
+        if upcoming or now >= connection.next_attempt:
+            if upcoming and connection.attempts:
+                logger.info(f"设备 {device_id} 即将执行定时任务，立即重连")
+            await self.reconnect(connection)
+
+    def _set_connected(self, connection: DeviceConnection, connected: bool):
+        if connection.connected and not connected:
+            logger.warning(f"设备 {connection.device_id} 连接已断开")
+        connection.connected = connected
+        device_connected.labels(connection.device_id).set(1 if connected else 0)
+
+    async def keepalive(self, connection: DeviceConnection):
+        """执行一条轻量的设备端命令，保持 TCP 连接活跃"""
+        try:
+            await adb.execute_device_command_async(connection.device_id, ['shell', 'true'])
+            connection.last_keepalive = time.monotonic()
+        except ADBException as e:
+            logger.warning(f"设备 {connection.device_id} 保活失败: {str(e)}")
+            self._set_connected(connection, False)
+
+    async def reconnect(self, connection: DeviceConnection) -> bool:
+        """
+        重连一台设备，失败时加倍退避时长
+
+        Returns:
+            bool: 是否重连成功
+        """
+        device_id = connection.device_id
+        connection.attempts += 1
+        try:
+            output = await adb.execute_adb_command_async(['connect', device_id])
+            if "already connected" in output:
+                # adb 仍保留着离线的旧连接，断开后重新连接
+                await adb.execute_adb_command_async(['disconnect', device_id])
+                output = await adb.execute_adb_command_async(['connect', device_id])
+            success = "connected to" in output and device_id in await adb.get_connected_devices_async()
+        except ADBException as e:
+            output = str(e)
+            success = False
+
+        if success:
+            logger.info(f"设备 {device_id} 重连成功（第 {connection.attempts} 次尝试）")
+            device_reconnects_total.labels(device_id, "success").inc()
+            self._set_connected(connection, True)
+            connection.last_keepalive = time.monotonic()
+            connection.backoff = Settings.ADB_RECONNECT_BACKOFF_MIN
+            connection.attempts = 0
+            return True
+
+        device_reconnects_total.labels(device_id, "failure").inc()
+        connection.next_attempt = time.monotonic() + connection.backoff
+        logger.warning(f"设备 {device_id} 重连失败: {output.strip()}, {connection.backoff:.0f}秒后重试")
+        connection.backoff = min(connection.backoff * 2, Settings.ADB_RECONNECT_BACKOFF_MAX)
+        return False
+
+    def snapshot(self) -> Dict[str, dict]:
+        """获取所有设备的连接状态"""
+        return {device_id: connection.to_dict() for device_id, connection in self.connections.items()}
+
+# 全局连接守护任务
+connection_supervisor = ConnectionSupervisor()
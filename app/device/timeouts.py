@@ -0,0 +1,203 @@
+"""
+ADB命令超时估计模块
+
+按设备和命令类别（push、connect 等子命令，shell 按设备端命令细分为 shell:mkdir、shell:rm 等）估计每条 ADB 命令的超时：
+1. push：按文件大小和该设备实测吞吐量（EWMA）计算预计耗时
+2. 其他命令：按该设备同类命令最近耗时的分位数计算
+3. 样本不足时使用默认超时，所有结果限制在最小值和最大值之间
+
+超时的命令也作为样本记录（耗时至少为超时时长），之后的估计会相应放宽。
+"""
+
+import logging
+import os
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import Settings
+from app.core.metrics import adb_command_timeout_seconds
+
+logger = logging.getLogger(__name__)
+
+# 每个设备每类命令保留的耗时样本数
+SAMPLE_WINDOW = 100
+
+# 按分位数估计前至少需要的样本数
+MIN_SAMPLES = 5
+
+# 小于该大小的推送主要受命令延迟影响，不计入吞吐量
+THROUGHPUT_MIN_BYTES = 64 * 1024
+
+# 没有延迟样本时假设的单条命令固定开销（秒）
+DEFAULT_COMMAND_LATENCY = 1.0
+
+def percentile(samples, q: float) -> float:
+    """
+    计算分位数（线性插值）
+
+    Args:
+        samples: 样本
+        q: 分位（0~100）
+
+    Returns:
+        float: 分位数，没有样本时返回0
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def describe_command(cmd: List[str]) -> Tuple[str, str, int]:
+    """
+    解析 ADB 命令
+
+    Args:
+        cmd: 完整命令列表，例如 [adb, -s, 设备ID, push, -Z, 本地文件, 设备端路径]
+
+    Returns:
+        tuple: (设备ID（主机命令为空字符串）, 命令类别, push 的本地文件总字节数)
+            命令类别为子命令，shell 命令附加设备端命令的第一个词，例如 shell:mkdir
+    """
+    args = cmd[1:]
+    device_id = ""
+    if args[:1] == ['-s'] and len(args) >= 2:
+        device_id, args = args[1], args[2:]
+    if not args:
+        return device_id, "", 0
+    subcommand, args = args[0], args[1:]
+    if subcommand == "connect" and args:
+        device_id = args[0]
+    if subcommand == "shell" and args:
+        # 不同的设备端命令耗时差别很大（mkdir 与 dumpsys），分别统计
+        words = args[0].split()
+        if words:
+            subcommand = f"shell:{os.path.basename(words[0])}"
+
+    nbytes = 0
+    if subcommand == "push":
+        sources = []
+        i = 0
+        while i < len(args):
+            if args[i] == "-z":
+                i += 2
+                continue
+            if not args[i].startswith("-"):
+                sources.append(args[i])
+            i += 1
+        for path in sources[:-1]:
+            try:
+                nbytes += os.path.getsize(path)
+            except OSError:
+                pass
+    return device_id, subcommand, nbytes
+
+class CommandTimeouts:
+    """
+    按设备和命令类别估计超时
+
+    属性:
+        samples (dict): (设备ID, 命令类别) -> 最近的耗时样本（秒）
+        throughput (dict): 设备ID -> 推送吞吐量的EWMA（字节/秒）
+    """
+
+    def __init__(self):
+        """初始化估计器"""
+        self.samples: Dict[Tuple[str, str], deque] = {}
+        self.throughput: Dict[str, float] = {}
+
+    def _clamp(self, value: float) -> float:
+        return max(Settings.ADB_TIMEOUT_MIN, min(Settings.ADB_TIMEOUT_MAX, value))
+
+    def _latency(self, device_id: str, subcommand: str) -> Optional[float]:
+        """同类命令耗时的分位数，样本不足时返回None"""
+        samples = self.samples.get((device_id, subcommand))
+        if not samples or len(samples) < MIN_SAMPLES:
+            return None
+        return percentile(samples, Settings.ADB_TIMEOUT_PERCENTILE)
+
+    def _shell_latency(self, device_id: str) -> Optional[float]:
+        """设备端命令的固定开销：各类 shell 命令耗时分位数中的最小值，样本不足时返回None"""
+        latencies = [
+            self._latency(device_id, subcommand)
+            for (sample_device, subcommand) in self.samples
+            if sample_device == device_id and subcommand.startswith("shell:")
+        ]
+        latencies = [latency for latency in latencies if latency is not None]
+        return min(latencies) if latencies else None
+
+    def estimate(self, device_id: str, subcommand: str, nbytes: int = 0) -> float:
+        """
+        估计命令的超时时长
+
+        Args:
+            device_id: 设备ID
+            subcommand: 命令类别（describe_command 的返回值）
+            nbytes: push 的字节数
+
+        Returns:
+            float: 超时时长（秒）
+        """
+        if subcommand == "push":
+            throughput = self.throughput.get(device_id)
+            if throughput is None:
+                # 还没有吞吐量样本：按最低带宽估计，避免慢速链路上的大文件推送被中途杀掉
+                timeout = max(Settings.ADB_TIMEOUT_DEFAULT, nbytes / Settings.ADB_PUSH_MIN_THROUGHPUT)
+            else:
+                latency = self._shell_latency(device_id) or DEFAULT_COMMAND_LATENCY
+                timeout = Settings.ADB_TIMEOUT_MULTIPLIER * (latency + nbytes / throughput)
+        else:
+            latency = self._latency(device_id, subcommand)
+            if latency is None:
+                timeout = Settings.ADB_TIMEOUT_DEFAULT
+            else:
+                timeout = Settings.ADB_TIMEOUT_MULTIPLIER * latency
+
+        timeout = self._clamp(timeout)
+        adb_command_timeout_seconds.labels(device_id, subcommand).set(timeout)
+        return timeout
+
+    def record(self, device_id: str, subcommand: str, elapsed: float, nbytes: int = 0, timed_out: bool = False):
+        """
+        记录一次命令的耗时
+
+        Args:
+            device_id: 设备ID
+            subcommand: 命令类别（describe_command 的返回值）
+            elapsed: 耗时（秒），超时时为超时时长
+            nbytes: push 的字节数
+            timed_out: 是否超时
+        """
+        self.samples.setdefault((device_id, subcommand), deque(maxlen=SAMPLE_WINDOW)).append(elapsed)
+        if subcommand != "push" or nbytes < THROUGHPUT_MIN_BYTES or elapsed <= 0:
+            return
+
+        # 超时的推送只能说明吞吐量不高于 nbytes / elapsed，同样计入 EWMA 使估计向下调整
+        sample = nbytes / elapsed
+        current = self.throughput.get(device_id)
+        alpha = Settings.ADB_THROUGHPUT_EWMA_ALPHA
+        self.throughput[device_id] = sample if current is None else alpha * sample + (1 - alpha) * current
+        if timed_out:
+            logger.warning(
+                f"设备 {device_id} 推送超时，吞吐量估计下调为 {self.throughput[device_id] / 1024:.0f}KB/s"
+            )
+
+    def snapshot(self) -> dict:
+        """
+        获取当前的估计状态
+
+        Returns:
+            dict: {设备ID: {"throughput": 字节/秒, "latency": {命令类别: 分位数}}}
+        """
+        result: Dict[str, dict] = {}
+        for (device_id, subcommand) in self.samples:
+            latency = self._latency(device_id, subcommand)
+            entry = result.setdefault(device_id, {"throughput": self.throughput.get(device_id), "latency": {}})
+            if latency is not None:
+                entry["latency"][subcommand] = latency
+        return result
+
+# 全局超时估计器
+command_timeouts = CommandTimeouts()
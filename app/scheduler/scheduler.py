@@ -17,9 +17,11 @@ from apscheduler.triggers.date import DateTrigger
 from datetime import datetime
 import logging
 from app.core.config import Settings, SHANGHAI_TIMEZONE
+from app.core.metrics import scheduler_jobs_pending
 
 logger = logging.getLogger(__name__)
 scheduler = AsyncIOScheduler(timezone=SHANGHAI_TIMEZONE)
+scheduler_jobs_pending.set_function(lambda: len(scheduler.get_jobs()))
 
 def start_scheduler():
     """
@@ -14,35 +14,74 @@
 
 import logging
 import os
+import time
 import glob
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 from typing import Dict, Any, Callable, Coroutine, Optional, List
 
-from app.device.adb import adb, ADBException
+from app.device.adb import adb, ADBException, ADBTimeoutError
 from app.core.config import Settings, UPLOAD_DIR, format_folder_name, get_shanghai_time
+from app.core.metrics import (
+    device_push_bytes_total, device_push_duration_seconds, device_push_throughput_bytes_per_second,
+    device_push_files_total, scheduled_task_lateness_seconds, scheduled_tasks_total, automation_publish_total
+)
 from app.device.automation import AndroidAutomation
+from app.device.breaker import device_breakers
+from app.device.health import device_health
+from app.core.tracing import traced, start_span
+from app.services.cleanup_service import collect_garbage
+from app.services.manifest_service import load_manifest, update_manifest_state, is_same_album
+from app.services.album_index import album_index
+from app.services.reaper import reaper
 
 logger = logging.getLogger(__name__)
 
+async def record_album_stage(device_name: str, upload_time: int, stage: str,
+                             album_id: Optional[str] = None, **fields):
+    """
+    记录相册的流水线阶段到相册清单和相册索引
+    
+    相册已被重复上传替换时（album_id 不一致）两者都不更新。
+    
+    Args:
+        device_name: 设备名称
+        upload_time: 相册时间戳
+        stage: 阶段名称
+        album_id: 任务所属的相册标识，None 表示不检查
+        **fields: 需要一并记录的状态字段
+    """
+    manifest = await update_manifest_state(device_name, upload_time, stage, album_id=album_id, **fields)
+    if album_id is not None and manifest is None:
+        return
+    try:
+        await album_index.set_status(device_name, format_folder_name(upload_time), stage, **fields)
+    except Exception as e:
+        logger.error(f"更新相册索引失败: {str(e)}")
+
 # 立即执行任务
 # ===============================================
 
-async def send_images_to_device(device_name: str, upload_time: int):
+@traced("device.push")
+async def send_images_to_device(device_name: str, upload_time: int, album_id: Optional[str] = None):
     """
     将上传的图片通过ADB发送到设备
     
     Args:
         device_name: 设备名称
         upload_time: 数据上传时间戳
+        album_id: 相册标识，相册已被重复上传替换时不再推送
     """
     try:
         # 记录详细诊断信息
         logger.info(f"===== 开始发送图片任务 - 设备名: {device_name} =====")
         
-        # 获取设备映射信息用于诊断
-        logger.info(f"设备映射配置: {Settings.DEVICE_MAPPING}")
-        logger.info(f"设备配置: {Settings.DEVICE_CONFIG[device_name]}")
+        started = time.monotonic()
+        
+        # 设备已熔断时直接失败，不再逐条执行必然超时的ADB命令
+        if not device_breakers.allow(Settings.DEVICE_MAPPING.get(device_name, device_name)):
+            logger.error(f"设备 {device_name} 已熔断，终止任务")
+            return False
         
         # 1. 检查设备连接状态
         logger.info(f"正在检查设备 {device_name} 的连接状态...")
@@ -62,7 +101,7 @@ async def send_images_to_device(device_name: str, upload_time: int):
             if not is_connected:
                 # 如果未连接，尝试连接
                 logger.info(f"设备 {device_name} 未连接，正在尝试连接...")
-                await adb.connect_device_async(device_id)
+                await adb.connect_device_async(device_name)
                 
                 # 再次检查连接状态
                 is_connected = await adb.is_device_connected_async(device_name)
@@ -102,43 +141,84 @@ async def send_images_to_device(device_name: str, upload_time: int):
             logger.error(f"在设备 {device_name} 上创建目录失败: {str(e)}")
             return False
         
-        # 5. 获取本地图片文件列表
-        if not local_dir.exists():
-            logger.warning(f"本地图片目录不存在: {local_dir}")
+        # 5. 从相册清单获取本地图片文件列表（按上传顺序）
+        manifest = await load_manifest(device_name, upload_time)
+        if manifest is None:
+            logger.warning(f"本地相册不存在: {local_dir.parent}")
+            return False
+        if not is_same_album(manifest, album_id):
+            logger.warning(f"相册 {local_dir.parent} 已被重新上传替换，终止旧相册的推送")
             return False
             
-        image_files = list(local_dir.glob("*.*"))
+        image_files = [(local_dir / f["name"], f["size"]) for f in manifest["files"]]
         logger.info(f"找到 {len(image_files)} 个图片文件需要发送")
         
         if not image_files:
             logger.warning(f"没有找到图片文件在: {local_dir}")
             return False
             
+        # 推送前确认设备剩余空间，避免推送到一半写满（缓存在 DEVICE_HEALTH_TTL 内有效，不重复采集）
+        reason = await device_health.check_capacity(
+            device_name, sum(size for _, size in image_files)
+        )
+        if reason:
+            logger.error(reason)
+            await record_album_stage(device_name, upload_time, "push_failed", album_id=album_id, pushed_files=0)
+            return False
+            
         # 6. 逐个推送图片到设备
         successful_transfers = 0
-        for img_path in image_files:
+        pushed_bytes = 0
+        push_started = time.monotonic()
+        for img_path, size in image_files:
             try:
                 remote_path = f"{remote_dir}/{img_path.name}"
-                push_cmd = ["push", str(img_path), remote_path]
-                logger.info(f"执行推送命令: adb -s {device_id} {' '.join(push_cmd)}")
+                # 按设备特性和文件内容选择压缩参数（设备特性有缓存）
+                push_options = await adb.get_push_options_async(device_name, str(img_path))
+                push_cmd = ["push", *push_options, str(img_path), remote_path]
                 
+                file_started = time.monotonic()
                 await adb.execute_device_command_async(
                     device_name,
                     push_cmd
                 )
-                logger.info(f"成功推送图片到设备 {device_name}: {remote_path}")
+                device_push_duration_seconds.labels(device_name).observe(time.monotonic() - file_started)
+                device_push_bytes_total.labels(device_name).inc(size)
+                compression = push_options[1] if push_options[:1] == ["-z"] else ("none" if push_options else "default")
+                device_push_files_total.labels(device_name, compression).inc()
+                logger.debug("成功推送图片到设备 %s: %s", device_name, remote_path)
                 successful_transfers += 1
+                pushed_bytes += size
+            except ADBTimeoutError as e:
+                # 超时的推送可能在设备端留下不完整的文件，交给回收器删除
+                logger.error(f"推送图片 {img_path.name} 到设备 {device_name} 超时: {str(e)}")
+                reaper.schedule_remote_delete(device_name, [remote_path])
             except ADBException as e:
                 logger.error(f"推送图片 {img_path.name} 到设备 {device_name} 失败: {str(e)}")
         
-        logger.info(f"推送完成: {successful_transfers}/{len(image_files)} 文件成功发送到设备 {device_name}")
+        push_duration = time.monotonic() - push_started
+        if pushed_bytes and push_duration > 0:
+            device_push_throughput_bytes_per_second.labels(device_name).set(pushed_bytes / push_duration)
+        logger.info(
+            f"推送完成: {successful_transfers}/{len(image_files)} 文件成功发送到设备 {device_name}",
+            extra={"device": device_name, "stage": "push", "duration": round(time.monotonic() - started, 3)}
+        )
+        await record_album_stage(
+            device_name,
+            upload_time,
+            "pushed" if successful_transfers > 0 else "push_failed",
+            album_id=album_id,
+            pushed_files=successful_transfers
+        )
         logger.info(f"===== 图片发送任务结束 - 设备名: {device_name} =====")
         return successful_transfers > 0
     except Exception as e:
         logger.error(f"发送图片到设备 {device_name} 时发生错误: {str(e)}", exc_info=True)
         return False
 
-async def send_upload_notification(device_name: str, upload_time: int, success: bool = True):
+@traced("device.notify")
+async def send_upload_notification(device_name: str, upload_time: int, success: bool = True,
+                                   album_id: Optional[str] = None):
     """
     发送上传完成通知
     
@@ -146,6 +226,7 @@ async def send_upload_notification(device_name: str, upload_time: int, success:
         device_name: 设备名称
         upload_time: 数据上传时间戳
         success: 图片传输是否成功
+        album_id: 相册标识
     """
     try:
         logger.info(f"===== 开始发送通知任务 - 设备名: {device_name} =====")
@@ -177,6 +258,7 @@ async def send_upload_notification(device_name: str, upload_time: int, success:
         try:
             await adb.execute_device_command_async(device_name, notification_cmd)
             logger.info(f"已发送媒体扫描通知到设备 {device_name}")
+            await record_album_stage(device_name, upload_time, "scanned", album_id=album_id)
         except ADBException as e:
             logger.error(f"发送通知到设备 {device_name} 失败: {str(e)}")
             
@@ -185,7 +267,8 @@ async def send_upload_notification(device_name: str, upload_time: int, success:
         logger.error(f"处理设备通知时发生错误: {str(e)}", exc_info=True)
 
 # 立即任务调度器
-async def execute_immediate_tasks(device_name: str, upload_time: int):
+@traced("immediate_tasks")
+async def execute_immediate_tasks(device_name: str, upload_time: int, album_id: Optional[str] = None):
     """
     执行所有立即任务的调度器
     
@@ -194,15 +277,16 @@ async def execute_immediate_tasks(device_name: str, upload_time: int):
     Args:
         device_name: 设备名称
         upload_time: 数据上传时间戳
+        album_id: 相册标识
     """
     logger.info(f"开始执行立即任务 - 设备: {device_name}, 时间: {get_shanghai_time(upload_time)}")
     
     try:
         # 1. 执行图片发送任务
-        success = await send_images_to_device(device_name, upload_time)
+        success = await send_images_to_device(device_name, upload_time, album_id)
         
         # 2. 发送操作完成通知
-        await send_upload_notification(device_name, upload_time, success)
+        await send_upload_notification(device_name, upload_time, success, album_id)
         
         logger.info(f"所有立即任务完成 - 设备: {device_name}")
     except Exception as e:
@@ -211,6 +295,7 @@ async def execute_immediate_tasks(device_name: str, upload_time: int):
 # 定时执行任务
 # ===============================================
 
+@traced("scheduled.cleanup")
 async def perform_data_cleanup(device_name: str, task_time: int) -> bool:
     """
     执行数据清理任务
@@ -224,19 +309,31 @@ async def perform_data_cleanup(device_name: str, task_time: int) -> bool:
     """
     try:
         logger.info(f"执行数据清理 - 设备: {device_name}, 计划时间: {get_shanghai_time(task_time)}")
-        # TODO: 实现数据清理逻辑
-        return True  # 暂时返回 True，因为目前没有实际的清理逻辑
+        
+        # 对所有设备执行一次保留策略回收（容量策略需要全局统计）
+        report = await collect_garbage(task_time)
+        
+        for name, stats in report.items():
+            if stats["albums_removed"]:
+                logger.info(
+                    f"设备 {name} 回收相册 {stats['albums_removed']} 个 "
+                    f"(设备端 {stats['remote_removed']} 个), 释放 {stats['bytes_reclaimed']} 字节, "
+                    f"剩余相册 {stats['albums_remaining']} 个"
+                )
+        return True
     except Exception as e:
         logger.error(f"数据清理失败: {str(e)}")
         return False
 
-async def perform_content_automation(device_name: str, task_time: int):
+@traced("scheduled.automation")
+async def perform_content_automation(device_name: str, task_time: int, album_id: Optional[str] = None):
     """
     执行内容自动化发布任务
     
     Args:
         device_name: 设备名称
         task_time: 计划执行时间戳
+        album_id: 相册标识，相册已被重复上传替换时由新相册的任务发布
     """
     try:
         logger.info(f"开始执行内容自动化任务 - 设备: {device_name}")
@@ -245,9 +342,20 @@ async def perform_content_automation(device_name: str, task_time: int):
         if device_name not in Settings.DEVICE_CONFIG:
             logger.error(f"设备 {device_name} 配置不存在")
             return False
+        
+        if not device_breakers.allow(Settings.DEVICE_MAPPING[device_name]):
+            logger.error(f"设备 {device_name} 已熔断，跳过发布")
+            return False
             
-        # 获取要发布的内容
-        title, content = await get_content_from_file(device_name, task_time)
+        # 从相册清单获取要发布的内容
+        manifest = await load_manifest(device_name, task_time)
+        if manifest is None:
+            logger.error(f"相册不存在 - 设备: {device_name}, 时间: {format_folder_name(task_time)}")
+            return False
+        if not is_same_album(manifest, album_id):
+            logger.warning(f"相册已被重新上传替换，跳过旧相册的发布 - 设备: {device_name}, 时间: {format_folder_name(task_time)}")
+            return False
+        title, content = manifest["title"], manifest["content"]
         logger.info(f"准备发布内容 - 标题: {title if title else '[无标题]'}, 正文长度: {len(content) if content else 0}")
             
         # 初始化自动化实例
@@ -262,24 +370,28 @@ async def perform_content_automation(device_name: str, task_time: int):
         time_dir = format_folder_name(task_time)
         local_dir = UPLOAD_DIR / device_name / time_dir / "imgs"
         
-        # 检查目录是否存在
-        if not local_dir.exists():
-            logger.error(f"图片目录不存在: {local_dir}")
-            return False
-            
-        image_paths = [str(p) for p in local_dir.glob("*.*")]
+        image_paths = [str(local_dir / f["name"]) for f in manifest["files"]]
         
         if not image_paths:
             logger.error(f"未找到需要发布的图片: {local_dir}")
             return False
             
         # 执行发布操作
-        success, status = automation.post_content(title, content, image_paths)
+        with start_span("automation.post_content", images=len(image_paths)):
+            success, status = automation.post_content(title, content, image_paths)
         
+        automation_publish_total.labels(device_name, status).inc()
         if success:
             logger.info(f"内容发布成功 - 设备: {device_name}")
         else:
             logger.error(f"内容发布失败 - 设备: {device_name}, 状态: {status}")
+        await record_album_stage(
+            device_name,
+            task_time,
+            "published" if success else "publish_failed",
+            album_id=album_id,
+            publish_status=status
+        )
             
         return success
         
@@ -289,7 +401,7 @@ async def perform_content_automation(device_name: str, task_time: int):
 
 async def get_content_from_file(device_name: str, task_time: int) -> tuple[Optional[str], Optional[str]]:
     """
-    从上传目录中获取内容文件并解析标题和内容
+    从相册清单中获取标题和内容
     
     Args:
         device_name: 设备名称
@@ -299,45 +411,24 @@ async def get_content_from_file(device_name: str, task_time: int) -> tuple[Optio
         tuple: (标题, 正文内容)
     """
     try:
-        time_dir = format_folder_name(task_time)
-        content_dir = UPLOAD_DIR / device_name / time_dir
-        
-        # 读取content.txt文件
-        content_file = content_dir / "content.txt"
-        if not content_file.exists():
-            logger.warning(f"内容文件不存在: {content_file}")
+        manifest = await load_manifest(device_name, task_time)
+        if manifest is None:
+            logger.warning(f"相册不存在: {device_name}/{format_folder_name(task_time)}")
             return None, None
-            
-        # 读取文件内容
-        file_content = content_file.read_text(encoding='utf-8').strip()
-        
-        # 解析标题和内容
-        title = None
-        content = None
-        
-        # 按行分割
-        lines = file_content.split('\n')
-        for line in lines:
-            line = line.strip()
-            if line.startswith('Title:'):
-                title = line.replace('Title:', '').strip()
-            elif line.startswith('Content:'):
-                # 获取Content:后面的所有内容
-                content_start = file_content.index('Content:') + 8
-                content = file_content[content_start:].strip()
-                break
         
+        title, content = manifest["title"], manifest["content"]
         logger.debug(f"解析到标题: {title}")
         logger.debug(f"解析到正文，长度: {len(content) if content else 0}")
         
         return title, content
         
     except Exception as e:
-        logger.error(f"读取或解析内容文件失败: {str(e)}")
+        logger.error(f"读取相册清单失败: {str(e)}")
         return None, None
 
 # 定时任务调度器
-async def execute_scheduled_tasks(device_name: str, task_time: int, task_type: Optional[str] = None):
+async def execute_scheduled_tasks(device_name: str, task_time: int, task_type: Optional[str] = None,
+                                  traceparent: Optional[str] = None, album_id: Optional[str] = None):
     """
     执行定时任务的调度器
     
@@ -345,28 +436,39 @@ async def execute_scheduled_tasks(device_name: str, task_time: int, task_type: O
         device_name: 设备名称
         task_time: 计划执行的时间戳
         task_type: 可选的任务类型，为None时执行所有定时任务
+        traceparent: 创建任务的上传请求的追踪上下文，执行时归入同一条链路
+        album_id: 创建任务的上传对应的相册标识，None 时不检查（升级前创建的任务）
         
     Returns:
         bool: 任务执行是否成功
     """
-    logger.info(f"开始执行定时任务 - 设备: {device_name}, 类型: {task_type or '全部'}")
-    
-    try:
-        success = True
+    with start_span("scheduled_tasks", traceparent=traceparent, device=device_name, task_type=task_type or "all"):
+        logger.info(f"开始执行定时任务 - 设备: {device_name}, 类型: {task_type or '全部'}")
+        started = time.monotonic()
+        scheduled_task_lateness_seconds.observe(max(0.0, time.time() - get_shanghai_time(task_time).timestamp()))
         
-        if task_type is None or task_type == "cleanup":
-            cleanup_success = await perform_data_cleanup(device_name, task_time)
-            if cleanup_success is not None:  # 只有在有明确返回值时才更新 success
-                success = success and cleanup_success
+        try:
+            success = True
             
-        if task_type is None or task_type == "automation":
-            automation_success = await perform_content_automation(device_name, task_time)
-            if automation_success is not None:  # 只有在有明确返回值时才更新 success
-                success = success and automation_success
+            if task_type is None or task_type == "cleanup":
+                cleanup_success = await perform_data_cleanup(device_name, task_time)
+                if cleanup_success is not None:  # 只有在有明确返回值时才更新 success
+                    success = success and cleanup_success
+                scheduled_tasks_total.labels("cleanup", "success" if cleanup_success is not False else "failure").inc()
             
-        logger.info(f"定时任务完成 - 设备: {device_name}, 类型: {task_type or '全部'}, 结果: {'成功' if success else '失败'}")
-        return success
+            if task_type is None or task_type == "automation":
+                automation_success = await perform_content_automation(device_name, task_time, album_id)
+                if automation_success is not None:  # 只有在有明确返回值时才更新 success
+                    success = success and automation_success
+                scheduled_tasks_total.labels("automation", "success" if automation_success is not False else "failure").inc()
+            
+            logger.info(
+                f"定时任务完成 - 设备: {device_name}, 类型: {task_type or '全部'}, 结果: {'成功' if success else '失败'}",
+                extra={"device": device_name, "stage": task_type or "scheduled", "duration": round(time.monotonic() - started, 3)}
+            )
+            return success
         
-    except Exception as e:
-        logger.error(f"定时任务执行过程中出现未处理异常: {str(e)}")
-        return False
\ No newline at end of file
+        except Exception as e:
+            logger.error(f"定时任务执行过程中出现未处理异常: {str(e)}")
+            scheduled_tasks_total.labels(task_type or "all", "error").inc()
+            return False
@@ -1,3 +1,7 @@
 from .upload_service import process_upload
+from .cleanup_service import collect_garbage
+from .reaper import reaper
+from .manifest_service import load_manifest, update_manifest_state
+from .album_index import album_index
 
-__all__ = ['process_upload'] 
\ No newline at end of file
+__all__ = ['process_upload', 'collect_garbage', 'reaper', 'load_manifest', 'update_manifest_state', 'album_index']
\ No newline at end of file
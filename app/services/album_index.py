@@ -0,0 +1,367 @@
+"""
+相册元数据索引模块
+
+使用内嵌的 SQLite 记录所有相册及其流水线状态，包括：
+1. 相册所属设备、时间戳、标题、文件数量和总字节数
+2. 每个文件的名称、sha256 和大小
+3. 流水线阶段（stored、pushed、scanned、published、cleaned）及各阶段时间
+4. 幂等上传请求的原始响应
+
+按设备列举相册、查找待推送相册、查询发布结果时直接查询索引，
+不再需要遍历上传目录。所有数据库操作都在单独的单线程执行器中进行，
+既不阻塞事件循环，也无需额外加锁。
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from app.core.config import INDEX_DB_PATH, UPLOAD_DIR, parse_folder_name
+from app.services.manifest_service import read_manifest
+
+logger = logging.getLogger(__name__)
+
+# 会记录时间的流水线阶段
+STAGES = ("stored", "pushed", "scanned", "published", "cleaned")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS albums (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    device_name TEXT NOT NULL,
+    album TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    title TEXT,
+    content TEXT,
+    file_count INTEGER NOT NULL DEFAULT 0,
+    total_bytes INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    publish_status TEXT,
+    stored_at REAL,
+    pushed_at REAL,
+    scanned_at REAL,
+    published_at REAL,
+    cleaned_at REAL,
+    updated_at REAL NOT NULL,
+    UNIQUE (device_name, album)
+);
+CREATE INDEX IF NOT EXISTS idx_albums_device_time ON albums (device_name, timestamp);
+CREATE INDEX IF NOT EXISTS idx_albums_time ON albums (timestamp);
+CREATE INDEX IF NOT EXISTS idx_albums_status_time ON albums (status, timestamp);
+CREATE TABLE IF NOT EXISTS album_files (
+    album_id INTEGER NOT NULL REFERENCES albums (id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    original_name TEXT,
+    sha256 TEXT,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (album_id, seq)
+);
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_idempotency_created ON idempotency_keys (created_at);
+"""
+
+ALBUM_COLUMNS = (
+    "device_name", "album", "timestamp", "title", "file_count", "total_bytes",
+    "status", "publish_status", "stored_at", "pushed_at", "scanned_at",
+    "published_at", "cleaned_at", "updated_at"
+)
+
+class AlbumIndex:
+    """
+    相册元数据索引
+
+    所有方法都是协程，实际的 SQLite 操作在专用线程中串行执行。
+    """
+
+    def __init__(self, db_path=INDEX_DB_PATH):
+        """
+        初始化索引
+
+        Args:
+            db_path: SQLite 数据库文件路径
+        """
+        self.db_path = db_path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="album-index")
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """获取数据库连接（仅在索引线程中调用）"""
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path))
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    async def _call(self, func, *args):
+        """在索引线程中执行函数"""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, lambda: func(self._connect(), *args))
+
+    def close(self):
+        """关闭数据库连接"""
+        def _close():
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        self._executor.submit(_close).result()
+
+    async def record_upload(self, manifest: dict):
+        """
+        记录（或替换）一个已上传的相册
+
+        Args:
+            manifest: 相册清单
+        """
+        await self._call(_upsert_album, manifest)
+
+    async def set_status(self, device_name: str, album: str, status: str, **fields):
+        """
+        更新相册的流水线状态
+
+        Args:
+            device_name: 设备名称
+            album: 相册文件夹名称
+            status: 新状态
+            **fields: 需要一并更新的字段，目前支持 publish_status
+        """
+        await self._call(_set_status, device_name, album, status, fields.get("publish_status"))
+
+    async def list_albums(self, device_name: Optional[str] = None, status: Optional[str] = None,
+                          since: Optional[int] = None, until: Optional[int] = None,
+                          limit: int = 50, offset: int = 0) -> List[dict]:
+        """
+        按条件查询相册，按时间倒序排列
+
+        Args:
+            device_name: 设备名称
+            status: 流水线状态
+            since: 起始时间戳（包含）
+            until: 结束时间戳（不包含）
+            limit: 返回数量上限
+            offset: 偏移量
+
+        Returns:
+            list: 相册信息列表
+        """
+        return await self._call(_list_albums, device_name, status, since, until, limit, offset)
+
+    async def get_album(self, device_name: str, album: str) -> Optional[dict]:
+        """
+        获取相册详情（含文件列表）
+
+        Args:
+            device_name: 设备名称
+            album: 相册文件夹名称
+
+        Returns:
+            Optional[dict]: 相册详情，不存在时返回None
+        """
+        return await self._call(_get_album, device_name, album)
+
+    async def summary(self) -> List[dict]:
+        """
+        按设备和状态汇总相册数量与字节数
+
+        Returns:
+            list: 汇总信息列表
+        """
+        return await self._call(_summary)
+
+    async def get_idempotent_response(self, key: str, ttl: float) -> Optional[tuple]:
+        """
+        查询幂等键对应的原始响应
+
+        Args:
+            key: 幂等键
+            ttl: 有效期（秒）
+
+        Returns:
+            Optional[tuple]: (请求指纹, 原始响应)，不存在或已过期时返回None
+        """
+        return await self._call(_get_idempotent_response, key, ttl)
+
+    async def save_idempotent_response(self, key: str, fingerprint: str, response: dict, ttl: float):
+        """
+        保存幂等键对应的响应，并清理过期记录
+
+        Args:
+            key: 幂等键
+            fingerprint: 请求指纹
+            response: 响应数据
+            ttl: 有效期（秒）
+        """
+        await self._call(_save_idempotent_response, key, fingerprint, response, ttl)
+
+    async def rebuild_if_empty(self) -> int:
+        """
+        索引为空时从上传目录中的相册清单重建索引
+
+        Returns:
+            int: 导入的相册数量
+        """
+        return await self._call(_rebuild_if_empty)
+
+def _upsert_album(conn: sqlite3.Connection, manifest: dict):
+    """写入相册记录及其文件列表"""
+    now = time.time()
+    state = manifest.get("state", {})
+    status = state.get("stage", "stored")
+    with conn:
+        conn.execute(
+            """
+            INSERT INTO albums (device_name, album, timestamp, title, content, file_count,
+                                total_bytes, status, stored_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (device_name, album) DO UPDATE SET
+                timestamp = excluded.timestamp, title = excluded.title,
+                content = excluded.content, file_count = excluded.file_count,
+                total_bytes = excluded.total_bytes, status = excluded.status,
+                publish_status = NULL, stored_at = excluded.stored_at,
+                pushed_at = NULL, scanned_at = NULL, published_at = NULL,
+                cleaned_at = NULL, updated_at = excluded.updated_at
+            """,
+            (
+                manifest["device_name"], manifest["album"],
+                manifest.get("timestamp") or parse_folder_name(manifest["album"]),
+                manifest.get("title"), manifest.get("content"), len(manifest["files"]),
+                manifest.get("total_bytes", 0), status, now, now
+            )
+        )
+        album_id = conn.execute(
+            "SELECT id FROM albums WHERE device_name = ? AND album = ?",
+            (manifest["device_name"], manifest["album"])
+        ).fetchone()[0]
+        conn.execute("DELETE FROM album_files WHERE album_id = ?", (album_id,))
+        conn.executemany(
+            "INSERT INTO album_files (album_id, seq, name, original_name, sha256, size) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (album_id, seq, f["name"], f.get("original_name"), f.get("sha256"), f["size"])
+                for seq, f in enumerate(manifest["files"])
+            ]
+        )
+
+def _set_status(conn: sqlite3.Connection, device_name: str, album: str, status: str,
+                publish_status: Optional[str]):
+    """更新相册状态"""
+    now = time.time()
+    assignments = ["status = ?", "updated_at = ?"]
+    params: list = [status, now]
+    if status in STAGES:
+        assignments.append(f"{status}_at = ?")
+        params.append(now)
+    if publish_status is not None:
+        assignments.append("publish_status = ?")
+        params.append(publish_status)
+    with conn:
+        conn.execute(
+            f"UPDATE albums SET {', '.join(assignments)} WHERE device_name = ? AND album = ?",
+            params + [device_name, album]
+        )
+
+def _list_albums(conn: sqlite3.Connection, device_name, status, since, until, limit, offset) -> List[dict]:
+    """按条件查询相册"""
+    conditions = []
+    params: list = []
+    if device_name is not None:
+        conditions.append("device_name = ?")
+        params.append(device_name)
+    if status is not None:
+        conditions.append("status = ?")
+        params.append(status)
+    if since is not None:
+        conditions.append("timestamp >= ?")
+        params.append(since)
+    if until is not None:
+        conditions.append("timestamp < ?")
+        params.append(until)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    rows = conn.execute(
+        f"SELECT {', '.join(ALBUM_COLUMNS)} FROM albums {where} ORDER BY timestamp DESC LIMIT ? OFFSET ?",
+        params + [limit, offset]
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+def _get_album(conn: sqlite3.Connection, device_name: str, album: str) -> Optional[dict]:
+    """获取相册详情"""
+    row = conn.execute(
+        f"SELECT id, content, {', '.join(ALBUM_COLUMNS)} FROM albums WHERE device_name = ? AND album = ?",
+        (device_name, album)
+    ).fetchone()
+    if row is None:
+        return None
+    result = dict(row)
+    album_id = result.pop("id")
+    result["files"] = [
+        dict(file_row) for file_row in conn.execute(
+            "SELECT name, original_name, sha256, size FROM album_files WHERE album_id = ? ORDER BY seq",
+            (album_id,)
+        )
+    ]
+    return result
+
+def _summary(conn: sqlite3.Connection) -> List[dict]:
+    """按设备和状态汇总"""
+    rows = conn.execute(
+        """
+        SELECT device_name, status, COUNT(*) AS albums, SUM(total_bytes) AS total_bytes,
+               MIN(timestamp) AS first_timestamp, MAX(timestamp) AS last_timestamp
+        FROM albums GROUP BY device_name, status ORDER BY device_name, status
+        """
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+def _get_idempotent_response(conn: sqlite3.Connection, key: str, ttl: float) -> Optional[tuple]:
+    """查询幂等响应"""
+    row = conn.execute(
+        "SELECT fingerprint, response FROM idempotency_keys WHERE key = ? AND created_at >= ?",
+        (key, time.time() - ttl)
+    ).fetchone()
+    if row is None:
+        return None
+    return row["fingerprint"], json.loads(row["response"])
+
+def _save_idempotent_response(conn: sqlite3.Connection, key: str, fingerprint: str, response: dict, ttl: float):
+    """保存幂等响应"""
+    now = time.time()
+    with conn:
+        conn.execute("DELETE FROM idempotency_keys WHERE created_at < ?", (now - ttl,))
+        conn.execute(
+            "INSERT OR REPLACE INTO idempotency_keys (key, fingerprint, response, created_at) VALUES (?, ?, ?, ?)",
+            (key, fingerprint, json.dumps(response, ensure_ascii=False), now)
+        )
+
+def _rebuild_if_empty(conn: sqlite3.Connection) -> int:
+    """索引为空时从磁盘导入相册"""
+    if conn.execute("SELECT 1 FROM albums LIMIT 1").fetchone() is not None:
+        return 0
+
+    imported = 0
+    for device_dir in UPLOAD_DIR.iterdir():
+        if not device_dir.is_dir() or device_dir.name.startswith('.'):
+            continue
+        for album_dir in device_dir.iterdir():
+            if parse_folder_name(album_dir.name) is None:
+                continue
+            manifest = read_manifest(album_dir)
+            if manifest is not None:
+                _upsert_album(conn, manifest)
+                imported += 1
+    if imported:
+        logger.info(f"从上传目录导入 {imported} 个相册到索引")
+    return imported
+
+# 创建全局索引实例
+album_index = AlbumIndex()
@@ -0,0 +1,190 @@
+"""
+数据保留清理服务模块
+
+该模块负责回收过期的相册数据，包括：
+1. 扫描本地上传目录中的相册
+2. 按保留策略挑选需要回收的相册
+3. 删除本地相册和设备端相册
+4. 生成回收报告
+
+保留策略（任一命中即回收，未到执行时间的相册永远不会被回收）：
+- 按时间：相册时间早于 RETENTION_MAX_AGE_DAYS 天前
+- 按数量：每台设备只保留最新的 RETENTION_MAX_ALBUMS_PER_DEVICE 个相册
+- 按容量：上传目录总大小超过 RETENTION_MAX_TOTAL_MB 时从最旧的相册开始回收
+"""
+
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional
+
+from app.core.config import Settings, UPLOAD_DIR, parse_folder_name
+from app.device.adb import adb
+from app.services.album_index import album_index
+from app.services.reaper import reaper, quote_paths, REMOTE_BATCH_SIZE
+from app.utils.file_utils import move_to_trash, get_dir_size
+
+logger = logging.getLogger(__name__)
+
+async def collect_garbage(now_timestamp: int, device_names: Optional[List[str]] = None) -> Dict[str, dict]:
+    """
+    执行一次相册回收
+
+    Args:
+        now_timestamp: 当前时间戳，时间不早于它的相册受保护
+        device_names: 要回收的设备列表，为None时处理所有设备
+
+    Returns:
+        dict: 按设备统计的回收报告，如
+            {"deviceA": {"albums_removed": 2, "albums_remaining": 5,
+                         "bytes_reclaimed": 1024, "remote_removed": 2}}
+    """
+    loop = asyncio.get_event_loop()
+    albums = await loop.run_in_executor(None, scan_albums, device_names)
+    expired = select_expired_albums(albums, now_timestamp)
+
+    report: Dict[str, dict] = {}
+    for album in albums:
+        stats = report.setdefault(album["device_name"], {
+            "albums_removed": 0,
+            "albums_remaining": 0,
+            "bytes_reclaimed": 0,
+            "remote_removed": 0
+        })
+        stats["albums_remaining"] += 1
+
+    if not expired:
+        return report
+
+    # 1. 本地相册：先原子地移入回收站，再由后台回收器删除
+    removed_by_device: Dict[str, List[str]] = {}
+    for album in expired:
+        trash_path = move_to_trash(album["path"])
+        if trash_path is None:
+            continue
+        stats = report[album["device_name"]]
+        stats["albums_removed"] += 1
+        stats["albums_remaining"] -= 1
+        stats["bytes_reclaimed"] += album["size"]
+        removed_by_device.setdefault(album["device_name"], []).append(album["album_name"])
+        try:
+            await album_index.set_status(album["device_name"], album["album_name"], "cleaned")
+        except Exception as e:
+            logger.error(f"更新相册索引失败: {str(e)}")
+    reaper.wake()
+
+    # 2. 设备端相册：每台设备一次批量 rm
+    for device_name, album_names in removed_by_device.items():
+        report[device_name]["remote_removed"] = await remove_remote_albums(device_name, album_names)
+
+    return report
+
+def scan_albums(device_names: Optional[List[str]] = None) -> List[dict]:
+    """
+    扫描上传目录中的所有相册
+
+    目录结构：uploads/设备名称/时间戳/
+
+    Args:
+        device_names: 要扫描的设备列表，为None时扫描所有设备
+
+    Returns:
+        list: 相册信息列表，每项包含 device_name、album_name、timestamp、path、size
+    """
+    albums = []
+    for device_dir in UPLOAD_DIR.iterdir():
+        # 跳过回收站等内部目录
+        if not device_dir.is_dir() or device_dir.name.startswith('.'):
+            continue
+        if device_names is not None and device_dir.name not in device_names:
+            continue
+        for album_dir in device_dir.iterdir():
+            timestamp = parse_folder_name(album_dir.name)
+            if timestamp is None or not album_dir.is_dir():
+                continue
+            albums.append({
+                "device_name": device_dir.name,
+                "album_name": album_dir.name,
+                "timestamp": timestamp,
+                "path": album_dir,
+                "size": get_dir_size(album_dir)
+            })
+    return albums
+
+def select_expired_albums(albums: List[dict], now_timestamp: int) -> List[dict]:
+    """
+    按保留策略挑选需要回收的相册
+
+    Args:
+        albums: scan_albums 返回的相册列表
+        now_timestamp: 当前时间戳
+
+    Returns:
+        list: 需要回收的相册列表
+    """
+    # 未到执行时间（包括正在执行）的相册受保护
+    candidates = sorted(
+        (album for album in albums if album["timestamp"] < now_timestamp),
+        key=lambda album: album["timestamp"]
+    )
+    expired = {}
+
+    # 按时间
+    if Settings.RETENTION_MAX_AGE_DAYS > 0:
+        deadline = now_timestamp - Settings.RETENTION_MAX_AGE_DAYS * 86400
+        for album in candidates:
+            if album["timestamp"] < deadline:
+                expired[id(album)] = album
+
+    # 按数量
+    if Settings.RETENTION_MAX_ALBUMS_PER_DEVICE > 0:
+        per_device: Dict[str, List[dict]] = {}
+        for album in sorted(albums, key=lambda album: album["timestamp"], reverse=True):
+            per_device.setdefault(album["device_name"], []).append(album)
+        for device_albums in per_device.values():
+            for album in device_albums[Settings.RETENTION_MAX_ALBUMS_PER_DEVICE:]:
+                if album["timestamp"] < now_timestamp:
+                    expired[id(album)] = album
+
+    # 按容量
+    if Settings.RETENTION_MAX_TOTAL_MB > 0:
+        quota = Settings.RETENTION_MAX_TOTAL_MB * 1024 * 1024
+        total = sum(album["size"] for album in albums if id(album) not in expired)
+        for album in candidates:
+            if total <= quota:
+                break
+            if id(album) not in expired:
+                expired[id(album)] = album
+                total -= album["size"]
+
+    return sorted(expired.values(), key=lambda album: album["timestamp"])
+
+async def remove_remote_albums(device_name: str, album_names: List[str]) -> int:
+    """
+    批量删除设备端的相册文件夹
+
+    Args:
+        device_name: 设备名称
+        album_names: 相册文件夹名称列表
+
+    Returns:
+        int: 成功删除的相册数量
+    """
+    if device_name not in Settings.DEVICE_CONFIG:
+        logger.warning(f"设备 {device_name} 未在配置中找到，跳过设备端相册清理")
+        return 0
+    if not await adb.is_device_connected_async(device_name):
+        logger.warning(f"设备 {device_name} 未连接，跳过设备端相册清理")
+        return 0
+
+    storage_path = Settings.DEVICE_CONFIG[device_name]["storage_path"]
+    removed = 0
+    for start in range(0, len(album_names), REMOTE_BATCH_SIZE):
+        batch = album_names[start:start + REMOTE_BATCH_SIZE]
+        paths = quote_paths(os.path.join(storage_path, name) for name in batch)
+        try:
+            await adb.execute_device_command_async(device_name, ["shell", f"rm -rf {paths}"])
+            removed += len(batch)
+        except Exception as e:
+            logger.error(f"批量删除设备端相册失败: {str(e)}")
+    return removed
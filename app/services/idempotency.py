@@ -0,0 +1,124 @@
+"""
+幂等上传服务模块
+
+客户端在超时后重试上传时，同一请求只会被真正处理一次：
+1. 幂等键来自 Idempotency-Key 请求头，未提供时使用请求内容的哈希
+2. 已完成的请求直接返回原始响应，不再进行任何解码、写入和设备操作
+3. 正在处理中的相同请求会等待第一次处理的结果，第一次处理被取消时由等待者重新处理
+4. 同一幂等键用于内容不同的请求时拒绝处理
+"""
+
+import asyncio
+import logging
+from hashlib import sha256
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.config import Settings
+from app.core.exceptions import IdempotencyError
+from app.models.request import UploadRequest
+from app.services.album_index import album_index
+
+logger = logging.getLogger(__name__)
+
+# 正在处理中的请求：幂等键 -> (请求指纹, 处理结果)
+_inflight: Dict[str, Tuple[str, asyncio.Future]] = {}
+
+def compute_fingerprint(request: UploadRequest) -> str:
+    """
+    计算上传请求的内容指纹
+
+    直接对Base64字符串计算摘要，无需解码文件内容。
+
+    Args:
+        request (UploadRequest): 上传请求对象
+
+    Returns:
+        str: 十六进制的sha256指纹
+    """
+    digest = sha256()
+    for part in (request.device_name, str(request.timestamp), request.title or '', request.content or ''):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    for file in request.files:
+        digest.update(file.filename.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(sha256(file.data.encode()).digest())
+    return digest.hexdigest()
+
+async def run_idempotent(
+    request: UploadRequest,
+    idempotency_key: Optional[str],
+    handler: Callable[[], Awaitable[dict]]
+) -> Tuple[dict, bool]:
+    """
+    以幂等方式执行上传处理
+
+    Args:
+        request (UploadRequest): 上传请求对象
+        idempotency_key (Optional[str]): 客户端提供的幂等键
+        handler: 实际执行上传处理的协程函数
+
+    Returns:
+        tuple: (响应数据, 是否为重放的结果)
+
+    Raises:
+        IdempotencyError: 同一幂等键用于内容不同的请求
+    """
+    loop = asyncio.get_event_loop()
+    fingerprint = await loop.run_in_executor(None, compute_fingerprint, request)
+    key = f"key:{idempotency_key}" if idempotency_key else f"auto:{fingerprint}"
+
+    while True:
+        # 1. 已完成的请求
+        stored = await album_index.get_idempotent_response(key, Settings.IDEMPOTENCY_TTL)
+        if stored is not None:
+            _check_fingerprint(key, stored[0], fingerprint)
+            logger.info(f"重放幂等请求的原始响应 - 设备: {request.device_name}, 键: {key}")
+            return stored[1], True
+
+        # 2. 正在处理中的请求
+        inflight = _inflight.get(key)
+        if inflight is None:
+            break
+        _check_fingerprint(key, inflight[0], fingerprint)
+        logger.info(f"等待处理中的相同请求 - 设备: {request.device_name}, 键: {key}")
+        try:
+            return await asyncio.shield(inflight[1]), True
+        except asyncio.CancelledError:
+            if not inflight[1].cancelled():
+                # 当前请求自身被取消
+                raise
+            # 第一次处理的请求被取消（例如客户端断开），重新检查后由当前请求处理
+            logger.info(f"处理中的相同请求已取消，重新处理 - 设备: {request.device_name}, 键: {key}")
+
+    # 3. 首次处理
+    future = loop.create_future()
+    _inflight[key] = (fingerprint, future)
+    try:
+        response = await handler()
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # 标记异常已被读取，避免无人等待时的警告
+        raise
+    else:
+        future.set_result(response)
+        try:
+            await album_index.save_idempotent_response(key, fingerprint, response, Settings.IDEMPOTENCY_TTL)
+        except Exception as e:
+            logger.error(f"保存幂等响应失败: {str(e)}")
+        return response, False
+    finally:
+        _inflight.pop(key, None)
+
+def _check_fingerprint(key: str, stored_fingerprint: str, fingerprint: str):
+    """
+    检查幂等键是否被用于内容不同的请求
+
+    Raises:
+        IdempotencyError: 指纹不一致
+    """
+    if stored_fingerprint != fingerprint:
+        raise IdempotencyError(f"幂等键已用于内容不同的请求: {key}", code=409)
@@ -0,0 +1,386 @@
+"""
+日志读取服务模块
+
+从日志文件末尾按块反向读取日志记录，包括：
+1. 按块反向 seek，逐条产出最新的日志记录（多行记录如异常堆栈合并为一条）
+2. 跨 RotatingFileHandler 的备份文件 app.log.1 ~ app.log.N 继续读取
+3. 按时间范围、级别、记录器名称和设备过滤
+4. 基于游标的分页
+
+有过滤条件时先用旁路索引（app.log.idx）筛选出可能命中的字节范围，
+只对这些范围 seek 读取；响应时间和内存只与页大小成正比，与日志文件大小无关。
+"""
+
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Iterator, List, Optional, Set, Tuple
+
+from app.core.logging import LOG_FILE, LOG_BACKUP_COUNT, LOG_INDEX_FILE
+from app.core.log_index import get_stat_id, load_blocks, device_matcher
+
+# 反向读取的块大小
+BLOCK_SIZE = 64 * 1024
+
+# 日志记录首行：时间 - 记录器 - 级别 - 消息
+RECORD_HEADER = re.compile(
+    r"^(?P<time>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(?:,\d{3})?) - (?P<name>.+?) - (?P<level>[A-Z]+) - (?P<message>.*)$"
+)
+
+# JSON行格式的日志记录以时间字段开头
+JSON_RECORD_PREFIX = '{"time":'
+
+def is_record_start(text: str) -> bool:
+    """
+    判断一行是否为日志记录的首行（文本格式或JSON行格式）
+
+    Args:
+        text: 行内容
+
+    Returns:
+        bool: 是否为记录首行
+    """
+    return text.startswith(JSON_RECORD_PREFIX) or RECORD_HEADER.match(text) is not None
+
+class LogRecord:
+    """
+    从日志文件中解析出的一条日志记录
+
+    属性:
+        file_id (str): 所在日志文件的标识（inode），文件轮转改名后保持不变
+        offset (int): 记录首行在文件中的字节偏移
+        text (str): 记录全文（多行记录以换行连接）
+        time (Optional[str]): 记录时间
+        name (Optional[str]): 记录器名称
+        level (Optional[str]): 日志级别
+    """
+    __slots__ = ("file_id", "offset", "text", "time", "name", "level", "_created")
+
+    def __init__(self, file_id: str, offset: int, text: str):
+        self.file_id = file_id
+        self.offset = offset
+        self.text = text
+        self.time = self.name = self.level = None
+        self._created = None
+        first_line = text.split("\n", 1)[0]
+        if first_line.startswith(JSON_RECORD_PREFIX):
+            try:
+                data = json.loads(first_line)
+                self.time, self.name, self.level = data.get("time"), data.get("logger"), data.get("level")
+            except ValueError:
+                pass
+            return
+        match = RECORD_HEADER.match(first_line)
+        if match:
+            self.time = match.group("time")
+            self.name = match.group("name")
+            self.level = match.group("level")
+
+    @property
+    def created(self) -> Optional[float]:
+        """记录时间对应的时间戳（本地时间）"""
+        if self._created is None and self.time:
+            seconds = time.mktime(time.strptime(self.time[:19], "%Y-%m-%d %H:%M:%S"))
+            self._created = seconds + (int(self.time[20:23]) / 1000 if len(self.time) > 19 else 0)
+        return self._created
+
+    @property
+    def cursor(self) -> str:
+        """指向该记录之前（更旧）的分页游标"""
+        return f"{self.file_id}:{self.offset}"
+
+def get_log_files() -> List[Path]:
+    """
+    获取现存的日志文件，按从新到旧排列
+
+    Returns:
+        list: [app.log, app.log.1, ..., app.log.N] 中存在的文件
+    """
+    candidates = [LOG_FILE] + [
+        LOG_FILE.with_name(f"{LOG_FILE.name}.{i}") for i in range(1, LOG_BACKUP_COUNT + 1)
+    ]
+    return [path for path in candidates if path.exists()]
+
+def get_file_id(path: Path) -> str:
+    """
+    获取日志文件的标识
+
+    使用 inode，文件被轮转改名后标识不变，游标因此跨轮转有效。
+
+    Args:
+        path: 日志文件路径
+
+    Returns:
+        str: 文件标识
+    """
+    return get_stat_id(path.stat())
+
+def iter_lines_backwards(f, end: int, start: int = 0, block_size: int = BLOCK_SIZE) -> Iterator[Tuple[int, bytes]]:
+    """
+    从指定位置向文件开头反向逐行读取
+
+    Args:
+        f: 以二进制模式打开的文件
+        end: 起始读取位置（不包含）
+        start: 读取的下界，需位于行首
+        block_size: 每次读取的块大小
+
+    Yields:
+        tuple: (行首偏移, 行内容)，从新到旧
+    """
+    pos = end
+    buf = b""
+    while pos > start:
+        size = min(block_size, pos - start)
+        pos -= size
+        f.seek(pos)
+        buf = f.read(size) + buf
+        lines = buf.split(b"\n")
+        line_end = pos + len(buf)
+        for line in reversed(lines[1:]):
+            line_start = line_end - len(line)
+            if line:
+                yield line_start, line
+            line_end = line_start - 1
+        # 第一段可能是不完整的行，留到下一块
+        buf = lines[0]
+    if buf:
+        yield start, buf
+
+def iter_records_backwards(path: Path, end: Optional[int] = None, start: int = 0,
+                           file_id: Optional[str] = None) -> Iterator[LogRecord]:
+    """
+    从单个日志文件中反向读取日志记录
+
+    Args:
+        path: 日志文件路径
+        end: 起始读取位置，为None时从文件末尾开始
+        start: 读取的下界，需位于记录首行的行首
+        file_id: 期望的文件标识，文件已被轮转替换时不读取
+
+    Yields:
+        LogRecord: 日志记录，从新到旧
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        stat = os.fstat(f.fileno())
+        if file_id is not None and get_stat_id(stat) != file_id:
+            return
+        file_id = get_stat_id(stat)
+        if end is None:
+            end = stat.st_size
+        continuation: List[bytes] = []
+        for offset, line in iter_lines_backwards(f, end, start):
+            text = line.decode("utf-8", errors="replace").rstrip("\r")
+            if not is_record_start(text):
+                # 异常堆栈等续行，等遇到首行时再合并
+                continuation.append(line)
+                continue
+            if continuation:
+                text = "\n".join([text] + [
+                    extra.decode("utf-8", errors="replace").rstrip("\r") for extra in reversed(continuation)
+                ])
+                continuation = []
+            yield LogRecord(file_id, offset, text)
+        if continuation:
+            text = "\n".join(extra.decode("utf-8", errors="replace").rstrip("\r") for extra in reversed(continuation))
+            yield LogRecord(file_id, start, text)
+
+class LogQuery:
+    """
+    日志过滤条件
+
+    属性:
+        levels (Optional[Set[str]]): 允许的日志级别集合（大写）
+        logger_name (Optional[str]): 记录器名称，匹配该记录器及其子记录器
+        device (Optional[str]): 设备名称或设备ID
+        since (Optional[float]): 起始时间戳（包含）
+        until (Optional[float]): 结束时间戳（不包含）
+    """
+
+    def __init__(self, levels: Optional[Set[str]] = None, logger_name: Optional[str] = None,
+                 device: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None):
+        self.levels = levels or None
+        self.logger_name = logger_name or None
+        self.device = device or None
+        self.since = since
+        self.until = until
+        self.device_names = device_matcher.names_for(device) if device else None
+        self.device_pattern = re.compile(
+            r"(?<![\w])(" + "|".join(re.escape(term) for term in device_matcher.terms_for(device)) + r")(?![\w])"
+        ) if device else None
+
+    @property
+    def is_empty(self) -> bool:
+        """是否没有任何过滤条件"""
+        return not (self.levels or self.logger_name or self.device or
+                    self.since is not None or self.until is not None)
+
+    def matches(self, record: LogRecord) -> bool:
+        """
+        判断日志记录是否满足过滤条件
+
+        Args:
+            record: 日志记录
+
+        Returns:
+            bool: 是否满足条件
+        """
+        if self.levels and record.level not in self.levels:
+            return False
+        if self.logger_name and not (
+            record.name == self.logger_name or (record.name or "").startswith(self.logger_name + ".")
+        ):
+            return False
+        if self.since is not None or self.until is not None:
+            created = record.created
+            if created is None:
+                return False
+            if self.since is not None and created < self.since:
+                return False
+            if self.until is not None and created >= self.until:
+                return False
+        if self.device_pattern and not self.device_pattern.search(record.text):
+            return False
+        return True
+
+    def matches_block(self, block: dict) -> bool:
+        """
+        判断索引块是否可能包含满足条件的记录
+
+        Args:
+            block: 索引块
+
+        Returns:
+            bool: 是否需要读取该块
+        """
+        # 时间桶边界与记录时间存在毫秒级误差，放宽1秒
+        if self.since is not None and block["t1"] < self.since - 1:
+            return False
+        if self.until is not None and block["t0"] >= self.until + 1:
+            return False
+        if self.levels and not self.levels.intersection(block["l"]):
+            return False
+        if self.logger_name and not any(
+            name == self.logger_name or name.startswith(self.logger_name + ".") for name in block["n"]
+        ):
+            return False
+        if self.device_names and not self.device_names.intersection(block["d"]):
+            return False
+        return True
+
+def get_candidate_ranges(file_id: str, size: int, blocks: List[dict], query: LogQuery) -> List[Tuple[int, int]]:
+    """
+    根据索引计算单个日志文件中需要读取的字节范围
+
+    索引未覆盖的区域（例如尚未写出的当前块，或建立索引前写入的内容）总是需要读取。
+
+    Args:
+        file_id: 日志文件标识
+        size: 读取上界
+        blocks: 全部索引块
+        query: 过滤条件
+
+    Returns:
+        list: [(起始偏移, 结束偏移)]，从新到旧排列，相邻范围已合并
+    """
+    file_blocks = sorted(
+        (block for block in blocks if block["f"] == file_id and block["s"] < size),
+        key=lambda block: block["s"]
+    )
+    ranges: List[Tuple[int, int]] = []
+
+    def add(start: int, end: int):
+        end = min(end, size)
+        if start >= end:
+            return
+        if ranges and ranges[-1][1] >= start:
+            ranges[-1] = (ranges[-1][0], max(ranges[-1][1], end))
+        else:
+            ranges.append((start, end))
+
+    covered = 0
+    for block in file_blocks:
+        if block["s"] > covered:
+            add(covered, block["s"])
+        if query.matches_block(block):
+            add(block["s"], block["e"])
+        covered = max(covered, block["e"])
+    add(covered, size)
+    return list(reversed(ranges))
+
+def iter_records(cursor: Optional[str] = None, query: Optional[LogQuery] = None) -> Iterator[LogRecord]:
+    """
+    跨所有轮转文件反向读取日志记录
+
+    有过滤条件时只读取索引筛选出的字节范围。
+
+    Args:
+        cursor: 分页游标，为None时从最新的记录开始
+        query: 过滤条件
+
+    Yields:
+        LogRecord: 日志记录，从新到旧
+    """
+    files = get_log_files()
+    start_index, end = 0, None
+    if cursor:
+        file_id, _, offset = cursor.rpartition(":")
+        for index, path in enumerate(files):
+            try:
+                if get_file_id(path) == file_id:
+                    start_index, end = index, int(offset)
+                    break
+            except FileNotFoundError:
+                continue
+        else:
+            # 游标所在的文件已被轮转删除
+            return
+
+    blocks = load_blocks(LOG_INDEX_FILE) if query is not None and not query.is_empty else None
+
+    for index in range(start_index, len(files)):
+        path = files[index]
+        file_end = end if index == start_index else None
+        if blocks is None:
+            yield from iter_records_backwards(path, file_end)
+            continue
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        file_id = get_stat_id(stat)
+        for range_start, range_end in get_candidate_ranges(
+            file_id, stat.st_size if file_end is None else file_end, blocks, query
+        ):
+            yield from iter_records_backwards(path, range_end, range_start, file_id)
+
+def read_logs(limit: int = 100, cursor: Optional[str] = None,
+              query: Optional[LogQuery] = None) -> Tuple[List[str], Optional[str]]:
+    """
+    读取一页日志，从新到旧
+
+    Args:
+        limit: 每页记录数
+        cursor: 分页游标
+        query: 过滤条件
+
+    Returns:
+        tuple: (日志记录列表, 下一页游标)，没有更多记录时游标为None
+    """
+    query = query or LogQuery()
+    logs: List[str] = []
+    last_cursor = None
+    for record in iter_records(cursor, query):
+        if not query.matches(record):
+            continue
+        if len(logs) >= limit:
+            return logs, last_cursor
+        logs.append(record.text)
+        last_cursor = record.cursor
+    return logs, None
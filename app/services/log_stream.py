@@ -0,0 +1,208 @@
+"""
+实时日志流模块
+
+以 tail -f 的方式跟随 app.log，并将新的日志记录推送给所有订阅者：
+1. 所有订阅者共享同一个文件读取任务，订阅者数量不影响文件读取开销
+2. 能够处理 RotatingFileHandler 的轮转（读完旧文件剩余内容后切换到新文件）
+3. 每个订阅者可以在服务端按级别、记录器和设备过滤
+4. 订阅者消费过慢时丢弃新记录并计数，不会拖慢其他订阅者
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import BinaryIO, List, Optional, Set
+
+from app.core.logging import LOG_FILE
+from app.core.log_index import get_stat_id
+from app.services.log_reader import LogQuery, LogRecord, is_record_start
+
+logger = logging.getLogger(__name__)
+
+# 轮询日志文件的间隔（秒）
+POLL_INTERVAL = 0.5
+
+# 最后一条记录在这段时间（秒）内没有新的行时视为完整（多行的异常堆栈可能分多次写入）
+RECORD_FLUSH_DELAY = 1.0
+
+# 每个订阅者最多缓存的记录数
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+class LogSubscriber:
+    """
+    日志流订阅者
+
+    属性:
+        query (LogQuery): 过滤条件
+        queue (asyncio.Queue): 待推送的日志记录
+        dropped (int): 因消费过慢而丢弃的记录数
+    """
+
+    def __init__(self, query: LogQuery):
+        self.query = query
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = 0
+
+    def offer(self, record: LogRecord):
+        """投递一条日志记录，队列已满时丢弃"""
+        if not self.query.matches(record):
+            return
+        try:
+            self.queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+class LogFollower:
+    """
+    共享的日志跟随器
+
+    第一个订阅者加入时启动读取任务，最后一个订阅者离开时停止。
+    """
+
+    def __init__(self):
+        """初始化跟随器"""
+        self.subscribers: Set[LogSubscriber] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._file: Optional[BinaryIO] = None
+        self._file_id: Optional[str] = None
+        self._position = 0
+        self._buffer = b""
+        self._last_data = 0.0
+
+    def subscribe(self, query: LogQuery) -> LogSubscriber:
+        """
+        添加订阅者
+
+        Args:
+            query: 过滤条件
+
+        Returns:
+            LogSubscriber: 订阅者
+        """
+        subscriber = LogSubscriber(query)
+        self.subscribers.add(subscriber)
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        return subscriber
+
+    def unsubscribe(self, subscriber: LogSubscriber):
+        """
+        移除订阅者
+
+        Args:
+            subscriber: 订阅者
+        """
+        self.subscribers.discard(subscriber)
+        if not self.subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        """跟随主循环"""
+        loop = asyncio.get_event_loop()
+        try:
+            await loop.run_in_executor(None, self._open, True)
+            while True:
+                records = await loop.run_in_executor(None, self._poll)
+                for record in records:
+                    for subscriber in list(self.subscribers):
+                        subscriber.offer(record)
+                await asyncio.sleep(POLL_INTERVAL)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"跟随日志文件失败: {str(e)}", exc_info=True)
+        finally:
+            self._close()
+
+    def _open(self, at_end: bool):
+        """打开当前的日志文件"""
+        self._close()
+        try:
+            self._file = open(LOG_FILE, "rb")
+        except FileNotFoundError:
+            return
+        stat = os.fstat(self._file.fileno())
+        self._file_id = get_stat_id(stat)
+        self._position = stat.st_size if at_end else 0
+        self._file.seek(self._position)
+        self._buffer = b""
+        self._last_data = time.monotonic()
+
+    def _close(self):
+        """关闭当前的日志文件"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _poll(self) -> List[LogRecord]:
+        """读取新增的日志记录，必要时切换到轮转后的新文件"""
+        if self._file is None:
+            self._open(False)
+            if self._file is None:
+                return []
+
+        records = self._read_available()
+        try:
+            stat = os.stat(LOG_FILE)
+        except FileNotFoundError:
+            return records
+        if get_stat_id(stat) != self._file_id or stat.st_size < self._position:
+            # 文件已轮转或被截断：旧文件剩余内容已读完，输出暂存的最后一条记录后从新文件开头继续
+            records += self._read_available(flush=True)
+            self._open(False)
+            records += self._read_available()
+        return records
+
+    def _read_available(self, flush: bool = False) -> List[LogRecord]:
+        """
+        读取当前文件中新写入的完整行并组装为日志记录
+
+        最后一条记录可能还有后续的行（例如异常堆栈），暂存在缓冲区中，
+        直到出现下一条记录的首行、超过 RECORD_FLUSH_DELAY 没有新内容或 flush 时才输出。
+
+        Args:
+            flush: 是否立即输出暂存的最后一条记录
+
+        Returns:
+            List[LogRecord]: 已完整的日志记录
+        """
+        data = self._file.read()
+        now = time.monotonic()
+        if data:
+            self._last_data = now
+        elif not self._buffer or (not flush and now - self._last_data < RECORD_FLUSH_DELAY):
+            return []
+        complete = flush or not data
+        start = self._position - len(self._buffer)
+        self._position += len(data)
+        data = self._buffer + data
+        lines = data.split(b"\n")
+        # 最后一段可能是写了一半的行
+        tail = lines.pop()
+
+        records: List[LogRecord] = []
+        texts: List[str] = []
+        record_offset = start
+        offset = start
+        for line in lines:
+            text = line.decode("utf-8", errors="replace").rstrip("\r")
+            if is_record_start(text) and texts:
+                records.append(LogRecord(self._file_id, record_offset, "\n".join(texts)))
+                texts = []
+            if not texts:
+                record_offset = offset
+            texts.append(text)
+            offset += len(line) + 1
+        if texts and complete:
+            records.append(LogRecord(self._file_id, record_offset, "\n".join(texts)))
+            self._buffer = tail
+        elif texts:
+            self._buffer = data[record_offset - start:]
+        else:
+            self._buffer = tail
+        return records
+
+# 创建全局日志跟随器实例
+log_follower = LogFollower()
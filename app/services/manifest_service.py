@@ -0,0 +1,282 @@
+"""
+相册清单服务模块
+
+每个相册在上传时都会写入一个紧凑的 manifest.json，包含：
+1. 标题和正文
+2. 按上传顺序排列的文件列表（文件名、原始文件名、sha256、大小）
+3. 流水线状态（stored -> pushed -> scanned -> published）
+4. 相册标识（album_id），同一设备同一时间重复上传时区分新旧相册
+
+后续的推送、通知和自动化发布都只需读取一次清单，
+无需再解析 content.txt 或扫描图片目录，图片顺序也因此是确定的。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from app.core.config import Settings, UPLOAD_DIR, format_folder_name
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# 按相册目录分段的锁，串行化同一相册清单的读-改-写和相册目录的替换
+MANIFEST_LOCK_STRIPES = 64
+_manifest_locks = [threading.Lock() for _ in range(MANIFEST_LOCK_STRIPES)]
+
+def manifest_lock(album_dir: Path) -> threading.Lock:
+    """
+    获取相册目录对应的锁
+
+    Args:
+        album_dir: 相册目录
+
+    Returns:
+        threading.Lock: 同一相册目录总是返回同一把锁
+    """
+    return _manifest_locks[hash(str(album_dir)) % MANIFEST_LOCK_STRIPES]
+
+def build_manifest(device_name: str, timestamp: int, title: Optional[str],
+                   content: Optional[str], file_metas: List[dict], album_id: Optional[str] = None) -> dict:
+    """
+    生成相册清单
+
+    Args:
+        device_name: 设备名称
+        timestamp: 相册时间戳
+        title: 标题
+        content: 正文
+        file_metas: save_single_file 返回的文件元数据列表（按上传顺序）
+        album_id: 相册标识（暂存目录的随机ID）
+
+    Returns:
+        dict: 相册清单
+    """
+    files = [
+        {
+            "name": Path(meta["saved_path"]).name,
+            "original_name": meta["original_name"],
+            "sha256": meta["sha256"],
+            "size": meta["size"]
+        }
+        for meta in file_metas
+    ]
+    return {
+        "version": MANIFEST_VERSION,
+        "device_name": device_name,
+        "timestamp": timestamp,
+        "album": format_folder_name(timestamp),
+        "album_id": album_id,
+        "title": title or None,
+        "content": content or None,
+        "files": files,
+        "total_bytes": sum(f["size"] for f in files),
+        "state": {
+            "stage": "stored",
+            "stored_at": _now()
+        }
+    }
+
+def is_same_album(manifest: dict, album_id: Optional[str]) -> bool:
+    """
+    判断清单是否属于指定的相册
+
+    Args:
+        manifest: 相册清单
+        album_id: 相册标识，None 表示不检查（例如升级前创建的定时任务）
+
+    Returns:
+        bool: 清单属于该相册时返回True
+    """
+    return album_id is None or manifest.get("album_id") == album_id
+
+def dump_manifest(manifest: dict) -> str:
+    """
+    序列化相册清单为紧凑的JSON字符串
+
+    Args:
+        manifest: 相册清单
+
+    Returns:
+        str: JSON字符串
+    """
+    return json.dumps(manifest, ensure_ascii=False, separators=(',', ':'))
+
+def get_album_dir(device_name: str, timestamp: int) -> Path:
+    """
+    获取相册目录
+
+    Args:
+        device_name: 设备名称
+        timestamp: 相册时间戳
+
+    Returns:
+        Path: 相册目录路径
+    """
+    return UPLOAD_DIR / device_name / format_folder_name(timestamp)
+
+def read_manifest(album_dir: Path) -> Optional[dict]:
+    """
+    读取相册清单（同步）
+
+    对于引入清单之前上传的旧相册，从 content.txt 和图片目录构建等价的清单。
+
+    Args:
+        album_dir: 相册目录
+
+    Returns:
+        Optional[dict]: 相册清单，相册不存在时返回None
+    """
+    try:
+        with open(album_dir / MANIFEST_NAME, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        pass
+
+    if not album_dir.exists():
+        return None
+    return build_legacy_manifest(album_dir)
+
+async def load_manifest(device_name: str, timestamp: int) -> Optional[dict]:
+    """
+    异步读取相册清单
+
+    Args:
+        device_name: 设备名称
+        timestamp: 相册时间戳
+
+    Returns:
+        Optional[dict]: 相册清单，相册不存在时返回None
+    """
+    album_dir = get_album_dir(device_name, timestamp)
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, read_manifest, album_dir)
+
+async def update_manifest_state(device_name: str, timestamp: int, stage: str,
+                                album_id: Optional[str] = None, **fields) -> Optional[dict]:
+    """
+    更新相册清单中的流水线状态
+
+    清单通过临时文件 + os.replace 原子地写回，读取方不会读到写了一半的清单；
+    同一相册的并发更新按相册加锁串行执行，不会丢失彼此写入的字段。
+    相册已被重复上传替换时（album_id 不一致）不做任何修改，旧相册的任务不会写入新相册。
+
+    Args:
+        device_name: 设备名称
+        timestamp: 相册时间戳
+        stage: 新的阶段名称，如 pushed、scanned、published、failed
+        album_id: 任务所属的相册标识，None 表示不检查
+        **fields: 需要一并记录的状态字段
+
+    Returns:
+        Optional[dict]: 更新后的清单，相册不存在或已被替换时返回None
+    """
+    album_dir = get_album_dir(device_name, timestamp)
+
+    def _update():
+        with manifest_lock(album_dir):
+            manifest = read_manifest(album_dir)
+            if manifest is None:
+                return None
+            if not is_same_album(manifest, album_id):
+                logger.info(f"相册 {album_dir} 已被重新上传替换，忽略旧相册的状态 {stage}")
+                return None
+            state = manifest.setdefault("state", {})
+            state["stage"] = stage
+            state[f"{stage}_at"] = _now()
+            state.update(fields)
+            write_manifest(album_dir, manifest)
+            return manifest
+
+    try:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, _update)
+    except Exception as e:
+        logger.error(f"更新相册清单失败: {str(e)}")
+        return None
+
+def write_manifest(album_dir: Path, manifest: dict):
+    """
+    原子地写入相册清单（同步）
+
+    每次写入使用唯一的临时文件名，并发写入不会写进同一个文件。
+
+    Args:
+        album_dir: 相册目录
+        manifest: 相册清单
+    """
+    tmp_path = album_dir / f".{MANIFEST_NAME}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(dump_manifest(manifest))
+        os.replace(tmp_path, album_dir / MANIFEST_NAME)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+def build_legacy_manifest(album_dir: Path) -> dict:
+    """
+    为没有清单的旧相册构建清单
+
+    Args:
+        album_dir: 相册目录
+
+    Returns:
+        dict: 相册清单
+    """
+    title, content = parse_content_file(album_dir / "content.txt")
+    imgs_dir = album_dir / "imgs"
+    image_files = sorted(imgs_dir.glob("*.*"), key=lambda p: (p.stat().st_mtime, p.name)) if imgs_dir.exists() else []
+    files = [
+        {"name": p.name, "original_name": p.name, "sha256": None, "size": p.stat().st_size}
+        for p in image_files
+    ]
+    return {
+        "version": 0,
+        "device_name": album_dir.parent.name,
+        "album": album_dir.name,
+        "title": title,
+        "content": content,
+        "files": files,
+        "total_bytes": sum(f["size"] for f in files),
+        "state": {"stage": "stored"}
+    }
+
+def parse_content_file(content_file: Path) -> tuple:
+    """
+    解析旧版 content.txt 中的标题和正文
+
+    Args:
+        content_file: content.txt 路径
+
+    Returns:
+        tuple: (标题, 正文内容)
+    """
+    if not content_file.exists():
+        return None, None
+
+    file_content = content_file.read_text(encoding='utf-8').strip()
+    title = None
+    content = None
+    for line in file_content.split('\n'):
+        line = line.strip()
+        if line.startswith('Title:'):
+            title = line.replace('Title:', '').strip()
+        elif line.startswith('Content:'):
+            # 获取Content:后面的所有内容
+            content_start = file_content.index('Content:') + 8
+            content = file_content[content_start:].strip()
+            break
+    return title or None, content or None
+
+def _now() -> str:
+    """返回当前时区的ISO格式时间"""
+    return datetime.now(Settings.TIMEZONE).isoformat(timespec="seconds")
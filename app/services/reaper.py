@@ -0,0 +1,187 @@
+"""
+后台回收模块
+
+该模块负责在后台异步完成真正耗时的删除工作，包括：
+1. 限速清空本地回收站（在线程池中执行 rmtree）
+2. 按设备合并并延迟执行设备端的删除命令
+3. 清理异常中断后残留的上传暂存目录
+
+调用方只需要将相册原子地移入回收站并登记设备端路径即可立即返回，
+不会在事件循环上阻塞，也不会在上传请求中等待设备端命令。
+"""
+
+import asyncio
+import logging
+import shlex
+import shutil
+import time
+from typing import Dict, Iterable, Optional, Set
+
+from app.core.config import Settings, TRASH_DIR, STAGING_DIR
+from app.utils.file_utils import move_to_trash
+from app.device.adb import adb
+
+logger = logging.getLogger(__name__)
+
+# 单条删除命令中最多携带的路径数量，避免超出设备端命令行长度限制
+REMOTE_BATCH_SIZE = 100
+
+class AlbumReaper:
+    """
+    后台回收器
+
+    周期性地清空本地回收站，并将登记的设备端删除按设备批量执行。
+    """
+
+    def __init__(self):
+        """初始化回收器"""
+        self.interval = Settings.TRASH_REAP_INTERVAL
+        self.batch_size = Settings.TRASH_REAP_BATCH
+        self.pause = Settings.TRASH_REAP_PAUSE
+        self._pending_files: Dict[str, Set[str]] = {}
+        self._pending_dirs: Dict[str, Set[str]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """启动后台回收任务（需在事件循环中调用）"""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+            logger.info("后台回收任务已启动")
+
+    async def stop(self):
+        """停止后台回收任务"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("后台回收任务已停止")
+
+    def wake(self):
+        """立即触发一轮回收"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def schedule_remote_delete(self, device_name: str, files: Iterable[str], directory: Optional[str] = None):
+        """
+        登记需要在设备端删除的文件
+
+        Args:
+            device_name: 设备名称
+            files: 设备端文件路径列表
+            directory: 删除文件后如果为空则一并删除的目录
+        """
+        self._pending_files.setdefault(device_name, set()).update(files)
+        if directory:
+            self._pending_dirs.setdefault(device_name, set()).add(directory)
+        self.wake()
+
+    async def _run(self):
+        """回收主循环"""
+        while True:
+            try:
+                await self.reap_local()
+                await self.flush_remote()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"后台回收失败: {str(e)}", exc_info=True)
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def reap_local(self) -> int:
+        """
+        清空本地回收站
+
+        每轮最多删除 batch_size 个目录，每个目录之间暂停 pause 秒，
+        避免大量删除时占满磁盘IO。
+
+        Returns:
+            int: 本轮删除的目录数量
+        """
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, discard_stale_staging)
+
+        if not TRASH_DIR.exists():
+            return 0
+
+        entries = await loop.run_in_executor(None, lambda: sorted(TRASH_DIR.iterdir())[:self.batch_size])
+        for entry in entries:
+            await loop.run_in_executor(None, lambda: shutil.rmtree(entry, ignore_errors=True))
+            if self.pause:
+                await asyncio.sleep(self.pause)
+
+        if entries:
+            logger.info(f"已清空 {len(entries)} 个回收站目录")
+        return len(entries)
+
+    async def flush_remote(self):
+        """按设备批量执行登记的设备端删除"""
+        for device_name in list(self._pending_files.keys() | self._pending_dirs.keys()):
+            if not await adb.is_device_connected_async(device_name):
+                logger.debug(f"设备 {device_name} 未连接，延后设备端删除")
+                continue
+
+            files = sorted(self._pending_files.pop(device_name, set()))
+            dirs = sorted(self._pending_dirs.pop(device_name, set()))
+            try:
+                for start in range(0, max(len(files), 1), REMOTE_BATCH_SIZE):
+                    batch = files[start:start + REMOTE_BATCH_SIZE]
+                    command = f"rm -f {quote_paths(batch)}" if batch else "true"
+                    # 仅删除已为空的目录，不会影响同名目录中新推送的文件
+                    if dirs and start + REMOTE_BATCH_SIZE >= len(files):
+                        command += f" && {{ rmdir {quote_paths(dirs)} 2>/dev/null; true; }}"
+                    await adb.execute_device_command_async(device_name, ["shell", command])
+                logger.info(f"设备 {device_name} 已删除 {len(files)} 个文件, {len(dirs)} 个目录")
+            except Exception as e:
+                logger.error(f"设备 {device_name} 批量删除失败，下轮重试: {str(e)}")
+                self._pending_files.setdefault(device_name, set()).update(files)
+                self._pending_dirs.setdefault(device_name, set()).update(dirs)
+
+def discard_stale_staging() -> int:
+    """
+    将超过 STAGING_MAX_AGE 仍未发布的暂存目录移入回收站
+
+    Returns:
+        int: 移入回收站的目录数量
+    """
+    if not STAGING_DIR.exists():
+        return 0
+
+    deadline = time.time() - Settings.STAGING_MAX_AGE
+    discarded = 0
+    for entry in STAGING_DIR.iterdir():
+        try:
+            if entry.stat().st_mtime < deadline and move_to_trash(entry) is not None:
+                discarded += 1
+        except FileNotFoundError:
+            # 已被发布或丢弃
+            continue
+    if discarded:
+        logger.warning(f"丢弃 {discarded} 个残留的上传暂存目录")
+    return discarded
+
+def quote_paths(paths: Iterable[str]) -> str:
+    """
+    将路径列表拼接为经过转义的 shell 参数
+
+    文件名的扩展名来自客户端，可能包含引号等 shell 元字符，必须用 shlex.quote 转义。
+
+    Args:
+        paths: 路径列表
+
+    Returns:
+        str: 拼接后的参数字符串
+    """
+    return ' '.join(shlex.quote(path) for path in paths)
+
+# 创建全局回收器实例
+reaper = AlbumReaper()
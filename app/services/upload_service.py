@@ -3,35 +3,58 @@
 
 该模块负责处理设备上传的具体业务逻辑，包括：
 1. 文件系统操作（创建目录、保存文件）
-2. 文本内容处理
-3. 图片文件处理
+2. 图片文件处理
+3. 相册清单生成
 4. 生成响应数据
 
 主要功能：
-- 创建基于时间戳的目录结构
-- 保存设备上传的文本内容
+- 在私有暂存目录中写入上传内容
 - 处理并保存图片文件
+- 写入包含标题、正文和有序文件列表的相册清单
+- 写完后通过一次原子 rename 发布到基于时间戳的目录
 - 生成文件元数据
+
+读取方只会看到完整的相册；同一设备同一时间的并发上传无需加锁，
+后发布者覆盖先发布者，被替换的相册进入回收站。
 """
 
 import base64
+import errno
+import logging
+import os
+import time
+import uuid
 import aiofiles
 from pathlib import Path
 from hashlib import sha256
 from datetime import datetime, timezone, timedelta
 from app.models.request import UploadRequest
-from app.core.config import UPLOAD_DIR, format_folder_name
-from app.utils.file_utils import generate_unique_filename
+from app.core.config import UPLOAD_DIR, STAGING_DIR, format_folder_name
+from app.core.metrics import upload_file_decode_seconds, upload_file_write_seconds, upload_file_bytes_total
+from app.core.tracing import traced
+from app.device.del_img import retire_remote_album
+from app.services.manifest_service import MANIFEST_NAME, build_manifest, dump_manifest, manifest_lock
+from app.services.reaper import reaper
+from app.services.album_index import album_index
+from app.utils.file_utils import generate_unique_filename, move_to_trash
+
+logger = logging.getLogger(__name__)
+
+# 发布时目标目录被并发上传抢占后的最大重试次数
+MAX_PUBLISH_ATTEMPTS = 5
 
+@traced("upload.process")
 async def process_upload(request: UploadRequest) -> dict:
     """
     处理设备上传请求的主函数
 
     处理流程：
-    1. 创建设备专属的目录结构
-    2. 保存上传的文本内容
-    3. 处理并保存图片文件
-    4. 生成处理结果响应
+    1. 创建私有的暂存目录
+    2. 处理并保存图片文件
+    3. 写入相册清单
+    4. 原子地发布到最终目录
+    5. 记录到相册索引
+    6. 生成处理结果响应
 
     Args:
         request (UploadRequest): 包含上传数据的请求对象
@@ -39,46 +62,120 @@ async def process_upload(request: UploadRequest) -> dict:
     Returns:
         dict: 包含处理结果的响应数据
     """
-    # 创建目录结构
-    device_dir = create_directory_structure(request)
+    # 创建暂存目录，随机ID同时作为相册标识，区分同一设备同一时间的重复上传
+    album_id = uuid.uuid4().hex
+    staging_dir = create_directory_structure(request, album_id)
     
-    # 保存文本内容
-    await save_text_content(device_dir, request)
+    try:
+        # 处理图片文件
+        file_metas = await process_image_files(staging_dir, request.files)
+        
+        # 写入相册清单
+        manifest = await save_manifest(staging_dir, request, file_metas, album_id)
+        
+        # 发布相册
+        publish_album(staging_dir, request)
+    except BaseException:
+        # 写入失败时丢弃暂存目录，最终目录不受影响
+        move_to_trash(staging_dir)
+        reaper.wake()
+        raise
     
-    # 处理图片文件
-    file_metas = await process_image_files(device_dir, request.files)
-    return create_response(request, len(file_metas))
+    # 记录到相册索引
+    try:
+        await album_index.record_upload(manifest)
+    except Exception as e:
+        logger.error(f"写入相册索引失败: {str(e)}")
+    return create_response(request, len(file_metas), album_id)
 
-def create_directory_structure(request: UploadRequest) -> Path:
+def create_directory_structure(request: UploadRequest, album_id: str) -> Path:
     """
-    创建基于时间戳的目录结构
+    创建私有的暂存目录结构
 
-    目录结构：uploads/设备名称/时间戳/imgs/
+    暂存目录与上传目录位于同一文件系统，保证发布时的 rename 是原子操作。
+    目录结构：uploads/.staging/设备名称-相册标识/imgs/
 
     Args:
         request (UploadRequest): 包含设备信息的请求对象
+        album_id (str): 相册标识
 
     Returns:
-        Path: 创建的目录路径
+        Path: 创建的暂存目录路径
     """
-    time_dir = format_folder_name(request.timestamp)
-    device_dir = UPLOAD_DIR / request.device_name / time_dir
-    (device_dir / "imgs").mkdir(parents=True, exist_ok=True)
-    return device_dir
+    staging_dir = STAGING_DIR / f"{request.device_name}-{album_id}"
+    (staging_dir / "imgs").mkdir(parents=True)
+    return staging_dir
 
-async def save_text_content(device_dir: Path, request: UploadRequest):
+def publish_album(staging_dir: Path, request: UploadRequest) -> Path:
     """
-    保存上传的文本内容
+    将暂存目录原子地发布为最终相册目录
 
-    将标题和内容保存到content.txt文件中
+    目录结构：uploads/设备名称/时间戳/
+
+    如果目标目录已存在（重复上传或并发上传），先将其移入回收站再重试，
+    并登记删除旧相册在设备端推送过的文件。
+    替换期间持有该相册的清单锁，旧相册任务的状态更新不会在读写清单的中途遇到目录被替换。
 
     Args:
-        device_dir (Path): 设备目录路径
+        staging_dir (Path): 已写完的暂存目录
+        request (UploadRequest): 上传请求对象
+
+    Returns:
+        Path: 发布后的相册目录
+
+    Raises:
+        OSError: 多次重试后仍无法发布
+    """
+    album_name = format_folder_name(request.timestamp)
+    device_dir = UPLOAD_DIR / request.device_name / album_name
+    device_dir.parent.mkdir(parents=True, exist_ok=True)
+
+    with manifest_lock(device_dir):
+        for attempt in range(MAX_PUBLISH_ATTEMPTS):
+            try:
+                os.rename(staging_dir, device_dir)
+                return device_dir
+            except OSError as e:
+                if e.errno not in (errno.EEXIST, errno.ENOTEMPTY) and not isinstance(e, FileExistsError):
+                    raise
+                if attempt == MAX_PUBLISH_ATTEMPTS - 1:
+                    raise
+
+            # 目标目录已存在：替换旧相册
+            trash_path = move_to_trash(device_dir)
+            if trash_path is not None:
+                logger.info(f"替换已存在的相册: {device_dir}")
+                retire_remote_album(request.device_name, album_name, trash_path)
+                reaper.wake()
+
+@traced("upload.save_manifest")
+async def save_manifest(device_dir: Path, request: UploadRequest, file_metas: list, album_id: str) -> dict:
+    """
+    保存相册清单
+
+    清单包含标题、正文、按上传顺序排列的文件列表及其哈希和大小，
+    后续各阶段只需读取一次清单即可获得全部信息。
+
+    Args:
+        device_dir (Path): 相册目录路径
         request (UploadRequest): 包含文本内容的请求对象
+        file_metas (list): 文件元数据列表
+        album_id (str): 相册标识
+
+    Returns:
+        dict: 写入的相册清单
     """
-    content_path = device_dir / "content.txt"
-    async with aiofiles.open(content_path, "w", encoding='utf-8') as f:
-        await f.write(f"Title: {request.title or ''}\nContent: {request.content or ''}")
+    manifest = build_manifest(
+        request.device_name,
+        request.timestamp,
+        request.title,
+        request.content,
+        file_metas,
+        album_id
+    )
+    async with aiofiles.open(device_dir / MANIFEST_NAME, "w", encoding='utf-8') as f:
+        await f.write(dump_manifest(manifest))
+    return manifest
 
 async def process_image_files(device_dir: Path, files) -> list:
     """
@@ -97,6 +194,7 @@ async def process_image_files(device_dir: Path, files) -> list:
         file_metas.append(file_meta)
     return file_metas
 
+@traced("upload.save_file")
 async def save_single_file(device_dir: Path, file) -> dict:
     """
     保存单个图片文件
@@ -115,6 +213,7 @@ async def save_single_file(device_dir: Path, file) -> dict:
     Returns:
         dict: 文件的元数据信息
     """
+    started = time.perf_counter()
     file_data = base64.b64decode(file.data.encode())
     unique_filename = generate_unique_filename(file.filename)
     save_path = device_dir / "imgs" / unique_filename
@@ -122,25 +221,30 @@ async def save_single_file(device_dir: Path, file) -> dict:
     # 计算文件哈希
     hash_sha256 = sha256()
     hash_sha256.update(file_data)
+    decoded = time.perf_counter()
+    upload_file_decode_seconds.observe(decoded - started)
     
     # 保存文件
     async with aiofiles.open(save_path, "wb") as f:
         await f.write(file_data)
+    upload_file_write_seconds.observe(time.perf_counter() - decoded)
+    upload_file_bytes_total.inc(len(file_data))
     
     return {
         "original_name": file.filename,
-        "saved_path": str(save_path.relative_to(UPLOAD_DIR)),
+        "saved_path": str(save_path.relative_to(device_dir)),
         "sha256": hash_sha256.hexdigest(),
         "size": len(file_data)
     }
 
-def create_response(request: UploadRequest, files_count: int) -> dict:
+def create_response(request: UploadRequest, files_count: int, album_id: str) -> dict:
     """
     创建上传处理的响应数据
 
     Args:
         request (UploadRequest): 上传请求对象
         files_count (int): 处理的文件数量
+        album_id (str): 相册标识
 
     Returns:
         dict: 标准化的响应数据
@@ -151,4 +255,5 @@ def create_response(request: UploadRequest, files_count: int) -> dict:
         "device_name": request.device_name,
         "timestamp": request.timestamp,
         "files_count": files_count,
+        "album_id": album_id,
     } 
\ No newline at end of file
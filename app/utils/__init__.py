@@ -1,3 +1,3 @@
-from app.utils.file_utils import generate_unique_filename
+from app.utils.file_utils import generate_unique_filename, move_to_trash, get_dir_size
 
-__all__ = ['generate_unique_filename'] 
\ No newline at end of file
+__all__ = ['generate_unique_filename', 'move_to_trash', 'get_dir_size']
\ No newline at end of file
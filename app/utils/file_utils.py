@@ -9,10 +9,15 @@
 主要功能：
 - 生成基于UUID的唯一文件名
 - 保持原始文件扩展名
+- 将目录原子地移入回收站
+- 统计目录占用空间
 """
 
+import os
 import uuid
 from pathlib import Path
+from typing import Optional
+from app.core.config import TRASH_DIR
 
 def generate_unique_filename(original_name: str) -> str:
     """
@@ -31,4 +36,47 @@ def generate_unique_filename(original_name: str) -> str:
         '123e4567-e89b-12d3-a456-426614174000.jpg'
     """
     ext = Path(original_name).suffix
-    return f"{uuid.uuid4().hex}{ext}" 
\ No newline at end of file
+    return f"{uuid.uuid4().hex}{ext}"
+
+def move_to_trash(path: Path) -> Optional[Path]:
+    """
+    将目录原子地移动到回收站
+
+    回收站与上传目录位于同一文件系统，rename 是瞬时完成的原子操作，
+    真正的删除可以稍后在后台线程中进行。
+
+    Args:
+        path (Path): 要移除的目录
+
+    Returns:
+        Optional[Path]: 目录在回收站中的新路径，目录不存在时返回None
+    """
+    TRASH_DIR.mkdir(parents=True, exist_ok=True)
+    trash_path = TRASH_DIR / f"{path.parent.name}-{path.name}-{uuid.uuid4().hex}"
+    try:
+        os.rename(path, trash_path)
+    except FileNotFoundError:
+        return None
+    return trash_path
+
+def get_dir_size(path: Path) -> int:
+    """
+    统计目录下所有文件的总字节数
+
+    Args:
+        path (Path): 目录路径
+
+    Returns:
+        int: 总字节数，目录不存在时返回0
+    """
+    total = 0
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    total += get_dir_size(Path(entry.path))
+                else:
+                    total += entry.stat(follow_symlinks=False).st_size
+    except FileNotFoundError:
+        pass
+    return total
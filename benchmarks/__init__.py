@@ -0,0 +1,14 @@
+"""
+性能基准测试
+
+不依赖真实手机的基准测试和替身：
+- fake_adb: 模拟 ADB 服务器、adb 命令行和模拟设备
+- fake_u2: 回放录制界面的模拟 uiautomator2 设备
+- runner: 计时、统计和结果比较
+- bench_device: 设备推送、通知和删除流程的基准测试
+- bench_publish: 内容发布流程（post_content）的基准测试
+- bench_upload: 上传服务和时间处理热点函数的微基准测试，基线见 baselines/upload.json
+- loadtest: 上传接口（/api/v1/upload）的进程内压力测试
+
+运行方式：python -m benchmarks.bench_device --help
+"""
@@ -0,0 +1,173 @@
+"""
+设备流程基准测试
+
+在模拟 ADB 服务器上运行 send_images_to_device、send_upload_notification 和 delete_device_album，
+测量耗时、推送吞吐量和每次推送的 ADB 命令数。不需要真实手机：
+
+    python -m benchmarks.bench_device --files 9 --size-kb 512 --throughput-mb 30 --latency-ms 5
+    python -m benchmarks.bench_device --output results/device.json --baseline results/device-base.json
+    python -m benchmarks.bench_device --features v2 --payload compressible --compression none
+    python -m benchmarks.bench_device --features v2 --payload compressible --compression auto
+
+--features v2 时模拟设备支持 sendrecv_v2 和压缩传输，--compression 对应 ADB_PUSH_COMPRESSION，
+对比前后两次的 throughput_mb_s 即可看到压缩在慢速链路上的效果。
+
+耗时包含每条 adb 命令启动 Python 进程的开销，数值只适合在同一台机器上前后对比，
+不代表真实手机上的绝对耗时。
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.fake_adb import FakeAdbEnvironment, SENDRECV_V2_FEATURES
+from benchmarks.fake_adb.device import DEFAULT_FEATURES
+from benchmarks.runner import (
+    DEFAULT_TOLERANCE, summarize, build_report, save_report, compare_with_baseline, print_report
+)
+
+# 相册时间戳的起点（2024-01-01 00:00:00），每次运行使用不同的时间戳
+BASE_TIMESTAMP = 1704067200
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_device", description="设备流程基准测试")
+    parser.add_argument("--device", default="deviceA", help="设备名称（Settings.DEVICE_MAPPING 中的键）")
+    parser.add_argument("--files", type=int, default=9, help="每个相册的图片数")
+    parser.add_argument("--size-kb", type=int, default=512, help="每张图片的大小（KB）")
+    parser.add_argument("--throughput-mb", type=float, default=30.0, help="模拟传输带宽（MB/s），0 表示不限速")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="每条命令的模拟延迟（毫秒）")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="每条命令额外的随机延迟上限（毫秒）")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="命令失败概率（0~1）")
+    parser.add_argument("--flap-interval", type=float, default=0.0, help="掉线周期（秒），0 表示不掉线")
+    parser.add_argument("--flap-duration", type=float, default=0.0, help="每个周期内的离线时长（秒）")
+    parser.add_argument("--features", choices=["v1", "v2"], default="v1",
+                        help="v1: 只支持 SEND；v2: 支持 sendrecv_v2 和压缩传输")
+    parser.add_argument("--payload", choices=["random", "compressible"], default="random",
+                        help="random: 不可压缩（类似 JPEG）；compressible: 可压缩（类似 BMP、RAW）")
+    parser.add_argument("--compression", default="auto", help="ADB_PUSH_COMPRESSION：auto、none、brotli、lz4、zstd")
+    parser.add_argument("--repeat", type=int, default=5, help="计时运行次数")
+    parser.add_argument("--warmup", type=int, default=1, help="预热次数")
+    parser.add_argument("--seed", type=int, default=0, help="失败注入和抖动的随机种子")
+    parser.add_argument("--output", type=Path, help="结果 JSON 保存路径")
+    parser.add_argument("--baseline", type=Path, help="用于比较的基线结果 JSON")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="允许的变慢比例")
+    return parser.parse_args(argv)
+
+def build_request(args: argparse.Namespace, timestamp: int):
+    """生成一个合成相册的上传请求"""
+    from app.models.request import UploadRequest
+
+    size = args.size_kb * 1024
+    if args.payload == "compressible":
+        # Base64 文本只用 64 个字符，压缩比约 0.75
+        data = base64.b64encode(os.urandom(size))[:size]
+    else:
+        data = os.urandom(size)
+    payload = base64.b64encode(data).decode()
+    return UploadRequest(
+        device_name=args.device,
+        timestamp=timestamp,
+        title="benchmark",
+        content="benchmark",
+        files=[{"filename": f"{i:03d}.jpg", "data": payload} for i in range(args.files)],
+    )
+
+async def run(args: argparse.Namespace, env: FakeAdbEnvironment) -> dict:
+    """运行全部用例并生成结果报告"""
+    from app.core.config import Settings, format_folder_name
+    from app.scheduler.tasks import send_images_to_device, send_upload_notification
+    from app.device.del_img import delete_device_album
+    from app.services.album_index import album_index
+    from app.services.reaper import reaper
+    from app.services.upload_service import process_upload
+
+    device = env.device(Settings.DEVICE_MAPPING[args.device])
+    remote_root = Settings.DEVICE_CONFIG[args.device]["storage_path"].rstrip("/")
+    album_bytes = args.files * args.size_kb * 1024
+
+    samples = {"send_images_to_device": [], "send_upload_notification": [], "delete_device_album": []}
+    commands = []
+    incomplete = 0
+    for i in range(args.warmup + args.repeat):
+        timestamp = BASE_TIMESTAMP + i
+        await process_upload(build_request(args, timestamp))
+        remote_dir = f"{remote_root}/{format_folder_name(timestamp)}"
+
+        before = sum(device.stats[kind] for kind in ("shell", "sync"))
+        started = time.perf_counter()
+        await send_images_to_device(args.device, timestamp)
+        push_elapsed = time.perf_counter() - started
+        commands.append(sum(device.stats[kind] for kind in ("shell", "sync")) - before)
+        if len(device.list_files(remote_dir)) != args.files:
+            incomplete += 1
+
+        started = time.perf_counter()
+        await send_upload_notification(args.device, timestamp, True)
+        notify_elapsed = time.perf_counter() - started
+
+        # 删除包括设备端的批量删除，立即刷新回收器而不是等待下一轮
+        started = time.perf_counter()
+        await delete_device_album(args.device, format_folder_name(timestamp))
+        await reaper.flush_remote()
+        await reaper.reap_local()
+        delete_elapsed = time.perf_counter() - started
+
+        if i >= args.warmup:
+            samples["send_images_to_device"].append(push_elapsed)
+            samples["send_upload_notification"].append(notify_elapsed)
+            samples["delete_device_album"].append(delete_elapsed)
+
+    album_index.close()
+
+    results = {case: summarize(values) for case, values in samples.items()}
+    push = results["send_images_to_device"]
+    push["throughput_mb_s"] = album_bytes / push["median"] / 1e6 if push["median"] else 0.0
+    push["adb_commands"] = max(commands[args.warmup:] or [0])
+    push["incomplete"] = incomplete
+    if device.stats["bytes_stored"]:
+        push["wire_ratio"] = device.stats["bytes_pushed"] / device.stats["bytes_stored"]
+    results["send_images_to_device"] = push
+    return build_report("device", {
+        key: (str(value) if isinstance(value, Path) else value) for key, value in vars(args).items()
+    } | {"server_stats": dict(env.server.stats), "device_stats": dict(device.stats)}, results)
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    root = Path(tempfile.mkdtemp(prefix="bench-device-"))
+    # 上传目录和追踪输出放在临时目录中，不影响项目目录；需要在导入 app 之前设置
+    os.environ["UPLOAD_DIR"] = str(root / "uploads")
+    os.environ["TRACE_EXPORT_PATH"] = str(root / "traces.jsonl")
+    os.environ["ADB_PUSH_COMPRESSION"] = args.compression
+
+    with FakeAdbEnvironment(root=root / "adb") as env:
+        from app.core.config import Settings
+
+        env.add_device(
+            serial=Settings.DEVICE_MAPPING[args.device],
+            throughput=args.throughput_mb * 1e6 or None,
+            latency=args.latency_ms / 1e3,
+            jitter=args.jitter_ms / 1e3,
+            failure_rate=args.failure_rate,
+            flap_interval=args.flap_interval,
+            flap_duration=args.flap_duration,
+            features=DEFAULT_FEATURES + (SENDRECV_V2_FEATURES if args.features == "v2" else ()),
+            seed=args.seed,
+        )
+        report = asyncio.run(run(args, env))
+
+    shutil.rmtree(root, ignore_errors=True)
+
+    comparison = compare_with_baseline(report, args.baseline, args.tolerance) if args.baseline else None
+    print_report(report, comparison)
+    if args.output:
+        save_report(report, args.output)
+    return 1 if comparison and any(row["regressed"] for row in comparison) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
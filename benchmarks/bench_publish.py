@@ -0,0 +1,140 @@
+"""
+发布流程基准测试
+
+在回放录制界面的模拟 uiautomator2 设备上运行 AndroidAutomation.post_content，
+统计 1、9、18 张图片时一次完整发布的 RPC 次数和耗时。不需要真实手机：
+
+    python -m benchmarks.bench_publish
+    python -m benchmarks.bench_publish --images 1 9 18 --rpc-latency-ms 50 --dump-latency-ms 500
+    python -m benchmarks.bench_publish --output results/publish.json --baseline results/publish-base.json
+    python -m benchmarks.bench_publish --publish-mode share
+
+--publish-mode ui（默认，与生产配置一致）时全部在应用内选择图片；
+share 时单张图片通过分享 Intent 打开发布页，多张图片仍在应用内选择，用于比较两种方式。
+
+默认使用虚拟时钟：RPC 延迟、元素等待超时和 post_content 中的 time.sleep 只推进虚拟时间，
+结果与机器性能无关，可以直接在 CI 中与基线比较；--real-time 时真实等待。
+"""
+
+import argparse
+import os
+import posixpath
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from benchmarks.fake_adb import FakeAdbEnvironment
+from benchmarks.fake_u2 import FakeU2Backend, FakeU2Device, RealClock, Recording, VirtualClock
+from benchmarks.runner import (
+    DEFAULT_TOLERANCE, summarize, build_report, save_report, compare_with_baseline, print_report
+)
+
+# 相册时间戳（2024-01-01 00:00:00）
+ALBUM_TIMESTAMP = 1704067200
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_publish", description="发布流程基准测试")
+    parser.add_argument("--device", default="deviceA", help="设备名称（Settings.DEVICE_MAPPING 中的键）")
+    parser.add_argument("--recording", default="xhs", help="录制名称（benchmarks/fake_u2/recordings 下的目录）")
+    parser.add_argument("--images", type=int, nargs="+", default=[1, 9, 18], help="图片数量，可指定多个")
+    parser.add_argument("--title", default="基准测试标题", help="标题，空字符串表示无标题")
+    parser.add_argument("--content", default="基准测试正文", help="正文，空字符串表示无正文")
+    parser.add_argument("--publish-mode", choices=["share", "ui"], default="ui", help="发布方式")
+    parser.add_argument("--rpc-latency-ms", type=float, default=50.0, help="每次 RPC 的耗时（毫秒）")
+    parser.add_argument("--dump-latency-ms", type=float, default=500.0, help="每次 dump_hierarchy 的耗时（毫秒）")
+    parser.add_argument("--repeat", type=int, default=1, help="每个用例的运行次数")
+    parser.add_argument("--real-time", action="store_true", help="真实等待而不是使用虚拟时钟")
+    parser.add_argument("--output", type=Path, help="结果 JSON 保存路径")
+    parser.add_argument("--baseline", type=Path, help="用于比较的基线结果 JSON")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="允许的变慢比例")
+    return parser.parse_args(argv)
+
+def run_case(args: argparse.Namespace, images: int) -> dict:
+    """
+    运行一次发布
+
+    Returns:
+        dict: {"elapsed", "cpu", "status", "rpcs", "selected", "screens"}
+    """
+    from app.core.config import Settings, UPLOAD_DIR, format_folder_name
+    from app.device import automation
+
+    album = format_folder_name(ALBUM_TIMESTAMP)
+    storage_path = Settings.DEVICE_CONFIG[args.device]["storage_path"]
+    recording = Recording.load(args.recording, {
+        "album": album,
+        "images": images,
+        "package": Settings.DEVICE_CONFIG[args.device]["app_package"],
+    })
+    clock = RealClock() if args.real_time else VirtualClock()
+    device = FakeU2Device(
+        recording, clock,
+        rpc_latency=args.rpc_latency_ms / 1e3,
+        dump_latency=args.dump_latency_ms / 1e3,
+        serial=Settings.DEVICE_MAPPING[args.device],
+        media={posixpath.join(storage_path, album, f"{i:03d}.jpg"): 1000 + i for i in range(images)},
+    )
+    image_paths = [str(UPLOAD_DIR / args.device / album / "imgs" / f"{i:03d}.jpg") for i in range(images)]
+
+    started = time.process_time()
+    with mock.patch.object(automation, "u2", FakeU2Backend({device.serial: device})), \
+            mock.patch.object(automation, "time", clock), \
+            mock.patch.dict(Settings.AUTOMATION_CONFIG, {"PUBLISH_MODE": args.publish_mode}):
+        runner = automation.AndroidAutomation(args.device)
+        runner.connect_device()
+        _, status = runner.post_content(args.title or None, args.content or None, image_paths)
+    cpu = time.process_time() - started
+
+    return {
+        "elapsed": clock.elapsed,
+        "cpu": cpu,
+        "status": status,
+        "rpcs": dict(device.rpcs),
+        "selected": sum(1 for tap in device.taps if tap["screen"] == "grid" and tap["target"] == "android.widget.ImageView"),
+        "screens": device.history,
+    }
+
+def run(args: argparse.Namespace) -> dict:
+    """运行全部用例并生成结果报告"""
+    results = {}
+    details = {}
+    for images in args.images:
+        runs = [run_case(args, images) for _ in range(max(1, args.repeat))]
+        last = runs[-1]
+        stats = summarize([item["elapsed"] for item in runs])
+        stats["rpcs"] = sum(last["rpcs"].values())
+        stats["dumps"] = last["rpcs"].get("dump_hierarchy", 0)
+        stats["selected"] = last["selected"]
+        stats["cpu_ms"] = sum(item["cpu"] for item in runs) / len(runs) * 1e3
+        stats["status"] = last["status"]
+        results[f"publish_{images}"] = stats
+        details[f"publish_{images}"] = {"rpcs": last["rpcs"], "screens": last["screens"]}
+
+    params = {key: (str(value) if isinstance(value, Path) else value) for key, value in vars(args).items()}
+    report = build_report("publish", params, results)
+    report["details"] = details
+    return report
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    root = Path(tempfile.mkdtemp(prefix="bench-publish-"))
+    # 需要在导入 app 之前设置；ADB 替身只用于让 app.device 的导入不依赖真实的 adb
+    os.environ["UPLOAD_DIR"] = str(root / "uploads")
+    os.environ["TRACE_EXPORT_PATH"] = str(root / "traces.jsonl")
+
+    with FakeAdbEnvironment(root=root / "adb"):
+        report = run(args)
+    shutil.rmtree(root, ignore_errors=True)
+
+    comparison = compare_with_baseline(report, args.baseline, args.tolerance) if args.baseline else None
+    print_report(report, comparison)
+    if args.output:
+        save_report(report, args.output)
+    failed = any(stats["status"] != "SUCCESS" for stats in report["results"].values())
+    return 1 if failed or (comparison and any(row["regressed"] for row in comparison)) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
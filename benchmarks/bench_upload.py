@@ -0,0 +1,168 @@
+"""
+上传路径微基准测试
+
+逐个测量上传服务和时间处理的热点函数，图片大小和文件数量可以参数化：
+- FileBase64 校验（Base64 解码检查）
+- save_single_file、process_image_files、create_directory_structure
+- format_folder_name、get_shanghai_time
+- get_content_from_file（读取相册清单）
+
+    python -m benchmarks.bench_upload
+    python -m benchmarks.bench_upload --sizes-kb 10 1024 20480 --counts 1 9 18
+    python -m benchmarks.bench_upload --baseline benchmarks/baselines/upload.json
+
+基线结果保存在 benchmarks/baselines/upload.json。优化上传路径后用
+--output benchmarks/baselines/upload.json 重新生成并一起提交，评审时可以直接看到数值变化；
+基线与机器相关，比较时请在同一台机器上先生成一份本地基线。
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+import shutil
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Callable, List
+
+from benchmarks.fake_adb import FakeAdbEnvironment
+from benchmarks.runner import (
+    DEFAULT_TOLERANCE, summarize, build_report, save_report, compare_with_baseline, print_report, measure_async
+)
+
+# 相册时间戳（2024-01-01 00:00:00）
+ALBUM_TIMESTAMP = 1704067200
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_upload", description="上传路径微基准测试")
+    parser.add_argument("--device", default="deviceA", help="设备名称（Settings.DEVICE_MAPPING 中的键）")
+    parser.add_argument("--sizes-kb", type=int, nargs="+", default=[10, 100, 1024, 5120, 20480],
+                        help="单个文件用例的图片大小（KB），可指定多个")
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 9, 18], help="process_image_files 的图片数量")
+    parser.add_argument("--album-size-kb", type=int, default=512, help="process_image_files 每张图片的大小（KB）")
+    parser.add_argument("--repeat", type=int, default=5, help="计时运行次数")
+    parser.add_argument("--warmup", type=int, default=1, help="预热次数")
+    parser.add_argument("--number", type=int, default=1000, help="耗时很短的用例每次运行的调用次数")
+    parser.add_argument("--output", type=Path, help="结果 JSON 保存路径")
+    parser.add_argument("--baseline", type=Path, help="用于比较的基线结果 JSON，例如 benchmarks/baselines/upload.json")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="允许的变慢比例")
+    return parser.parse_args(argv)
+
+def format_size(size_kb: int) -> str:
+    """用例名称中的大小，例如 10KB、20MB"""
+    return f"{size_kb // 1024}MB" if size_kb >= 1024 and size_kb % 1024 == 0 else f"{size_kb}KB"
+
+def make_file(size_kb: int, name: str = "000.jpg"):
+    """生成一个随机内容的 FileBase64"""
+    from app.models.request import FileBase64
+
+    return FileBase64(filename=name, data=base64.b64encode(os.urandom(size_kb * 1024)).decode())
+
+def repeat_calls(func: Callable, number: int) -> Callable:
+    """把耗时很短的函数包装为一次运行调用 number 次"""
+    async def run():
+        for _ in range(number):
+            result = func()
+            if asyncio.iscoroutine(result):
+                await result
+    return run
+
+async def run(args: argparse.Namespace, root: Path) -> dict:
+    """运行全部用例并生成结果报告"""
+    from app.core.config import format_folder_name, get_shanghai_time
+    from app.models.request import FileBase64, UploadRequest
+    from app.scheduler.tasks import get_content_from_file
+    from app.services.album_index import album_index
+    from app.services.upload_service import (
+        process_upload, save_single_file, process_image_files, create_directory_structure
+    )
+
+    scratch = root / "scratch"
+
+    def new_album_dir() -> Path:
+        album_dir = scratch / uuid.uuid4().hex
+        (album_dir / "imgs").mkdir(parents=True)
+        return album_dir
+
+    def clear_scratch():
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    results = {}
+
+    def add(case: str, samples: List[float], nbytes: int = 0, number: int = 1):
+        stats = summarize([sample / number for sample in samples])
+        if number > 1:
+            stats["number"] = number
+        if nbytes:
+            stats["throughput_mb_s"] = nbytes / stats["median"] / 1e6 if stats["median"] else 0.0
+        results[case] = stats
+
+    for size_kb in args.sizes_kb:
+        label = format_size(size_kb)
+        file = make_file(size_kb)
+        raw = {"filename": file.filename, "data": file.data}
+        nbytes = size_kb * 1024
+
+        add(f"file_base64_validate_{label}", await measure_async(
+            lambda: FileBase64(**raw), args.repeat, args.warmup
+        ), nbytes)
+        add(f"save_single_file_{label}", await measure_async(
+            lambda album_dir: save_single_file(album_dir, file), args.repeat, args.warmup, new_album_dir
+        ), nbytes)
+        clear_scratch()
+
+    for count in args.counts:
+        files = [make_file(args.album_size_kb, f"{i:03d}.jpg") for i in range(count)]
+        add(f"process_image_files_{count}x{format_size(args.album_size_kb)}", await measure_async(
+            lambda album_dir: process_image_files(album_dir, files), args.repeat, args.warmup, new_album_dir
+        ), count * args.album_size_kb * 1024)
+        clear_scratch()
+
+    request = UploadRequest(device_name=args.device, timestamp=ALBUM_TIMESTAMP, files=[])
+    staging_number = max(1, args.number // 10)
+    add("create_directory_structure", await measure_async(
+        repeat_calls(lambda: create_directory_structure(request), staging_number), args.repeat, args.warmup
+    ), number=staging_number)
+
+    add("format_folder_name", await measure_async(
+        repeat_calls(lambda: format_folder_name(ALBUM_TIMESTAMP), args.number), args.repeat, args.warmup
+    ), number=args.number)
+    add("get_shanghai_time", await measure_async(
+        repeat_calls(lambda: get_shanghai_time(ALBUM_TIMESTAMP), args.number), args.repeat, args.warmup
+    ), number=args.number)
+
+    await process_upload(UploadRequest(
+        device_name=args.device, timestamp=ALBUM_TIMESTAMP, title="基准测试标题", content="基准测试正文" * 50,
+        files=[make_file(10)]
+    ))
+    manifest_number = max(1, args.number // 10)
+    add("get_content_from_file", await measure_async(
+        repeat_calls(lambda: get_content_from_file(args.device, ALBUM_TIMESTAMP), manifest_number),
+        args.repeat, args.warmup
+    ), number=manifest_number)
+
+    album_index.close()
+    params = {key: (str(value) if isinstance(value, Path) else value) for key, value in vars(args).items()}
+    return build_report("upload", params, results)
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    root = Path(tempfile.mkdtemp(prefix="bench-upload-"))
+    # 上传目录和追踪输出放在临时目录中，不影响项目目录；需要在导入 app 之前设置
+    os.environ["UPLOAD_DIR"] = str(root / "uploads")
+    os.environ["TRACE_EXPORT_PATH"] = str(root / "traces.jsonl")
+
+    with FakeAdbEnvironment(root=root / "adb"):
+        report = asyncio.run(run(args, root))
+    shutil.rmtree(root, ignore_errors=True)
+
+    comparison = compare_with_baseline(report, args.baseline, args.tolerance) if args.baseline else None
+    print_report(report, comparison)
+    if args.output:
+        save_report(report, args.output)
+    return 1 if comparison and any(row["regressed"] for row in comparison) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
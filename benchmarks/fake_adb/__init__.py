@@ -0,0 +1,17 @@
+# adb 包装脚本每条命令都会导入本包，服务器相关模块（asyncio 等）按需导入以减少命令启动耗时
+_EXPORTS = {
+    'FakeDevice': 'device',
+    'InjectedFailure': 'device',
+    'SENDRECV_V2_FEATURES': 'device',
+    'FakeAdbServer': 'server',
+    'FakeAdbEnvironment': 'environment',
+    'write_adb_wrapper': 'environment',
+}
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    return getattr(import_module(f"{__name__}.{_EXPORTS[name]}"), name)
+
+__all__ = list(_EXPORTS)
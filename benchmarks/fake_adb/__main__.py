@@ -0,0 +1,47 @@
+"""
+python -m benchmarks.fake_adb server [--config 配置文件] [--port 端口] [--root 目录] [--device 设备ID ...]
+python -m benchmarks.fake_adb [-s 设备ID] [-P 端口] 命令 ...
+"""
+
+import sys
+
+from benchmarks.fake_adb.client import main as client_main
+
+def server_main(argv) -> int:
+    """以前台进程运行模拟 ADB 服务器"""
+    import argparse
+    import asyncio
+    import logging
+    import tempfile
+    from benchmarks.fake_adb.protocol import DEFAULT_PORT
+    from benchmarks.fake_adb.server import FakeAdbServer, load_config
+
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.fake_adb server")
+    parser.add_argument("--config", help="JSON 配置文件")
+    parser.add_argument("--port", type=int, help=f"监听端口（默认 {DEFAULT_PORT}）")
+    parser.add_argument("--root", help="设备目录（默认临时目录）")
+    parser.add_argument("--device", action="append", default=[], help="设备ID，可重复指定")
+    parser.add_argument("--throughput", type=float, help="传输带宽（字节/秒）")
+    parser.add_argument("--latency", type=float, default=0.0, help="每条命令的延迟（秒）")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config) if args.config else {}
+    config.setdefault("root", args.root or tempfile.mkdtemp(prefix="fake-adb-"))
+    if args.port is not None:
+        config["port"] = args.port
+    config.setdefault("devices", [])
+    for serial in args.device:
+        config["devices"].append({"serial": serial, "throughput": args.throughput, "latency": args.latency})
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    server = FakeAdbServer.from_config(config)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["server"]:
+        sys.exit(server_main(sys.argv[2:]))
+    sys.exit(client_main())
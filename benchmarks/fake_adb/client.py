@@ -0,0 +1,383 @@
+"""
+模拟 adb 命令行
+
+实现 ADBInterface 使用的命令行子集，通过主机协议与模拟 ADB 服务器通信：
+    adb [-s 设备ID] [-H 地址] [-P 端口] start-server | kill-server | version
+    adb devices [-l]
+    adb connect 地址 | disconnect 地址
+    adb [-s 设备ID] get-state | features | shell 命令... | ls 设备端目录
+    adb [-s 设备ID] push [-z 算法 | -Z] 本地文件... 设备端路径
+
+与 adb 一致，服务器端口取自 -P 或环境变量 ANDROID_ADB_SERVER_PORT，设备ID取自 -s 或 ANDROID_SERIAL。
+push 在设备支持 sendrecv_v2 时使用 SND2，默认压缩算法为 any（brotli），
+环境变量 ADB_COMPRESSION=0 或 -Z 时不压缩。
+服务器未运行时按环境变量 FAKE_ADB_CONFIG 指定的配置在后台启动。
+"""
+
+import os
+import socket
+import stat
+import struct
+import subprocess
+import sys
+import time
+import zlib
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from benchmarks.fake_adb.protocol import (
+    DEFAULT_PORT, OKAY, SYNC_DATA_MAX, COMPRESSION_FLAGS, ZLIB_LEVELS, ProtocolError,
+    encode_request, encode_sync, encode_sync_value, decode_sync_header
+)
+
+# 等待后台服务器启动的最长时间（秒）
+SERVER_START_TIMEOUT = 5.0
+
+class Connection:
+    """与服务器的一个连接"""
+
+    def __init__(self, host: str, port: int):
+        self.sock = socket.create_connection((host, port), timeout=60)
+
+    def close(self):
+        self.sock.close()
+
+    def read_exactly(self, n: int) -> bytes:
+        """读取 n 个字节"""
+        chunks = []
+        while n > 0:
+            chunk = self.sock.recv(min(n, 1024 * 1024))
+            if not chunk:
+                raise ProtocolError("protocol fault (connection closed)")
+            chunks.append(chunk)
+            n -= len(chunk)
+        return b"".join(chunks)
+
+    def read_string(self) -> str:
+        """读取带 4 位十六进制长度前缀的字符串"""
+        return self.read_exactly(int(self.read_exactly(4), 16)).decode("utf-8", "replace")
+
+    def read_all(self) -> bytes:
+        """读取到连接关闭"""
+        chunks = []
+        while True:
+            chunk = self.sock.recv(1024 * 1024)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+
+    def request(self, service: str):
+        """
+        发送服务请求并检查响应状态
+
+        Raises:
+            ProtocolError: 服务器返回 FAIL
+        """
+        self.sock.sendall(encode_request(service))
+        status = self.read_exactly(4)
+        if status != OKAY:
+            raise ProtocolError(self.read_string())
+
+class AdbClient:
+    """
+    主机协议客户端
+
+    属性:
+        host (str): 服务器地址
+        port (int): 服务器端口
+        serial (Optional[str]): 目标设备ID
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, serial: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.serial = serial
+
+    def connect(self) -> Connection:
+        return Connection(self.host, self.port)
+
+    def is_running(self) -> bool:
+        """服务器是否可以连接"""
+        try:
+            self.connect().close()
+            return True
+        except OSError:
+            return False
+
+    def start_server(self) -> bool:
+        """
+        确保服务器正在运行，必要时按 FAKE_ADB_CONFIG 在后台启动
+
+        Returns:
+            bool: 是否新启动了服务器
+        """
+        if self.is_running():
+            return False
+        config = os.environ.get("FAKE_ADB_CONFIG")
+        if not config:
+            raise ProtocolError("cannot connect to daemon and FAKE_ADB_CONFIG is not set")
+        subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.fake_adb", "server", "--config", config, "--port", str(self.port)],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.is_running():
+                return True
+            time.sleep(0.05)
+        raise ProtocolError("cannot connect to daemon")
+
+    def host_query(self, service: str) -> str:
+        """执行一个返回字符串的主机服务"""
+        conn = self.connect()
+        try:
+            conn.request(service)
+            return conn.read_string()
+        finally:
+            conn.close()
+
+    def host_command(self, service: str):
+        """执行一个只返回状态的主机服务"""
+        conn = self.connect()
+        try:
+            conn.request(service)
+        finally:
+            conn.close()
+
+    def transport(self) -> Connection:
+        """打开一个已选择目标设备的连接"""
+        conn = self.connect()
+        try:
+            conn.request(f"host:transport:{self.serial}" if self.serial else "host:transport-any")
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def device_query(self, service: str) -> str:
+        """执行一个针对目标设备的主机服务，例如 features"""
+        prefix = f"host-serial:{self.serial}" if self.serial else "host"
+        return self.host_query(f"{prefix}:{service}")
+
+    def shell(self, command: str) -> bytes:
+        """
+        执行 shell 命令
+
+        Args:
+            command: 命令行
+
+        Returns:
+            bytes: 命令输出
+        """
+        conn = self.transport()
+        try:
+            conn.request(f"shell:{command}")
+            return conn.read_all()
+        finally:
+            conn.close()
+
+    def stat(self, conn: Connection, remote_path: str) -> Tuple[int, int, int]:
+        """在 sync 会话中获取设备端文件信息"""
+        conn.sock.sendall(encode_sync(b"STAT", remote_path.encode("utf-8")))
+        data = conn.read_exactly(16)
+        if data[:4] != b"STAT":
+            raise ProtocolError("protocol fault (bad STAT response)")
+        return tuple(int.from_bytes(data[i:i + 4], "little") for i in (4, 8, 12))
+
+    def push(self, local_paths: List[str], remote_path: str,
+             compression: str = "any") -> List[Tuple[str, str, int, float]]:
+        """
+        推送文件
+
+        Args:
+            local_paths: 本地文件路径
+            remote_path: 设备端路径，推送多个文件或路径为已存在的目录时视为目录
+            compression: 压缩算法（any、none、brotli、lz4、zstd），设备不支持时不压缩
+
+        Returns:
+            list: [(本地路径, 设备端路径, 字节数, 耗时)]
+        """
+        features = set(self.device_query("features").split(","))
+        v2 = "sendrecv_v2" in features
+        if compression == "any":
+            compression = "brotli"
+        flags = COMPRESSION_FLAGS.get(compression, 0) if f"sendrecv_v2_{compression}" in features else 0
+
+        conn = self.transport()
+        results = []
+        try:
+            conn.request("sync:")
+            mode, _, _ = self.stat(conn, remote_path)
+            to_dir = len(local_paths) > 1 or remote_path.endswith("/") or stat.S_ISDIR(mode)
+            for local_path in local_paths:
+                target = f"{remote_path.rstrip('/')}/{Path(local_path).name}" if to_dir else remote_path
+                results.append(self._send(conn, local_path, target, v2, flags))
+            conn.sock.sendall(encode_sync_value(b"QUIT", 0))
+        finally:
+            conn.close()
+        return results
+
+    def _send(self, conn: Connection, local_path: str, remote_path: str,
+              v2: bool = False, flags: int = 0) -> Tuple[str, str, int, float]:
+        """在 sync 会话中发送一个文件，v2 时使用 SND2 并按 flags 压缩数据"""
+        started = time.monotonic()
+        st = os.stat(local_path)
+        mode = stat.S_IMODE(st.st_mode) | stat.S_IFREG
+        if v2:
+            conn.sock.sendall(encode_sync(b"SND2", remote_path.encode("utf-8")) + struct.pack("<4sII", b"SND2", mode, flags))
+        else:
+            conn.sock.sendall(encode_sync(b"SEND", f"{remote_path},{mode}".encode("utf-8")))
+        compressor = zlib.compressobj(ZLIB_LEVELS[flags]) if flags else None
+        size = 0
+        with open(local_path, "rb") as f:
+            while True:
+                data = f.read(SYNC_DATA_MAX)
+                if not data:
+                    break
+                size += len(data)
+                self._send_data(conn, compressor.compress(data) if compressor else data)
+        if compressor is not None:
+            self._send_data(conn, compressor.flush())
+        conn.sock.sendall(encode_sync_value(b"DONE", int(st.st_mtime)))
+        tag, length = decode_sync_header(conn.read_exactly(8))
+        if tag != OKAY:
+            message = conn.read_exactly(length).decode("utf-8", "replace")
+            raise ProtocolError(f"failed to copy '{local_path}' to '{remote_path}': {message}")
+        return local_path, remote_path, size, time.monotonic() - started
+
+    @staticmethod
+    def _send_data(conn: Connection, data: bytes):
+        """以不超过 SYNC_DATA_MAX 的 DATA 包发送数据"""
+        for offset in range(0, len(data), SYNC_DATA_MAX):
+            conn.sock.sendall(encode_sync(b"DATA", data[offset:offset + SYNC_DATA_MAX]))
+
+    def list_dir(self, remote_path: str) -> List[Tuple[str, int, int, int]]:
+        """
+        列出设备端目录
+
+        Returns:
+            list: [(名称, mode, size, mtime)]
+        """
+        conn = self.transport()
+        entries = []
+        try:
+            conn.request("sync:")
+            conn.sock.sendall(encode_sync(b"LIST", remote_path.encode("utf-8")))
+            while True:
+                header = conn.read_exactly(20)
+                if header[:4] == b"DONE":
+                    break
+                mode, size, mtime, length = (int.from_bytes(header[i:i + 4], "little") for i in (4, 8, 12, 16))
+                entries.append((conn.read_exactly(length).decode("utf-8", "replace"), mode, size, mtime))
+            conn.sock.sendall(encode_sync_value(b"QUIT", 0))
+        finally:
+            conn.close()
+        return entries
+
+def parse_global_options(argv: List[str]) -> Tuple[AdbClient, List[str]]:
+    """解析全局选项 -s、-H、-P"""
+    host = "127.0.0.1"
+    port = int(os.environ.get("ANDROID_ADB_SERVER_PORT", DEFAULT_PORT))
+    serial = os.environ.get("ANDROID_SERIAL") or None
+    args = list(argv)
+    while len(args) >= 2 and args[0] in ("-s", "-H", "-P"):
+        option, value = args[0], args[1]
+        args = args[2:]
+        if option == "-s":
+            serial = value
+        elif option == "-H":
+            host = value
+        else:
+            port = int(value)
+    return AdbClient(host, port, serial), args
+
+def parse_push_options(args: List[str]) -> Tuple[List[str], str]:
+    """
+    解析 push 的选项
+
+    Returns:
+        tuple: (路径列表, 压缩算法)
+    """
+    compression = "none" if os.environ.get("ADB_COMPRESSION") == "0" else "any"
+    paths = []
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        if arg == "-z" and args:
+            compression = args.pop(0)
+        elif arg == "-Z":
+            compression = "none"
+        elif not arg.startswith("-"):
+            paths.append(arg)
+    return paths, compression
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    命令行入口
+
+    Args:
+        argv: 命令行参数（不含程序名）
+
+    Returns:
+        int: 退出码
+    """
+    client, args = parse_global_options(sys.argv[1:] if argv is None else argv)
+    if not args:
+        print("usage: adb [-s SERIAL] [-P PORT] COMMAND ...", file=sys.stderr)
+        return 1
+    command, args = args[0], args[1:]
+
+    try:
+        if command == "kill-server":
+            if client.is_running():
+                client.host_command("host:kill")
+            return 0
+
+        if client.start_server() or command == "start-server":
+            if command == "start-server":
+                return 0
+            print("* daemon started successfully", file=sys.stderr)
+
+        if command == "version":
+            version = int(client.host_query("host:version"), 16)
+            print(f"Android Debug Bridge version 1.0.{version}\nfake_adb")
+        elif command == "devices":
+            listing = client.host_query("host:devices-l" if "-l" in args else "host:devices")
+            print("List of devices attached")
+            print(listing)
+        elif command == "connect" and args:
+            print(client.host_query(f"host:connect:{args[0]}"))
+        elif command == "disconnect" and args:
+            print(client.host_query(f"host:disconnect:{args[0]}"))
+        elif command == "get-state":
+            print(client.device_query("get-state"))
+        elif command == "features":
+            print("\n".join(client.device_query("features").split(",")))
+        elif command == "shell":
+            output = client.shell(" ".join(args))
+            sys.stdout.buffer.write(output)
+            sys.stdout.flush()
+        elif command == "push" and len(args) >= 2:
+            paths, compression = parse_push_options(args)
+            started = time.monotonic()
+            results = client.push(paths[:-1], paths[-1], compression)
+            total = sum(size for _, _, size, _ in results)
+            elapsed = max(time.monotonic() - started, 1e-6)
+            summary = f"{len(results)} file{'s' if len(results) != 1 else ''} pushed, 0 skipped."
+            name = paths[0] if len(results) == 1 else paths[-1]
+            print(f"{name}: {summary} {total / elapsed / 1e6:.1f} MB/s ({total} bytes in {elapsed:.3f}s)")
+        elif command == "ls" and args:
+            for name, mode, size, mtime in client.list_dir(args[0]):
+                print(f"{mode:08x} {size:08x} {mtime:08x} {name}")
+        else:
+            print(f"adb: unknown command {command}", file=sys.stderr)
+            return 1
+    except ProtocolError as e:
+        prefix = "adb: error" if command == "push" else "error"
+        print(f"{prefix}: {e}", file=sys.stderr)
+        return 1
+    except OSError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    return 0
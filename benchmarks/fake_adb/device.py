@@ -0,0 +1,296 @@
+"""
+模拟设备
+
+每台模拟设备把设备端文件系统映射到临时目录下的独立子目录，并模拟：
+1. USB/Wi-Fi 传输带宽（推送时按字节数计算耗时）
+2. 每条命令的固定延迟和随机抖动
+3. 周期性离线（掉线后在 adb devices 中显示为 offline）
+4. 按概率注入的命令失败
+
+shell 命令交给本机 sh 执行，命令中的设备端路径被改写到模拟设备的目录下，
+am、input 等安卓命令由模拟设备目录中的桩脚本代替。
+"""
+
+import asyncio
+import os
+import random
+import re
+import stat
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 映射到模拟设备目录的设备端路径前缀
+DEVICE_PATH_PREFIXES = ("/storage", "/sdcard", "/data/local/tmp")
+
+# 命令中的设备端绝对路径
+DEVICE_PATH = re.compile(
+    r"(?<![\w./-])(" + "|".join(re.escape(prefix) for prefix in DEVICE_PATH_PREFIXES) + r")(?=[/\s'\";&|)]|$)"
+)
+
+# 安卓命令桩：命令名 -> 脚本内容
+STUB_COMMANDS: Dict[str, str] = {
+    "am": (
+        'if [ "$1" = "broadcast" ]; then\n'
+        '  echo "Broadcasting: Intent { $* }"\n'
+        '  echo "Broadcast completed: result=0"\n'
+        'fi\n'
+    ),
+    "getprop": (
+        'case "$1" in\n'
+        '  ro.build.version.sdk) echo 30 ;;\n'
+        '  ro.build.version.release) echo 11 ;;\n'
+        '  ro.product.model) echo FakeDevice ;;\n'
+        'esac\n'
+    ),
+    "input": "",
+    "wm": "",
+    "settings": "",
+    "dumpsys": (
+        'case "$1" in\n'
+        '  battery) printf "Current Battery Service state:\\n  AC powered: false\\n  USB powered: true\\n'
+        '  status: 2\\n  level: 87\\n  temperature: 312\\n" ;;\n'
+        '  power) echo "  mWakefulness=Asleep" ;;\n'
+        '  window) printf "  mDreamingLockscreen=true\\n  mCurrentFocus=Window{1a2b3c u0 NotificationShade}\\n" ;;\n'
+        '  package) echo "    versionName=8.1.0" ;;\n'
+        'esac\n'
+    ),
+    "pm": "",
+    "monkey": "",
+}
+
+# 默认特性列表（adb features 的输出）
+DEFAULT_FEATURES = ("cmd", "fixed_push_mkdir")
+
+# 支持压缩传输（push -z）的设备额外具有的特性
+SENDRECV_V2_FEATURES = (
+    "sendrecv_v2", "sendrecv_v2_brotli", "sendrecv_v2_lz4", "sendrecv_v2_zstd", "sendrecv_v2_dry_run_send"
+)
+
+class InjectedFailure(Exception):
+    """按失败率注入的命令失败"""
+    pass
+
+class FakeDevice:
+    """
+    模拟设备
+
+    属性:
+        serial (str): 设备ID，包含冒号时视为需要 adb connect 的 TCP/IP 设备
+        root (Path): 设备端文件系统在本机的根目录
+        throughput (Optional[float]): 传输带宽（字节/秒），None 表示不限速
+        latency (float): 每条命令的固定延迟（秒）
+        jitter (float): 每条命令额外的随机延迟上限（秒）
+        failure_rate (float): 命令失败的概率（0~1）
+        flap_interval (float): 离线周期（秒），0 表示不掉线
+        flap_duration (float): 每个周期末尾的离线时长（秒）
+        features (tuple): adb features 的输出
+        connected (bool): TCP/IP 设备是否已 adb connect
+        stats (Counter): 按服务类型统计的请求数和推送字节数
+    """
+
+    def __init__(self, serial: str, root: Path, throughput: Optional[float] = None,
+                 latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0,
+                 flap_interval: float = 0.0, flap_duration: float = 0.0,
+                 features: Iterable[str] = DEFAULT_FEATURES, seed: Optional[int] = None):
+        self.serial = serial
+        self.root = Path(root)
+        self.throughput = throughput
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.flap_interval = flap_interval
+        self.flap_duration = flap_duration
+        self.features = tuple(features)
+        self.is_tcp = ":" in serial
+        self.connected = not self.is_tcp
+        self.stats: Counter = Counter()
+        self._random = random.Random(seed)
+        self._created = time.monotonic()
+        self._bin_dir = self.root / ".bin"
+        self._setup()
+
+    @classmethod
+    def from_config(cls, root: Path, config: dict) -> "FakeDevice":
+        """
+        根据配置字典创建模拟设备
+
+        Args:
+            root: 所有模拟设备共用的根目录，设备目录为 root/设备ID
+            config: 配置，serial 之外的键与构造函数参数同名
+
+        Returns:
+            FakeDevice: 模拟设备
+        """
+        options = dict(config)
+        serial = options.pop("serial")
+        return cls(serial, Path(root) / re.sub(r"[^\w.-]", "_", serial), **options)
+
+    def to_config(self) -> dict:
+        """导出为 from_config 可用的配置字典"""
+        return {
+            "serial": self.serial,
+            "throughput": self.throughput,
+            "latency": self.latency,
+            "jitter": self.jitter,
+            "failure_rate": self.failure_rate,
+            "flap_interval": self.flap_interval,
+            "flap_duration": self.flap_duration,
+            "features": list(self.features),
+        }
+
+    def _setup(self):
+        """创建设备目录和命令桩"""
+        for prefix in DEVICE_PATH_PREFIXES:
+            (self.root / prefix.lstrip("/")).mkdir(parents=True, exist_ok=True)
+        self._bin_dir.mkdir(parents=True, exist_ok=True)
+        for name, body in STUB_COMMANDS.items():
+            path = self._bin_dir / name
+            path.write_text("#!/bin/sh\n" + body, encoding="utf-8")
+            path.chmod(path.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+    @property
+    def state(self) -> str:
+        """
+        当前状态
+
+        Returns:
+            str: device（在线）或 offline（处于掉线区间）
+        """
+        if self.flap_interval > 0 and self.flap_duration > 0:
+            phase = (time.monotonic() - self._created) % self.flap_interval
+            if phase >= self.flap_interval - self.flap_duration:
+                return "offline"
+        return "device"
+
+    @property
+    def visible(self) -> bool:
+        """是否出现在 adb devices 的列表中"""
+        return self.connected
+
+    async def delay(self):
+        """模拟命令延迟"""
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter > 0 else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def check_failure(self, service: str):
+        """
+        按失败率注入失败
+
+        Args:
+            service: 服务名称，用于错误信息
+
+        Raises:
+            InjectedFailure: 本次命令需要失败
+        """
+        if self.failure_rate > 0 and self._random.random() < self.failure_rate:
+            self.stats["failures"] += 1
+            raise InjectedFailure(f"injected failure: {service}")
+
+    async def transfer(self, nbytes: int):
+        """
+        模拟传输 nbytes 字节所需的时间
+
+        Args:
+            nbytes: 字节数
+        """
+        self.stats["bytes_pushed"] += nbytes
+        if self.throughput:
+            await asyncio.sleep(nbytes / self.throughput)
+
+    def local_path(self, remote_path: str) -> Path:
+        """
+        设备端路径对应的本机路径
+
+        Args:
+            remote_path: 设备端绝对路径
+
+        Returns:
+            Path: 模拟设备目录下的路径
+        """
+        path = Path(self.root, *[part for part in remote_path.split("/") if part not in ("", ".", "..")])
+        return path
+
+    def to_local_command(self, command: str) -> str:
+        """将命令中的设备端路径改写为本机路径"""
+        root = str(self.root)
+        return DEVICE_PATH.sub(lambda match: root + match.group(1), command)
+
+    def to_device_output(self, output: bytes) -> bytes:
+        """将输出中的本机路径还原为设备端路径"""
+        return output.replace(str(self.root).encode("utf-8"), b"")
+
+    async def shell(self, command: str) -> Tuple[bytes, int]:
+        """
+        执行 shell 命令
+
+        Args:
+            command: 命令行
+
+        Returns:
+            tuple: (标准输出和标准错误合并后的输出, 退出码)
+        """
+        if not command.strip():
+            return b"", 0
+        env = dict(os.environ)
+        env["PATH"] = f"{self._bin_dir}{os.pathsep}{env.get('PATH', '')}"
+        process = await asyncio.create_subprocess_exec(
+            "/bin/sh", "-c", self.to_local_command(command),
+            cwd=str(self.root),
+            env=env,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+        )
+        output, _ = await process.communicate()
+        return self.to_device_output(output), process.returncode
+
+    def stat(self, remote_path: str) -> Tuple[int, int, int]:
+        """
+        获取设备端文件信息
+
+        Args:
+            remote_path: 设备端路径
+
+        Returns:
+            tuple: (mode, size, mtime)，文件不存在时全为 0
+        """
+        try:
+            st = self.local_path(remote_path).stat()
+        except OSError:
+            return 0, 0, 0
+        return st.st_mode, st.st_size, int(st.st_mtime)
+
+    def list_dir(self, remote_path: str) -> List[Tuple[str, int, int, int]]:
+        """
+        列出设备端目录
+
+        Args:
+            remote_path: 设备端目录路径
+
+        Returns:
+            list: [(名称, mode, size, mtime)]，目录不存在时为空
+        """
+        entries = []
+        try:
+            with os.scandir(self.local_path(remote_path)) as it:
+                for entry in it:
+                    st = entry.stat(follow_symlinks=False)
+                    entries.append((entry.name, st.st_mode, st.st_size, int(st.st_mtime)))
+        except OSError:
+            pass
+        return sorted(entries)
+
+    def list_files(self, remote_dir: str) -> List[str]:
+        """
+        列出设备端目录下的文件名（供基准测试校验推送结果）
+
+        Args:
+            remote_dir: 设备端目录路径
+
+        Returns:
+            list: 文件名，按名称排序
+        """
+        return [name for name, mode, _, _ in self.list_dir(remote_dir) if stat.S_ISREG(mode)]
@@ -0,0 +1,114 @@
+"""
+模拟 ADB 运行环境
+
+在临时目录中准备一整套替身：模拟设备目录、进程内的模拟 ADB 服务器、
+以及可作为 Settings.ADB_PATH 使用的 adb 包装脚本。
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from benchmarks.fake_adb.device import FakeDevice
+from benchmarks.fake_adb.server import FakeAdbServer
+
+# 项目根目录（包装脚本需要能导入 benchmarks 包）
+PROJECT_DIR = Path(__file__).resolve().parent.parent.parent
+
+def write_adb_wrapper(directory: Path) -> Path:
+    """
+    写入调用模拟 adb 命令行的包装脚本
+
+    Args:
+        directory: 脚本所在目录
+
+    Returns:
+        Path: 脚本路径
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    if os.name == "nt":
+        path = directory / "adb.cmd"
+        path.write_text(
+            f'@set "PYTHONPATH={PROJECT_DIR};%PYTHONPATH%"\r\n'
+            f'@"{sys.executable}" -S -m benchmarks.fake_adb %*\r\n',
+            encoding="utf-8"
+        )
+    else:
+        path = directory / "adb"
+        # -S：命令行只依赖标准库，跳过 site 可以减少每条命令的启动耗时
+        path.write_text(
+            "#!/bin/sh\n"
+            f'PYTHONPATH="{PROJECT_DIR}${{PYTHONPATH:+:$PYTHONPATH}}" exec "{sys.executable}" -S -m benchmarks.fake_adb "$@"\n',
+            encoding="utf-8"
+        )
+        path.chmod(0o755)
+    return path
+
+class FakeAdbEnvironment:
+    """
+    模拟 ADB 运行环境（上下文管理器）
+
+    进入时启动服务器并设置环境变量 ADB_PATH、ANDROID_ADB_SERVER_PORT、FAKE_ADB_CONFIG，
+    退出时停止服务器、恢复环境变量并删除临时目录。
+    ADB_PATH 需要在导入 app.core.config 之前设置才会生效。
+
+    属性:
+        root (Path): 临时目录
+        server (FakeAdbServer): 模拟服务器
+        adb_path (Path): adb 包装脚本
+    """
+
+    def __init__(self, devices: Iterable[dict] = (), root: Optional[Path] = None):
+        """
+        初始化运行环境
+
+        Args:
+            devices: 设备配置，键与 FakeDevice 构造参数同名
+            root: 临时目录，None 表示自动创建并在退出时删除
+        """
+        self._owns_root = root is None
+        self.root = Path(root or tempfile.mkdtemp(prefix="fake-adb-"))
+        self.device_root = self.root / "devices"
+        self.server = FakeAdbServer([FakeDevice.from_config(self.device_root, config) for config in devices])
+        self.adb_path = write_adb_wrapper(self.root / "bin")
+        self._saved_env: Dict[str, Optional[str]] = {}
+
+    def device(self, serial: str) -> FakeDevice:
+        """获取模拟设备"""
+        return self.server.devices[serial]
+
+    def add_device(self, **config) -> FakeDevice:
+        """添加模拟设备，参数与 FakeDevice 构造参数同名"""
+        return self.server.add_device(FakeDevice.from_config(self.device_root, config))
+
+    def _set_env(self, key: str, value: str):
+        self._saved_env.setdefault(key, os.environ.get(key))
+        os.environ[key] = value
+
+    def __enter__(self) -> "FakeAdbEnvironment":
+        port = self.server.start()
+        config_path = self.root / "config.json"
+        config_path.write_text(json.dumps({
+            "root": str(self.device_root),
+            "port": port,
+            "devices": [device.to_config() for device in self.server.devices.values()],
+        }, indent=2), encoding="utf-8")
+        self._set_env("ADB_PATH", str(self.adb_path))
+        self._set_env("ANDROID_ADB_SERVER_PORT", str(port))
+        self._set_env("FAKE_ADB_CONFIG", str(config_path))
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.stop()
+        for key, value in self._saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        self._saved_env.clear()
+        if self._owns_root:
+            shutil.rmtree(self.root, ignore_errors=True)
@@ -0,0 +1,97 @@
+"""
+ADB 主机协议的编解码
+
+客户端与 ADB 服务器之间使用两层协议：
+1. 主机服务：请求为 4 位十六进制长度 + 服务名，响应为 OKAY 或 FAIL + 4 位十六进制长度 + 错误信息
+2. 文件同步（sync:）：每个数据包为 4 字节标识 + 4 字节小端长度（或参数）+ 数据
+
+设备支持 sendrecv_v2 时发送文件使用 SND2：路径之后还有一个 SND2 + 权限 + 压缩标志的设置包，
+DATA 包中是压缩后的数据流。
+"""
+
+import struct
+from typing import Tuple
+
+# 默认服务器端口（与 adb 一致）
+DEFAULT_PORT = 5037
+
+# 协议版本（adb 1.0.41）
+ADB_SERVER_VERSION = 41
+
+# sync DATA 包的最大数据长度
+SYNC_DATA_MAX = 64 * 1024
+
+OKAY = b"OKAY"
+FAIL = b"FAIL"
+
+# SND2 的压缩标志（与 adb 的 SyncFlag 一致）
+SYNC_FLAG_NONE = 0
+SYNC_FLAG_BROTLI = 1
+SYNC_FLAG_LZ4 = 2
+SYNC_FLAG_ZSTD = 4
+
+# push -z 的算法名称到压缩标志的映射
+COMPRESSION_FLAGS = {
+    "none": SYNC_FLAG_NONE,
+    "brotli": SYNC_FLAG_BROTLI,
+    "lz4": SYNC_FLAG_LZ4,
+    "zstd": SYNC_FLAG_ZSTD,
+}
+
+# 标准库没有 brotli、lz4、zstd，模拟实现统一用 zlib 代替，压缩级别大致对应各算法的速度和压缩比
+ZLIB_LEVELS = {SYNC_FLAG_BROTLI: 6, SYNC_FLAG_LZ4: 1, SYNC_FLAG_ZSTD: 3}
+
+class ProtocolError(Exception):
+    """协议错误或服务器返回 FAIL"""
+    pass
+
+def encode_request(service: str) -> bytes:
+    """
+    编码主机服务请求
+
+    Args:
+        service: 服务名，例如 host:devices
+
+    Returns:
+        bytes: 长度前缀 + 服务名
+    """
+    data = service.encode("utf-8")
+    return f"{len(data):04x}".encode("ascii") + data
+
+def encode_string(message: str) -> bytes:
+    """编码带 4 位十六进制长度前缀的字符串"""
+    data = message.encode("utf-8")
+    return f"{len(data):04x}".encode("ascii") + data
+
+def encode_fail(message: str) -> bytes:
+    """编码 FAIL 响应"""
+    return FAIL + encode_string(message)
+
+def encode_sync(tag: bytes, payload: bytes = b"") -> bytes:
+    """
+    编码 sync 数据包
+
+    Args:
+        tag: 4 字节标识，例如 SEND、DATA、DONE
+        payload: 数据
+
+    Returns:
+        bytes: 标识 + 小端长度 + 数据
+    """
+    return tag + struct.pack("<I", len(payload)) + payload
+
+def encode_sync_value(tag: bytes, value: int) -> bytes:
+    """编码长度字段为参数的 sync 数据包，例如 DONE + mtime"""
+    return tag + struct.pack("<I", value & 0xFFFFFFFF)
+
+def decode_sync_header(header: bytes) -> Tuple[bytes, int]:
+    """
+    解析 sync 数据包头
+
+    Args:
+        header: 8 字节包头
+
+    Returns:
+        tuple: (标识, 长度或参数)
+    """
+    return header[:4], struct.unpack("<I", header[4:8])[0]
@@ -0,0 +1,395 @@
+"""
+模拟 ADB 服务器
+
+实现 adb 客户端与服务器之间主机协议的一个子集：
+1. 主机服务：version、kill、devices、devices-l、connect、disconnect、features、get-state
+2. 传输选择：transport、transport-any、tport
+3. 设备服务：shell:（v1 协议，输出合并后原样返回）和 sync:（SEND、SND2、LIST、STAT、QUIT）
+
+服务器可以在独立线程中运行（基准测试在进程内启动），也可以作为独立进程运行
+（python -m benchmarks.fake_adb server）。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import struct
+import threading
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from benchmarks.fake_adb.device import FakeDevice, InjectedFailure
+from benchmarks.fake_adb.protocol import (
+    ADB_SERVER_VERSION, DEFAULT_PORT, OKAY, FAIL,
+    encode_fail, encode_string, encode_sync, decode_sync_header
+)
+
+logger = logging.getLogger(__name__)
+
+class FakeAdbServer:
+    """
+    模拟 ADB 服务器
+
+    属性:
+        devices (dict): 设备ID到模拟设备的映射
+        host (str): 监听地址
+        port (int): 监听端口，0 表示自动分配
+        stats (Counter): 按服务统计的请求数
+    """
+
+    def __init__(self, devices: Iterable[FakeDevice] = (), host: str = "127.0.0.1", port: int = 0):
+        self.devices: Dict[str, FakeDevice] = {device.serial: device for device in devices}
+        self.host = host
+        self.port = port
+        self.stats: Counter = Counter()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._stopped: Optional[asyncio.Event] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, config: dict) -> "FakeAdbServer":
+        """
+        根据配置创建服务器
+
+        Args:
+            config: {"root": 设备根目录, "host": ..., "port": ..., "devices": [设备配置]}
+
+        Returns:
+            FakeAdbServer: 服务器
+        """
+        root = Path(config["root"])
+        devices = [FakeDevice.from_config(root, device) for device in config.get("devices", [])]
+        return cls(devices, config.get("host", "127.0.0.1"), int(config.get("port", DEFAULT_PORT)))
+
+    def add_device(self, device: FakeDevice) -> FakeDevice:
+        """添加模拟设备"""
+        self.devices[device.serial] = device
+        return device
+
+    # 运行
+    # ===============================================
+
+    async def serve(self):
+        """在当前事件循环中运行，直到收到 host:kill 或调用 stop"""
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"模拟ADB服务器已启动 - {self.host}:{self.port}, 设备: {list(self.devices)}")
+        try:
+            await self._stopped.wait()
+        finally:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def start(self) -> int:
+        """
+        在独立线程中启动服务器
+
+        Returns:
+            int: 实际监听的端口
+        """
+        ready = threading.Event()
+        errors = []
+
+        def run():
+            async def main():
+                task = asyncio.ensure_future(self.serve())
+                while self._server is None and not task.done():
+                    await asyncio.sleep(0.01)
+                ready.set()
+                await task
+            try:
+                asyncio.run(main())
+            except Exception as e:
+                errors.append(e)
+                ready.set()
+
+        self._thread = threading.Thread(target=run, name="fake-adb-server", daemon=True)
+        self._thread.start()
+        ready.wait()
+        if errors:
+            raise errors[0]
+        return self.port
+
+    def stop(self):
+        """停止服务器"""
+        if self._loop is not None and self._stopped is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    # 连接处理
+    # ===============================================
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """处理一个客户端连接：一个主机服务，或选择设备后的一个设备服务"""
+        try:
+            service = await self._read_request(reader)
+            if service is None:
+                return
+            device = await self._host_service(service, writer)
+            if device is None:
+                return
+            service = await self._read_request(reader)
+            if service is not None:
+                await self._device_service(device, service, reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # 服务器停止时仍在进行的传输（例如客户端超时后被杀掉的推送）直接结束
+            return
+        except Exception as e:
+            logger.error(f"处理请求失败: {str(e)}", exc_info=True)
+        finally:
+            try:
+                await writer.drain()
+                writer.close()
+            except Exception:
+                pass
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[str]:
+        """读取一个长度前缀的服务请求，连接关闭时返回None"""
+        try:
+            length = int(await reader.readexactly(4), 16)
+        except asyncio.IncompleteReadError:
+            return None
+        return (await reader.readexactly(length)).decode("utf-8")
+
+    def _find_device(self, serial: Optional[str]) -> FakeDevice:
+        """
+        查找可用的设备
+
+        Args:
+            serial: 设备ID，None 表示唯一的设备
+
+        Returns:
+            FakeDevice: 设备
+
+        Raises:
+            LookupError: 设备不存在、不唯一或离线
+        """
+        if serial is None:
+            visible = [device for device in self.devices.values() if device.visible]
+            if not visible:
+                raise LookupError("no devices/emulators found")
+            if len(visible) > 1:
+                raise LookupError("more than one device/emulator")
+            device = visible[0]
+        else:
+            device = self.devices.get(serial)
+            if device is None or not device.visible:
+                raise LookupError(f"device '{serial}' not found")
+        if device.state != "device":
+            raise LookupError("device offline")
+        return device
+
+    async def _host_service(self, service: str, writer: asyncio.StreamWriter) -> Optional[FakeDevice]:
+        """
+        处理主机服务
+
+        Args:
+            service: 服务名
+            writer: 连接
+
+        Returns:
+            Optional[FakeDevice]: 传输选择类服务返回选中的设备，其他服务返回None
+        """
+        if service.startswith("host-serial:"):
+            serial, _, service = service[len("host-serial:"):].rpartition(":")
+            service = f"host:{service}"
+        else:
+            serial = None
+        self.stats[service.split(":")[1] if ":" in service else service] += 1
+
+        try:
+            if service in ("host:transport-any", "host:tport:any"):
+                device = self._find_device(None)
+            elif service.startswith("host:transport:"):
+                device = self._find_device(service[len("host:transport:"):])
+            elif service.startswith("host:tport:serial:"):
+                device = self._find_device(service[len("host:tport:serial:"):])
+            else:
+                device = None
+        except LookupError as e:
+            writer.write(encode_fail(str(e)))
+            return None
+
+        if device is not None:
+            writer.write(OKAY)
+            if service.startswith("host:tport:"):
+                writer.write(struct.pack("<Q", 1))
+            return device
+
+        if service == "host:version":
+            writer.write(OKAY + encode_string(f"{ADB_SERVER_VERSION:04x}"))
+        elif service == "host:kill":
+            writer.write(OKAY)
+            self._stopped.set()
+        elif service in ("host:devices", "host:devices-l"):
+            lines = []
+            for device in self.devices.values():
+                if device.visible:
+                    line = f"{device.serial}\t{device.state}"
+                    if service.endswith("-l"):
+                        line += " product:fake model:FakeDevice device:fake"
+                    lines.append(line + "\n")
+            writer.write(OKAY + encode_string("".join(lines)))
+        elif service.startswith("host:connect:"):
+            writer.write(OKAY + encode_string(self._connect(service[len("host:connect:"):])))
+        elif service.startswith("host:disconnect:"):
+            writer.write(OKAY + encode_string(self._disconnect(service[len("host:disconnect:"):])))
+        elif service in ("host:features", "host:get-state"):
+            try:
+                device = self._find_device(serial)
+            except LookupError as e:
+                writer.write(encode_fail(str(e)))
+                return None
+            value = ",".join(device.features) if service == "host:features" else device.state
+            writer.write(OKAY + encode_string(value))
+        else:
+            writer.write(encode_fail(f"unknown host service '{service}'"))
+        return None
+
+    def _connect(self, address: str) -> str:
+        """处理 adb connect"""
+        if ":" not in address:
+            address += ":5555"
+        device = self.devices.get(address)
+        if device is None or not device.is_tcp:
+            return f"failed to connect to '{address}': Connection refused"
+        if device.connected:
+            # 与真实 adb 一致：残留的连接即使已经离线，connect 也只返回 already connected
+            return f"already connected to {address}"
+        if device.state != "device":
+            return f"failed to connect to '{address}': Connection timed out"
+        device.connected = True
+        return f"connected to {address}"
+
+    def _disconnect(self, address: str) -> str:
+        """处理 adb disconnect"""
+        if ":" not in address:
+            address += ":5555"
+        device = self.devices.get(address)
+        if device is None or not device.is_tcp or not device.connected:
+            return f"error: no such device '{address}'"
+        device.connected = False
+        return f"disconnected {address}"
+
+    async def _device_service(self, device: FakeDevice, service: str,
+                              reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """处理选择设备后的设备服务"""
+        kind = service.split(":", 1)[0].split(",", 1)[0]
+        device.stats[kind] += 1
+        await device.delay()
+        try:
+            device.check_failure(service)
+        except InjectedFailure as e:
+            writer.write(encode_fail(str(e)))
+            return
+
+        if kind == "shell":
+            output, _ = await device.shell(service.split(":", 1)[1])
+            writer.write(OKAY + output)
+        elif kind == "sync":
+            writer.write(OKAY)
+            await self._sync(device, reader, writer)
+        else:
+            writer.write(encode_fail(f"unknown service '{service}'"))
+
+    # 文件同步
+    # ===============================================
+
+    async def _sync(self, device: FakeDevice, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """处理 sync 会话，直到 QUIT 或连接关闭"""
+        while True:
+            await writer.drain()
+            tag, length = decode_sync_header(await reader.readexactly(8))
+            if tag == b"QUIT":
+                return
+            path = (await reader.readexactly(length)).decode("utf-8")
+            if tag == b"SEND":
+                remote_path, _, mode = path.rpartition(",")
+                if not await self._sync_send(device, remote_path, mode, reader, writer):
+                    return
+            elif tag == b"SND2":
+                setup, mode, flags = struct.unpack("<4sII", await reader.readexactly(12))
+                if setup != b"SND2" or "sendrecv_v2" not in device.features:
+                    writer.write(encode_sync(FAIL, b"sendrecv_v2 not supported"))
+                    return
+                if not await self._sync_send(device, path, mode, reader, writer, flags):
+                    return
+            elif tag == b"LIST":
+                for name, mode, size, mtime in device.list_dir(path):
+                    data = name.encode("utf-8")
+                    writer.write(b"DENT" + struct.pack("<IIII", mode, size, mtime, len(data)) + data)
+                writer.write(b"DONE" + struct.pack("<IIII", 0, 0, 0, 0))
+            elif tag == b"STAT":
+                mode, size, mtime = device.stat(path)
+                writer.write(b"STAT" + struct.pack("<III", mode, size & 0xFFFFFFFF, mtime))
+            else:
+                writer.write(encode_sync(FAIL, f"unsupported sync request '{tag.decode('latin-1')}'".encode()))
+                return
+
+    async def _sync_send(self, device: FakeDevice, remote_path: str, mode,
+                         reader: asyncio.StreamReader, writer: asyncio.StreamWriter, flags: int = 0) -> bool:
+        """
+        接收一个文件
+
+        Args:
+            device: 目标设备
+            remote_path: 设备端路径
+            mode: 文件权限
+            flags: SND2 的压缩标志，非 0 时 DATA 包中是压缩数据流
+
+        Returns:
+            bool: 会话是否可以继续
+        """
+        decompressor = zlib.decompressobj() if flags else None
+        local_path = device.local_path(remote_path)
+        try:
+            local_path.parent.mkdir(parents=True, exist_ok=True)
+            f = open(local_path, "wb")
+        except OSError as e:
+            writer.write(encode_sync(FAIL, f"couldn't create file: {e.strerror}".encode()))
+            return False
+
+        with f:
+            while True:
+                tag, length = decode_sync_header(await reader.readexactly(8))
+                if tag == b"DATA":
+                    data = await reader.readexactly(length)
+                    if decompressor is not None:
+                        data = decompressor.decompress(data)
+                    f.write(data)
+                    device.stats["bytes_stored"] += len(data)
+                    await device.transfer(length)
+                elif tag == b"DONE":
+                    if decompressor is not None:
+                        data = decompressor.flush()
+                        f.write(data)
+                        device.stats["bytes_stored"] += len(data)
+                    break
+                else:
+                    writer.write(encode_sync(FAIL, b"invalid data message"))
+                    return False
+        try:
+            os.chmod(local_path, int(mode) & 0o777)
+            os.utime(local_path, (length, length))
+        except (OSError, ValueError):
+            pass
+        device.stats["files_pushed"] += 1
+        if flags:
+            device.stats["files_compressed"] += 1
+        writer.write(encode_sync(OKAY))
+        return True
+
+def load_config(path: str) -> dict:
+    """读取 JSON 配置文件"""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,16 @@
+from .clock import VirtualClock, RealClock
+from .recording import Recording, Screen
+from .device import (
+    FakeU2Device, FakeU2Backend, UiObjectNotFoundError, XPathElementNotFoundError
+)
+
+__all__ = [
+    'VirtualClock',
+    'RealClock',
+    'Recording',
+    'Screen',
+    'FakeU2Device',
+    'FakeU2Backend',
+    'UiObjectNotFoundError',
+    'XPathElementNotFoundError'
+]
@@ -0,0 +1,61 @@
+"""
+时钟
+
+模拟设备的 RPC 延迟、等待超时以及被测代码中的 time.sleep 都通过时钟计时：
+- VirtualClock 只推进虚拟时间，一次完整发布在毫秒级完成，结果与机器性能无关，适合在 CI 中比较
+- RealClock 真实等待，用于观察实际的墙钟耗时
+"""
+
+import time
+
+class VirtualClock:
+    """
+    虚拟时钟
+
+    属性:
+        elapsed (float): 自创建以来推进的虚拟时间（秒）
+        sleeps (int): sleep 调用次数
+    """
+
+    def __init__(self):
+        self._start = time.time()
+        self.elapsed = 0.0
+        self.sleeps = 0
+
+    def time(self) -> float:
+        return self._start + self.elapsed
+
+    def monotonic(self) -> float:
+        return self.elapsed
+
+    perf_counter = monotonic
+
+    def sleep(self, seconds: float):
+        self.sleeps += 1
+        if seconds > 0:
+            self.elapsed += seconds
+
+class RealClock:
+    """真实时钟"""
+
+    def __init__(self):
+        self._start = time.monotonic()
+        self.sleeps = 0
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self._start
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def perf_counter(self) -> float:
+        return time.perf_counter()
+
+    def sleep(self, seconds: float):
+        self.sleeps += 1
+        if seconds > 0:
+            time.sleep(seconds)
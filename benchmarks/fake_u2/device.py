@@ -0,0 +1,381 @@
+"""
+模拟 uiautomator2 设备
+
+按录制的界面和跳转图回放 AndroidAutomation 使用的 uiautomator2 接口：
+d(**selector) 的 exists/wait/click/info、d.xpath(...) 的 exists/wait/get/click、
+click、swipe、send_keys、app_start、app_current、wait_activity、dump_hierarchy、shell。
+shell 支持查询媒体库（content query）和启动录制中登记的 Intent（am start -a），其他命令只记录不执行。
+
+每个接口按 uiautomator2 的实际行为计为一次或多次 RPC（例如 d(...).click() 为
+waitForExists + objInfo + click，xpath 每次检查都会 dump 一次界面），每次 RPC 推进时钟 rpc_latency 秒，
+dump 推进 dump_latency 秒。界面在回放中不会自行变化，等待不存在的元素会耗尽整个超时时间。
+"""
+
+import re
+import shlex
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+from benchmarks.fake_u2.clock import VirtualClock
+from benchmarks.fake_u2.recording import Recording, Screen, parse_bounds
+
+# uiautomator 的默认滑动步数，每步约 5 毫秒
+SWIPE_STEPS = 55
+
+# xpath 等待时两次检查之间的间隔（秒）
+XPATH_POLL_INTERVAL = 0.2
+
+# wait_activity 两次检查之间的间隔（秒）
+ACTIVITY_POLL_INTERVAL = 0.5
+
+class UiObjectNotFoundError(Exception):
+    """选择器没有匹配的元素"""
+    pass
+
+class XPathElementNotFoundError(Exception):
+    """XPath 没有匹配的元素"""
+    pass
+
+class ShellResponse(NamedTuple):
+    output: str
+    exit_code: int
+
+class FakeU2Device:
+    """
+    模拟 uiautomator2 设备
+
+    属性:
+        recording (Recording): 录制
+        clock: 时钟（VirtualClock 或 RealClock）
+        rpc_latency (float): 每次 RPC 的耗时（秒）
+        dump_latency (float): 每次 dump_hierarchy 的耗时（秒）
+        settings (dict): 与 uiautomator2 同名的设置，目前只使用 wait_timeout
+        rpcs (Counter): 按方法统计的 RPC 次数
+        taps (list): 点击记录 [{"screen", "x", "y", "target"}]
+        typed (list): 输入的文本
+        shell_commands (list): 执行的 shell 命令
+        history (list): 经过的界面
+        media (dict): 媒体库中的图片，设备端路径 -> _id
+    """
+
+    def __init__(self, recording: Recording, clock=None, rpc_latency: float = 0.05,
+                 dump_latency: float = 0.5, serial: str = "fake", media: Optional[Dict[str, int]] = None):
+        self.recording = recording
+        self.clock = clock or VirtualClock()
+        self.rpc_latency = rpc_latency
+        self.dump_latency = dump_latency
+        self.serial = serial
+        self.settings: Dict[str, object] = {"wait_timeout": 20.0}
+        self.rpcs: Counter = Counter()
+        self.taps: List[dict] = []
+        self.typed: List[str] = []
+        self.shell_commands: List[str] = []
+        self.screen: Screen = recording.screens[recording.initial]
+        self.history: List[str] = [self.screen.name]
+        self.media: Dict[str, int] = dict(media or {})
+
+    # 内部
+    # ===============================================
+
+    @property
+    def wait_timeout(self) -> float:
+        return float(self.settings["wait_timeout"])
+
+    @property
+    def rpc_count(self) -> int:
+        """RPC 总次数"""
+        return sum(self.rpcs.values())
+
+    def _rpc(self, method: str, latency: Optional[float] = None):
+        """记录一次 RPC 并推进时钟"""
+        self.rpcs[method] += 1
+        self.clock.sleep(self.rpc_latency if latency is None else latency)
+
+    def _goto(self, name: str):
+        """切换界面"""
+        if name != self.screen.name:
+            self.screen = self.recording.screens[name]
+            self.history.append(name)
+
+    def _tap(self, x: int, y: int):
+        """点击坐标，按跳转图切换界面"""
+        target = None
+        for node in reversed(self.screen.nodes):
+            left, top, right, bottom = parse_bounds(node.get("bounds"))
+            if left <= x < right and top <= y < bottom:
+                target = node.get("text") or node.get("content-desc") or node.get("resource-id") or node.get("class")
+                break
+        self.taps.append({"screen": self.screen.name, "x": x, "y": y, "target": target})
+        next_screen = self.recording.after_tap(self.screen.name, x, y)
+        if next_screen is not None:
+            self._goto(next_screen)
+
+    def _abs(self, x: Union[int, float], y: Union[int, float]) -> Tuple[int, int]:
+        """与 uiautomator2 一致：小于 1 的坐标视为相对屏幕尺寸的比例（需要一次 window_size）"""
+        if x < 1 or y < 1:
+            width, height = self.window_size()
+            if x < 1:
+                x = int(width * x)
+            if y < 1:
+                y = int(height * y)
+        return int(x), int(y)
+
+    # 设备接口
+    # ===============================================
+
+    def window_size(self) -> Tuple[int, int]:
+        self._rpc("window_size")
+        return self.recording.display
+
+    def screen_on(self):
+        self._rpc("screen_on")
+
+    def click(self, x: Union[int, float], y: Union[int, float]):
+        x, y = self._abs(x, y)
+        self._rpc("click")
+        self._tap(x, y)
+
+    def swipe(self, fx, fy, tx, ty, duration: Optional[float] = None, steps: Optional[int] = None):
+        fx, fy = self._abs(fx, fy)
+        tx, ty = self._abs(tx, ty)
+        if not steps:
+            steps = int(duration * 200) if duration else SWIPE_STEPS
+        self._rpc("swipe", self.rpc_latency + max(2, steps) * 0.005)
+        dx, dy = tx - fx, ty - fy
+        if abs(dy) >= abs(dx):
+            direction = "up" if dy < 0 else "down"
+        else:
+            direction = "left" if dx < 0 else "right"
+        next_screen = self.recording.after_swipe(self.screen.name, direction)
+        if next_screen is not None:
+            self._goto(next_screen)
+
+    def send_keys(self, text: str, clear: bool = False):
+        # 切换输入法、广播输入内容、隐藏键盘
+        self._rpc("set_input_ime")
+        self._rpc("broadcast")
+        self._rpc("broadcast")
+        self.typed.append(text)
+        return True
+
+    def app_start(self, package_name: str, activity: Optional[str] = None, wait: bool = False,
+                  stop: bool = False, use_monkey: bool = False):
+        self._rpc("app_start")
+        screen = self.recording.apps.get(package_name)
+        if screen is not None:
+            self._goto(screen)
+
+    def app_current(self) -> dict:
+        self._rpc("app_current")
+        return {"package": self.screen.package, "activity": self.screen.activity}
+
+    def wait_activity(self, activity: str, timeout: float = 10) -> bool:
+        deadline = self.clock.time() + timeout
+        while self.clock.time() < deadline:
+            if self.app_current().get("activity") == activity:
+                return True
+            self.clock.sleep(ACTIVITY_POLL_INTERVAL)
+        return False
+
+    def dump_hierarchy(self, compressed: bool = False, pretty: bool = False, max_depth: Optional[int] = None) -> str:
+        self._rpc("dump_hierarchy", self.dump_latency)
+        return self.screen.xml
+
+    def shell(self, cmdargs: Union[str, List[str]], timeout: int = 60) -> ShellResponse:
+        args = shlex.split(cmdargs) if isinstance(cmdargs, str) else list(cmdargs)
+        self._rpc("shell")
+        self.shell_commands.append(" ".join(args))
+        if args[:2] == ["content", "query"]:
+            return self._content_query(args)
+        if args[:2] == ["am", "start"]:
+            return self._am_start(args)
+        return ShellResponse("", 0)
+
+    def _content_query(self, args: List[str]) -> ShellResponse:
+        """按 --where 中的 _data LIKE '前缀%' 返回媒体库中的图片"""
+        where = args[args.index("--where") + 1] if "--where" in args else ""
+        match = re.search(r"_data LIKE '([^']*)%'", where)
+        prefix = match.group(1) if match else ""
+        rows = [
+            f"Row: {i} _id={media_id}, _data={path}"
+            for i, (path, media_id) in enumerate(item for item in self.media.items() if item[0].startswith(prefix))
+        ]
+        return ShellResponse("\n".join(rows) + "\n" if rows else "No result found.\n", 0)
+
+    def _am_start(self, args: List[str]) -> ShellResponse:
+        """启动录制中登记的 Intent"""
+        action = args[args.index("-a") + 1] if "-a" in args else None
+        screen = self.recording.after_intent(action) if action else None
+        if screen is None:
+            return ShellResponse(f"Error: Activity not started, unable to resolve Intent {{ act={action} }}\n", 1)
+        self._goto(screen)
+        return ShellResponse("Starting: Intent { act=%s }\nStatus: ok\n" % action, 0)
+
+    def __call__(self, **selector) -> "FakeUiObject":
+        return FakeUiObject(self, selector)
+
+    def xpath(self, expression: str) -> "FakeXPathSelector":
+        return FakeXPathSelector(self, expression)
+
+class Exists:
+    """与 uiautomator2 一致：可作为布尔值使用，也可调用并指定等待时间"""
+
+    def __init__(self, uiobject: "FakeUiObject"):
+        self.uiobject = uiobject
+
+    def __bool__(self) -> bool:
+        self.uiobject.d._rpc("exist")
+        return bool(self.uiobject.d.screen.find(self.uiobject.selector))
+
+    def __call__(self, timeout: float = 0) -> bool:
+        if timeout:
+            return self.uiobject.wait(timeout=timeout)
+        return bool(self)
+
+class FakeUiObject:
+    """UiSelector 选择的元素"""
+
+    def __init__(self, d: FakeU2Device, selector: Dict[str, object]):
+        self.d = d
+        self.selector = selector
+
+    @property
+    def exists(self) -> Exists:
+        return Exists(self)
+
+    def wait(self, exists: bool = True, timeout: Optional[float] = None) -> bool:
+        """waitForExists / waitUntilGone：条件不满足时耗尽超时"""
+        if timeout is None:
+            timeout = self.d.wait_timeout
+        found = bool(self.d.screen.find(self.selector))
+        if found == exists:
+            self.d._rpc("waitForExists" if exists else "waitUntilGone")
+            return True
+        self.d._rpc("waitForExists" if exists else "waitUntilGone", self.d.rpc_latency + timeout)
+        return False
+
+    def must_wait(self, exists: bool = True, timeout: Optional[float] = None):
+        if not self.wait(exists, timeout):
+            raise UiObjectNotFoundError(f"UiObject not found: {self.selector}")
+
+    @property
+    def info(self) -> dict:
+        self.d._rpc("objInfo")
+        nodes = self.d.screen.find(self.selector)
+        if not nodes:
+            raise UiObjectNotFoundError(f"UiObject not found: {self.selector}")
+        node = nodes[0]
+        left, top, right, bottom = parse_bounds(node.get("bounds"))
+        return {
+            "text": node.get("text"),
+            "resourceName": node.get("resource-id"),
+            "contentDescription": node.get("content-desc"),
+            "className": node.get("class"),
+            "packageName": node.get("package"),
+            "bounds": {"left": left, "top": top, "right": right, "bottom": bottom},
+        }
+
+    def center(self) -> Tuple[int, int]:
+        bounds = self.info["bounds"]
+        return (bounds["left"] + bounds["right"]) // 2, (bounds["top"] + bounds["bottom"]) // 2
+
+    def click(self, timeout: Optional[float] = None, offset=None):
+        self.must_wait(timeout=timeout)
+        self.d.click(*self.center())
+
+    def get_text(self) -> Optional[str]:
+        return self.info["text"]
+
+    def set_text(self, text: str):
+        self.must_wait()
+        self.d._rpc("setText")
+        self.d.typed.append(text)
+
+class FakeXPathElement:
+    """XPath 匹配的元素（来自一次 dump）"""
+
+    def __init__(self, d: FakeU2Device, attributes: Dict[str, str]):
+        self.d = d
+        self.attrib = attributes
+
+    @property
+    def text(self) -> Optional[str]:
+        return self.attrib.get("text")
+
+    @property
+    def bounds(self) -> Tuple[int, int, int, int]:
+        return parse_bounds(self.attrib.get("bounds"))
+
+    def center(self) -> Tuple[int, int]:
+        left, top, right, bottom = self.bounds
+        return (left + right) // 2, (top + bottom) // 2
+
+    def click(self):
+        self.d.click(*self.center())
+
+class FakeXPathSelector:
+    """与 uiautomator2 的 XPathSelector 一致：每次检查都 dump 一次界面"""
+
+    def __init__(self, d: FakeU2Device, expression: str):
+        self.d = d
+        self.expression = expression
+        self._last: List[Dict[str, str]] = []
+
+    def all(self) -> List[FakeXPathElement]:
+        self.d.dump_hierarchy()
+        self._last = self.d.screen.xpath(self.expression)
+        return [FakeXPathElement(self.d, attributes) for attributes in self._last]
+
+    @property
+    def exists(self) -> bool:
+        return len(self.all()) > 0
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        deadline = self.d.clock.time() + (timeout or self.d.wait_timeout)
+        while True:
+            if self.exists:
+                return True
+            if self.d.clock.time() > deadline:
+                return False
+            self.d.clock.sleep(XPATH_POLL_INTERVAL)
+
+    def get(self, timeout: Optional[float] = None) -> FakeXPathElement:
+        if not self.wait(timeout):
+            raise XPathElementNotFoundError(self.expression)
+        return FakeXPathElement(self.d, self._last[0])
+
+    def click(self, timeout: Optional[float] = None):
+        self.get(timeout).click()
+
+    def click_exists(self, timeout: Optional[float] = None) -> bool:
+        try:
+            self.get(timeout).click()
+            return True
+        except XPathElementNotFoundError:
+            return False
+
+    def get_text(self) -> Optional[str]:
+        return self.get().text
+
+class FakeU2Backend:
+    """
+    替代 uiautomator2 模块的 connect 入口
+
+    属性:
+        devices (dict): 设备ID到模拟设备的映射
+        connects (int): connect 调用次数
+    """
+
+    def __init__(self, devices: Optional[Dict[str, FakeU2Device]] = None):
+        self.devices: Dict[str, FakeU2Device] = dict(devices or {})
+        self.connects = 0
+
+    def connect(self, serial: Optional[str] = None) -> FakeU2Device:
+        self.connects += 1
+        if serial is None and len(self.devices) == 1:
+            return next(iter(self.devices.values()))
+        device = self.devices.get(serial)
+        if device is None:
+            raise ConnectionError(f"device {serial} not found")
+        device._rpc("connect")
+        return device
@@ -0,0 +1,248 @@
+"""
+录制的界面和跳转图
+
+一份录制是一个目录，包含 flow.json 和若干 dump_hierarchy 导出的 XML 界面：
+
+    {
+        "display": [1080, 2400],
+        "initial": "lock",
+        "apps": {"${package}": "home"},
+        "screens": {
+            "lock": {"file": "lock.xml", "package": "com.android.systemui", "activity": ".Keyguard"}
+        },
+        "transitions": [
+            {"from": "lock", "swipe": "up", "to": "pin"},
+            {"from": "home", "tap": "[432,2250][648,2400]", "to": "picker"}
+        ],
+        "intents": {"android.intent.action.SEND": "preview"}
+    }
+
+flow.json 和 XML 中的 ${名称} 在加载时替换为场景参数（例如相册文件夹名、图片数量）。
+XML 中的 <repeat count="N" columns="C" dx="X" dy="Y"> 展开为 N 份子节点，
+第 i 份的 bounds 按网格位置偏移，用于生成数量可变的图片列表。
+"""
+
+import copy
+import json
+import re
+from pathlib import Path
+from string import Template
+from typing import Dict, List, Optional, Tuple
+
+from lxml import etree
+
+# 录制目录
+RECORDINGS_DIR = Path(__file__).parent / "recordings"
+
+BOUNDS = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+
+# UiSelector 参数到节点属性的映射
+SELECTOR_ATTRIBUTES = {
+    "text": "text",
+    "resourceId": "resource-id",
+    "description": "content-desc",
+    "className": "class",
+    "packageName": "package",
+    "checkable": "checkable",
+    "checked": "checked",
+    "clickable": "clickable",
+    "enabled": "enabled",
+    "focusable": "focusable",
+    "focused": "focused",
+    "scrollable": "scrollable",
+    "selected": "selected",
+}
+
+Bounds = Tuple[int, int, int, int]
+
+def parse_bounds(text: str) -> Bounds:
+    """
+    解析 bounds 属性
+
+    Args:
+        text: 形如 [0,0][1080,2400]
+
+    Returns:
+        tuple: (left, top, right, bottom)
+    """
+    match = BOUNDS.fullmatch(text or "")
+    if match is None:
+        return 0, 0, 0, 0
+    return tuple(int(value) for value in match.groups())
+
+def _format_bounds(bounds: Bounds) -> str:
+    return "[{},{}][{},{}]".format(*bounds)
+
+def contains(bounds: Bounds, x: int, y: int) -> bool:
+    """点是否在区域内"""
+    return bounds[0] <= x < bounds[2] and bounds[1] <= y < bounds[3]
+
+def _expand_repeats(root: etree._Element):
+    """展开 <repeat> 节点"""
+    for repeat in list(root.iter("repeat")):
+        parent = repeat.getparent()
+        position = parent.index(repeat)
+        count = int(repeat.get("count", "1"))
+        columns = max(1, int(repeat.get("columns", "1")))
+        dx, dy = int(repeat.get("dx", "0")), int(repeat.get("dy", "0"))
+        children = list(repeat)
+        parent.remove(repeat)
+        for i in range(count):
+            offset_x, offset_y = (i % columns) * dx, (i // columns) * dy
+            for child in children:
+                clone = copy.deepcopy(child)
+                for node in clone.iter("node"):
+                    left, top, right, bottom = parse_bounds(node.get("bounds"))
+                    node.set("bounds", _format_bounds(
+                        (left + offset_x, top + offset_y, right + offset_x, bottom + offset_y)
+                    ))
+                parent.insert(position, clone)
+                position += 1
+        for index, child in enumerate(parent):
+            child.set("index", str(index))
+
+class Screen:
+    """
+    一个录制的界面
+
+    属性:
+        name (str): 界面名称
+        package (str): 前台应用包名
+        activity (str): 前台 Activity
+        xml (str): dump_hierarchy 的输出
+    """
+
+    def __init__(self, name: str, package: str, activity: str, xml: str):
+        self.name = name
+        self.package = package
+        self.activity = activity
+        root = etree.fromstring(xml.encode("utf-8"))
+        _expand_repeats(root)
+        self.xml = etree.tostring(root, encoding="unicode")
+        self.nodes: List[etree._Element] = list(root.iter("node"))
+
+        # 与 uiautomator2 的 xpath 一致：节点标签替换为类名后再执行 XPath
+        self._xpath_root = copy.deepcopy(root)
+        for node in self._xpath_root.iter("node"):
+            node.tag = node.attrib.pop("class", "") or "node"
+
+    def find(self, selector: Dict[str, object]) -> List[etree._Element]:
+        """
+        按 UiSelector 参数查找节点
+
+        Args:
+            selector: 例如 {"resourceId": "...", "text": "..."}
+
+        Returns:
+            list: 匹配的节点（文档顺序）
+
+        Raises:
+            ValueError: 不支持的选择器参数
+        """
+        instance = selector.get("instance")
+        matches = [node for node in self.nodes if _match(node, selector)]
+        if instance is not None:
+            return matches[int(instance):int(instance) + 1]
+        return matches
+
+    def xpath(self, expression: str) -> List[Dict[str, str]]:
+        """
+        执行 XPath
+
+        Args:
+            expression: XPath 表达式
+
+        Returns:
+            list: 匹配节点的属性（包括 class）
+        """
+        results = []
+        for element in self._xpath_root.xpath(expression):
+            if isinstance(element, etree._Element):
+                attributes = dict(element.attrib)
+                attributes["class"] = element.tag
+                results.append(attributes)
+        return results
+
+def _match(node: etree._Element, selector: Dict[str, object]) -> bool:
+    """节点是否匹配 UiSelector 参数"""
+    for key, expected in selector.items():
+        if key == "instance":
+            continue
+        if key in SELECTOR_ATTRIBUTES:
+            value = node.get(SELECTOR_ATTRIBUTES[key], "")
+            if isinstance(expected, bool):
+                expected = "true" if expected else "false"
+            if value != str(expected):
+                return False
+        elif key.endswith("Contains"):
+            if str(expected) not in node.get(SELECTOR_ATTRIBUTES[key[:-8]], ""):
+                return False
+        elif key.endswith("StartsWith"):
+            if not node.get(SELECTOR_ATTRIBUTES[key[:-10]], "").startswith(str(expected)):
+                return False
+        elif key.endswith("Matches"):
+            if re.fullmatch(str(expected), node.get(SELECTOR_ATTRIBUTES[key[:-7]], "")) is None:
+                return False
+        else:
+            raise ValueError(f"不支持的选择器参数: {key}")
+    return True
+
+class Recording:
+    """
+    录制的界面集合和跳转图
+
+    属性:
+        display (tuple): 屏幕尺寸 (宽, 高)
+        initial (str): 初始界面
+        apps (dict): 包名到 app_start 后界面的映射
+        screens (dict): 界面名称到 Screen 的映射
+        transitions (list): 跳转规则
+        intents (dict): am start 的 Intent action 到启动后界面的映射
+    """
+
+    def __init__(self, directory: Path, params: Optional[Dict[str, object]] = None):
+        """
+        加载录制
+
+        Args:
+            directory: 录制目录
+            params: 场景参数，替换 flow.json 和 XML 中的 ${名称}
+        """
+        params = {key: str(value) for key, value in (params or {}).items()}
+        directory = Path(directory)
+        flow = json.loads(Template((directory / "flow.json").read_text(encoding="utf-8")).safe_substitute(params))
+        self.display: Tuple[int, int] = tuple(flow.get("display", (1080, 2400)))
+        self.initial: str = flow["initial"]
+        self.apps: Dict[str, str] = flow.get("apps", {})
+        self.screens: Dict[str, Screen] = {}
+        for name, screen in flow["screens"].items():
+            xml = Template((directory / screen["file"]).read_text(encoding="utf-8")).safe_substitute(params)
+            self.screens[name] = Screen(name, screen.get("package", ""), screen.get("activity", ""), xml)
+        self.transitions: List[dict] = flow.get("transitions", [])
+        self.intents: Dict[str, str] = flow.get("intents", {})
+        for transition in self.transitions:
+            if "tap" in transition:
+                transition["bounds"] = parse_bounds(transition["tap"])
+
+    @classmethod
+    def load(cls, name: str, params: Optional[Dict[str, object]] = None) -> "Recording":
+        """加载内置录制"""
+        return cls(RECORDINGS_DIR / name, params)
+
+    def after_tap(self, screen: str, x: int, y: int) -> Optional[str]:
+        """点击后跳转到的界面，没有匹配的规则时返回None"""
+        for transition in self.transitions:
+            if transition["from"] == screen and "bounds" in transition and contains(transition["bounds"], x, y):
+                return transition["to"]
+        return None
+
+    def after_swipe(self, screen: str, direction: str) -> Optional[str]:
+        """滑动后跳转到的界面，没有匹配的规则时返回None"""
+        for transition in self.transitions:
+            if transition["from"] == screen and transition.get("swipe") == direction:
+                return transition["to"]
+        return None
+
+    def after_intent(self, action: str) -> Optional[str]:
+        """am start 启动 Intent 后的界面，录制中没有该 action 时返回None"""
+        return self.intents.get(action)
@@ -0,0 +1,266 @@
+"""
+上传接口压力测试
+
+在进程内以 ASGI 方式调用 /api/v1/upload，用合成相册（可配置图片数量、大小和并发数）
+压测完整的上传路径（请求解析、Base64 校验、写入暂存目录、相册索引、定时任务），
+统计吞吐量、p50/p95/p99 延迟、峰值内存和事件循环延迟：
+
+    python -m benchmarks.loadtest
+    python -m benchmarks.loadtest --scenario album_9 album_18_burst
+    python -m benchmarks.loadtest --scenario custom --files 18 --size-kb 2048 --concurrency 16 --requests 64
+    python -m benchmarks.loadtest --output results/load.json --baseline results/load-base.json
+
+默认不访问设备：立即任务（推送图片和通知）被替换为空操作；--device-mode fake-adb 时
+推送到模拟 ADB 设备，用于观察设备推送对上传响应时间的影响。
+上传目录、日志和追踪输出都写入临时目录，运行结束后删除。
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import List, Optional
+from unittest import mock
+
+from benchmarks.fake_adb import FakeAdbEnvironment
+from benchmarks.runner import (
+    DEFAULT_TOLERANCE, percentile, summarize, build_report, save_report, compare_with_baseline, print_report
+)
+
+# 内置场景：每张图片大小（KB）、每个相册的图片数、并发数和请求数
+SCENARIOS = {
+    "single_small": {"files": 1, "size_kb": 100, "concurrency": 1, "requests": 50},
+    "album_9": {"files": 9, "size_kb": 512, "concurrency": 4, "requests": 40},
+    "album_18_burst": {"files": 18, "size_kb": 1024, "concurrency": 8, "requests": 24},
+    "large_file": {"files": 1, "size_kb": 10 * 1024, "concurrency": 2, "requests": 8},
+}
+
+# 上传接口路径
+UPLOAD_PATH = "/api/v1/upload/"
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadtest", description="上传接口压力测试")
+    parser.add_argument("--scenario", nargs="+", default=list(SCENARIOS),
+                        choices=list(SCENARIOS) + ["custom"], help="运行的场景，custom 使用下面的参数")
+    parser.add_argument("--files", type=int, default=9, help="custom 场景每个相册的图片数")
+    parser.add_argument("--size-kb", type=int, default=512, help="custom 场景每张图片的大小（KB）")
+    parser.add_argument("--concurrency", type=int, default=4, help="custom 场景的并发数")
+    parser.add_argument("--requests", type=int, default=20, help="custom 场景的请求数")
+    parser.add_argument("--warmup", type=int, default=2, help="每个场景开始前不计时的请求数")
+    parser.add_argument("--device", default="deviceA", help="设备名称（Settings.DEVICE_MAPPING 中的键）")
+    parser.add_argument("--device-mode", choices=["stub", "fake-adb"], default="stub",
+                        help="stub: 跳过设备推送和空间检查；fake-adb: 推送到模拟 ADB 设备")
+    parser.add_argument("--throughput-mb", type=float, default=30.0, help="fake-adb 模式的模拟带宽（MB/s）")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="fake-adb 模式每条命令的模拟延迟（毫秒）")
+    parser.add_argument("--lag-interval-ms", type=float, default=10.0, help="事件循环延迟的采样间隔（毫秒）")
+    parser.add_argument("--log-level", default="WARNING", help="压测期间应用的日志级别")
+    parser.add_argument("--output", type=Path, help="结果 JSON 保存路径")
+    parser.add_argument("--baseline", type=Path, help="用于比较的基线结果 JSON")
+    parser.add_argument("--compare-key", choices=["median", "p95", "p99"], default="p95", help="与基线比较的延迟统计量")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="允许的变慢比例")
+    return parser.parse_args(argv)
+
+def get_scenarios(args: argparse.Namespace) -> dict:
+    """按命令行参数确定要运行的场景"""
+    scenarios = {}
+    for name in args.scenario:
+        if name == "custom":
+            scenarios[name] = {
+                "files": args.files, "size_kb": args.size_kb,
+                "concurrency": args.concurrency, "requests": args.requests,
+            }
+        else:
+            scenarios[name] = SCENARIOS[name]
+    return scenarios
+
+class BodyFactory:
+    """
+    生成上传请求体
+
+    同一场景的请求只有时间戳不同，文件部分只编码一次，避免压测客户端本身占用事件循环。
+    每个请求使用不同的未来时间戳，不会被幂等检查当作重复请求。
+    """
+
+    def __init__(self, device_name: str, files: int, size_kb: int, start_timestamp: int):
+        payload = base64.b64encode(os.urandom(size_kb * 1024)).decode()
+        self.files_json = json.dumps(
+            [{"filename": f"{i:03d}.jpg", "data": payload} for i in range(files)]
+        ).encode()
+        self.device_name = device_name
+        self.album_bytes = files * size_kb * 1024
+        self.next_timestamp = start_timestamp
+
+    def next(self) -> bytes:
+        timestamp = self.next_timestamp
+        self.next_timestamp += 1
+        head = json.dumps({
+            "device_name": self.device_name,
+            "timestamp": timestamp,
+            "title": "loadtest",
+            "content": "loadtest",
+        })
+        return head[:-1].encode() + b', "files": ' + self.files_json + b"}"
+
+class LoopProbe:
+    """
+    按固定间隔唤醒，记录实际唤醒延迟和当前常驻内存
+
+    属性:
+        lags (list): 每次唤醒比预期晚的时长（秒）
+        peak_rss (int): 采样期间的最大常驻内存（字节）
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.lags: List[float] = []
+        self.peak_rss = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        from app.core.memory import get_rss
+
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, time.perf_counter() - expected))
+            self.peak_rss = max(self.peak_rss, get_rss() or 0)
+
+    def __enter__(self) -> "LoopProbe":
+        self._task = asyncio.ensure_future(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+async def run_scenario(client, factory: BodyFactory, concurrency: int, requests: int,
+                       interval: float) -> dict:
+    """
+    以固定并发发送请求
+
+    Returns:
+        dict: 延迟统计、吞吐量、事件循环延迟和内存
+    """
+    latencies = []
+    statuses = Counter()
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            body = factory.next()
+            started = time.perf_counter()
+            response = await client.post(UPLOAD_PATH, content=body, headers={"Content-Type": "application/json"})
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+
+    with LoopProbe(interval) as probe:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+        wall = time.perf_counter() - started
+
+    stats = summarize(latencies)
+    stats["p50"] = percentile(latencies, 50)
+    stats["p99"] = percentile(latencies, 99)
+    stats["requests_per_s"] = requests / wall if wall else 0.0
+    stats["mb_per_s"] = requests * factory.album_bytes / wall / 1e6 if wall else 0.0
+    stats["errors"] = sum(count for code, count in statuses.items() if code != 201)
+    stats["loop_lag_p99_ms"] = percentile(probe.lags, 99) * 1e3
+    stats["loop_lag_max_ms"] = max(probe.lags, default=0.0) * 1e3
+    stats["peak_rss_mb"] = probe.peak_rss / 1024 / 1024
+    stats["status_codes"] = {str(code): count for code, count in sorted(statuses.items())}
+    return stats
+
+async def run(args: argparse.Namespace) -> dict:
+    """启动应用、运行全部场景并生成结果报告"""
+    import httpx
+    import main as app_main
+    from app.api.v1 import upload
+    from app.core.config import get_current_timestamp
+    from app.core.logging import stop_logging
+    from app.core.memory import get_peak_rss
+
+    logging.getLogger().setLevel(args.log_level.upper())
+
+    async def skip_device(device_name: str, upload_time: int, album_id=None):
+        return None
+
+    async def skip_capacity_check(request):
+        return None
+
+    patches = [
+        mock.patch.object(upload, "execute_immediate_tasks", skip_device),
+        mock.patch.object(upload, "check_device_capacity", skip_capacity_check),
+    ] if args.device_mode == "stub" else []
+    for patch in patches:
+        patch.start()
+    await app_main.startup_event()
+
+    results = {}
+    # 时间戳从一天后开始，保证所有请求都是未来的任务
+    timestamp = get_current_timestamp() + 86400
+    try:
+        transport = httpx.ASGITransport(app=app_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+            for name, scenario in get_scenarios(args).items():
+                factory = BodyFactory(args.device, scenario["files"], scenario["size_kb"], timestamp)
+                if args.warmup:
+                    await run_scenario(client, factory, scenario["concurrency"], args.warmup,
+                                       args.lag_interval_ms / 1e3)
+                results[name] = await run_scenario(
+                    client, factory, scenario["concurrency"], scenario["requests"], args.lag_interval_ms / 1e3
+                )
+                timestamp = factory.next_timestamp
+    finally:
+        await app_main.shutdown_event()
+        for patch in patches:
+            patch.stop()
+        # 日志目录在临时目录中，需要在删除之前写出剩余的日志
+        stop_logging()
+
+    params = {key: (str(value) if isinstance(value, Path) else value) for key, value in vars(args).items()}
+    params["scenarios"] = get_scenarios(args)
+    report = build_report("loadtest", params, results)
+    report["peak_rss_mb"] = (get_peak_rss() or 0) / 1024 / 1024
+    return report
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    root = Path(tempfile.mkdtemp(prefix="loadtest-"))
+    # 需要在导入 app 之前设置；日志目录相对于当前目录，因此切换到临时目录运行
+    os.environ["UPLOAD_DIR"] = str(root / "uploads")
+    os.environ["TRACE_EXPORT_PATH"] = str(root / "traces.jsonl")
+    cwd = os.getcwd()
+    os.chdir(root)
+
+    try:
+        with FakeAdbEnvironment(root=root / "adb") as env:
+            if args.device_mode == "fake-adb":
+                from app.core.config import Settings
+
+                env.add_device(
+                    serial=Settings.DEVICE_MAPPING[args.device],
+                    throughput=args.throughput_mb * 1e6 or None,
+                    latency=args.latency_ms / 1e3,
+                )
+            report = asyncio.run(run(args))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(root, ignore_errors=True)
+
+    comparison = compare_with_baseline(report, args.baseline, args.tolerance, args.compare_key) if args.baseline else None
+    print_report(report, comparison)
+    print(f"peak RSS: {report['peak_rss_mb']:.1f} MB")
+    if args.output:
+        save_report(report, args.output)
+    failed = any(stats["errors"] for stats in report["results"].values())
+    return 1 if failed or (comparison and any(row["regressed"] for row in comparison)) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
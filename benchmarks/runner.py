@@ -0,0 +1,166 @@
+"""
+基准测试运行工具
+
+提供计时、统计、结果保存和与基线比较的公共函数，所有基准测试共用同一种结果格式：
+    {"benchmark": 名称, "time": ..., "python": ..., "platform": ..., "params": {...},
+     "results": {用例名称: {"runs", "min", "median", "mean", "p95", "max", "stdev", ...}}}
+"""
+
+import asyncio
+import inspect
+import json
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+# 与基线比较时默认允许的变慢比例
+DEFAULT_TOLERANCE = 0.2
+
+def percentile(samples: Sequence[float], q: float) -> float:
+    """
+    计算分位数（线性插值）
+
+    Args:
+        samples: 样本
+        q: 分位（0~100）
+
+    Returns:
+        float: 分位数，没有样本时返回0
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def summarize(samples: Sequence[float]) -> Dict[str, float]:
+    """
+    汇总耗时样本（秒）
+
+    Args:
+        samples: 每次运行的耗时
+
+    Returns:
+        dict: runs、min、median、mean、p95、max、stdev
+    """
+    return {
+        "runs": len(samples),
+        "min": min(samples) if samples else 0.0,
+        "median": statistics.median(samples) if samples else 0.0,
+        "mean": statistics.fmean(samples) if samples else 0.0,
+        "p95": percentile(samples, 95),
+        "max": max(samples) if samples else 0.0,
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+async def measure_async(func: Callable, repeat: int, warmup: int = 0,
+                        setup: Optional[Callable] = None) -> List[float]:
+    """
+    多次运行并记录耗时
+
+    Args:
+        func: 被测函数（同步或异步），参数为 setup 的返回值
+        repeat: 计时运行次数
+        warmup: 不计时的预热次数
+        setup: 每次运行前调用（不计时），返回值传给 func，可以是异步函数
+
+    Returns:
+        list: 每次计时运行的耗时（秒）
+    """
+    samples = []
+    for i in range(warmup + repeat):
+        args = ()
+        if setup is not None:
+            value = setup()
+            if inspect.isawaitable(value):
+                value = await value
+            args = (value,)
+        started = time.perf_counter()
+        result = func(*args)
+        if inspect.isawaitable(result):
+            await result
+        elapsed = time.perf_counter() - started
+        if i >= warmup:
+            samples.append(elapsed)
+    return samples
+
+def measure(func: Callable, repeat: int, warmup: int = 0, setup: Optional[Callable] = None) -> List[float]:
+    """measure_async 的同步版本"""
+    return asyncio.run(measure_async(func, repeat, warmup, setup))
+
+def build_report(name: str, params: dict, results: Dict[str, dict]) -> dict:
+    """生成完整的结果报告"""
+    return {
+        "benchmark": name,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "params": params,
+        "results": results,
+    }
+
+def save_report(report: dict, path: Path):
+    """保存结果报告"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+def compare_with_baseline(report: dict, baseline_path: Path, tolerance: float = DEFAULT_TOLERANCE,
+                          key: str = "median") -> List[dict]:
+    """
+    与基线报告比较
+
+    Args:
+        report: 本次结果报告
+        baseline_path: 基线报告路径
+        tolerance: 允许的变慢比例
+        key: 比较的统计量
+
+    Returns:
+        list: [{"case", "baseline", "current", "change", "regressed"}]，只包含两边都有的用例
+    """
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    rows = []
+    for case, stats in report["results"].items():
+        base = baseline.get("results", {}).get(case)
+        if not base or not base.get(key):
+            continue
+        change = stats[key] / base[key] - 1
+        rows.append({
+            "case": case,
+            "baseline": base[key],
+            "current": stats[key],
+            "change": change,
+            "regressed": change > tolerance,
+        })
+    return rows
+
+def format_seconds(value: float) -> str:
+    """以合适的单位格式化耗时"""
+    if value >= 1:
+        return f"{value:.3f}s"
+    if value >= 1e-3:
+        return f"{value * 1e3:.2f}ms"
+    return f"{value * 1e6:.1f}us"
+
+def print_report(report: dict, comparison: Optional[List[dict]] = None):
+    """以表格形式打印结果"""
+    print(f"== {report['benchmark']} ({report['python']}, {report['platform']})")
+    width = max([len(case) for case in report["results"]] + [4])
+    print(f"{'case':<{width}}  {'runs':>4}  {'min':>10}  {'median':>10}  {'p95':>10}  {'max':>10}  extra")
+    for case, stats in report["results"].items():
+        extra = {k: v for k, v in stats.items() if k not in ("runs", "min", "median", "mean", "p95", "max", "stdev")}
+        print(
+            f"{case:<{width}}  {stats['runs']:>4}  {format_seconds(stats['min']):>10}  "
+            f"{format_seconds(stats['median']):>10}  {format_seconds(stats['p95']):>10}  "
+            f"{format_seconds(stats['max']):>10}  "
+            + ", ".join(f"{k}={v:.4g}" if isinstance(v, float) else f"{k}={v}" for k, v in extra.items())
+        )
+    for row in comparison or []:
+        mark = "REGRESSED" if row["regressed"] else "ok"
+        print(f"  {row['case']}: {format_seconds(row['baseline'])} -> {format_seconds(row['current'])} "
+              f"({row['change']:+.1%}) {mark}")
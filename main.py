@@ -19,9 +19,20 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1.upload import router as upload_router
 from app.api.v1.device import router as device_router
 from app.api.v1.logs import router as logs_router
+from app.api.v1.albums import router as albums_router
+from app.api.v1.metrics import router as metrics_router
+from app.api.v1.admin import router as admin_router
 from app.core.config import Settings
 from app.core.logging import setup_logging
+from app.core.watchdog import watchdog
+from app.core.memory import MemoryTrackingMiddleware
+from app.core.tracing import TracingMiddleware, exporter
 from app.scheduler.scheduler import start_scheduler, stop_scheduler
+from app.services.reaper import reaper
+from app.services.album_index import album_index
+from app.device.adb import adb
+from app.device.breaker import device_breakers
+from app.device.supervisor import connection_supervisor
 
 # 初始化日志
 setup_logging()
@@ -43,28 +54,51 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 统计上传请求的内存使用
+app.add_middleware(MemoryTrackingMiddleware, paths=["/api/v1/upload"])
+
+# 为每个请求记录链路追踪并返回 Server-Timing 响应头
+app.add_middleware(TracingMiddleware)
+
 @app.on_event("startup")
 async def startup_event():
     """
     应用程序启动时的处理函数
     
-    启动调度器，确保能够处理定时任务
+    启动调度器，确保能够处理定时任务；启动后台回收器；
+    相册索引为空时从上传目录导入已有相册；启动事件循环看门狗；启动设备熔断探测和 Wi-Fi ADB 连接守护
     """
+    if Settings.LOOP_WATCHDOG_ENABLED:
+        watchdog.start()
     start_scheduler()
+    reaper.start()
+    device_breakers.start(adb.probe_device_async)
+    if Settings.ADB_SUPERVISOR_ENABLED:
+        connection_supervisor.start()
+    await album_index.rebuild_if_empty()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """
     应用程序关闭时的处理函数
     
-    安全地关闭调度器，确保正在执行的任务能够完成
+    安全地关闭调度器，确保正在执行的任务能够完成；停止后台回收器、熔断探测和连接守护；关闭相册索引；停止看门狗；写出剩余的追踪数据
     """
     stop_scheduler()
+    await reaper.stop()
+    await device_breakers.stop()
+    await connection_supervisor.stop()
+    album_index.close()
+    await watchdog.stop()
+    exporter.shutdown()
 
 # 注册路由
 app.include_router(upload_router)
 app.include_router(device_router)
 app.include_router(logs_router)
+app.include_router(albums_router)
+app.include_router(metrics_router)
+app.include_router(admin_router)
 
 # 启动服务器（仅在直接运行时）
 if __name__ == "__main__":
@@ -0,0 +1,64 @@
+"""
+测试公共配置
+
+上传目录、相册索引、追踪导出和 ADB_PATH 都需要在导入 app 之前设置。
+ADB 命令由 benchmarks.fake_adb 的模拟服务器处理，不需要真实的 adb 和手机。
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+TEST_ROOT = Path(tempfile.mkdtemp(prefix="app-tests-"))
+os.environ["UPLOAD_DIR"] = str(TEST_ROOT / "uploads")
+os.environ["INDEX_DB_PATH"] = str(TEST_ROOT / "index.db")
+os.environ["TRACE_EXPORT_PATH"] = str(TEST_ROOT / "traces.jsonl")
+
+from benchmarks.fake_adb import FakeAdbEnvironment  # noqa: E402
+
+# 会话级的 ADB 替身只用于让 app.device 的导入不依赖真实的 adb，测试设备由 fake_adb 提供
+SESSION_ADB = FakeAdbEnvironment(root=TEST_ROOT / "adb").__enter__()
+
+from app.device.adb import adb  # noqa: E402
+from app.device.breaker import device_breakers  # noqa: E402
+from app.device.timeouts import command_timeouts  # noqa: E402
+
+@pytest.fixture(scope="session", autouse=True)
+def test_root():
+    """整个测试会话共用的临时目录，结束时删除"""
+    yield TEST_ROOT
+    SESSION_ADB.__exit__(None, None, None)
+    shutil.rmtree(TEST_ROOT, ignore_errors=True)
+
+@pytest.fixture(autouse=True)
+def reset_device_state():
+    """每个测试使用全新的熔断器、超时样本和设备信号量（信号量绑定在创建它的事件循环上）"""
+    device_breakers.breakers.clear()
+    command_timeouts.samples.clear()
+    command_timeouts.throughput.clear()
+    adb._device_slots.clear()
+    yield
+    device_breakers.breakers.clear()
+    command_timeouts.samples.clear()
+    command_timeouts.throughput.clear()
+    adb._device_slots.clear()
+
+@pytest.fixture
+def fake_adb(monkeypatch, tmp_path):
+    """
+    启动模拟 ADB 服务器，并让全局 adb 实例使用它
+
+    Yields:
+        FakeAdbEnvironment: 通过 add_device 添加模拟设备
+    """
+    with FakeAdbEnvironment(root=tmp_path / "adb") as env:
+        monkeypatch.setattr(adb, "adb_path", str(env.adb_path))
+        yield env
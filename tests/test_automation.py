@@ -0,0 +1,49 @@
+"""自动化发布测试（回放录制界面的模拟 uiautomator2 设备）"""
+
+from unittest import mock
+
+import pytest
+
+from benchmarks import bench_publish
+from benchmarks.fake_u2 import Recording
+
+SEND = "android.intent.action.SEND"
+
+def publish(images: int, publish_mode: str = "ui", share_landing: str = "preview") -> dict:
+    """
+    运行一次发布
+
+    Args:
+        images: 图片数量
+        publish_mode: 发布方式
+        share_landing: 分享 Intent 打开的界面
+    """
+    load = Recording.load
+
+    def load_with_landing(*args, **kwargs):
+        recording = load(*args, **kwargs)
+        recording.intents = {SEND: share_landing}
+        return recording
+
+    args = bench_publish.parse_args(["--publish-mode", publish_mode])
+    with mock.patch.object(Recording, "load", staticmethod(load_with_landing)):
+        return bench_publish.run_case(args, images)
+
+@pytest.mark.parametrize("images", [1, 9])
+def test_ui_mode_selects_every_image(images):
+    result = publish(images)
+    assert result["status"] == "SUCCESS"
+    assert result["selected"] == images
+
+@pytest.mark.parametrize("landing", ["preview", "editor"])
+def test_share_single_image(landing):
+    result = publish(1, "share", landing)
+    assert result["status"] == "SUCCESS"
+    assert result["selected"] == 0
+    assert "grid" not in result["screens"]
+    assert ("preview" in result["screens"]) == (landing == "preview")
+
+def test_share_mode_selects_multiple_images_in_app():
+    result = publish(3, "share")
+    assert result["status"] == "SUCCESS"
+    assert result["selected"] == 3
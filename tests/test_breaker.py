@@ -0,0 +1,190 @@
+"""设备熔断器测试"""
+
+import asyncio
+import threading
+
+import pytest
+
+from app.core.config import Settings
+from app.device.adb import ADBException, DeviceUnavailableError, adb
+from app.device.breaker import CLOSED, HALF_OPEN, OPEN, DeviceBreakers, device_breakers
+
+# 需要 adb connect 的 TCP/IP 设备
+TCP_SERIAL = "127.0.0.1:5555"
+
+@pytest.fixture(autouse=True)
+def breaker_settings(monkeypatch):
+    monkeypatch.setattr(Settings, "BREAKER_FAILURE_THRESHOLD", 3)
+    monkeypatch.setattr(Settings, "BREAKER_COOLDOWN", 10.0)
+    monkeypatch.setattr(Settings, "BREAKER_MAX_COOLDOWN", 40.0)
+    monkeypatch.setattr(Settings, "BREAKER_PROBE_TIMEOUT", 5.0)
+
+def set_offline(device, offline: bool):
+    """让模拟设备始终离线或恢复在线"""
+    device.flap_interval = device.flap_duration = 1.0 if offline else 0.0
+
+def test_opens_after_consecutive_failures():
+    breakers = DeviceBreakers()
+    for _ in range(2):
+        breakers.record_failure("d1", "device offline")
+    assert breakers.allow("d1")
+
+    breakers.record_failure("d1", "device offline")
+    assert breakers.get("d1").state == OPEN
+    assert not breakers.allow("d1")
+    assert breakers.allow("d2")
+
+def test_success_resets_failure_count():
+    breakers = DeviceBreakers()
+    breakers.record_failure("d1", "device offline")
+    breakers.record_failure("d1", "device offline")
+    breakers.record_success("d1")
+    breakers.record_failure("d1", "device offline")
+    assert breakers.get("d1").state == CLOSED
+    assert breakers.get("d1").failures == 1
+
+def test_host_commands_are_not_tracked():
+    breakers = DeviceBreakers()
+    breakers.record_failure("", "adb server not running")
+    assert breakers.breakers == {}
+
+def test_concurrent_failures_are_all_counted(monkeypatch):
+    monkeypatch.setattr(Settings, "BREAKER_FAILURE_THRESHOLD", 10 ** 6)
+    breakers = DeviceBreakers()
+    barrier = threading.Barrier(8)
+
+    def worker():
+        barrier.wait()
+        for _ in range(1000):
+            breakers.record_failure("d1", "timeout")
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert breakers.get("d1").failures == 8000
+
+@pytest.mark.asyncio
+async def test_probe_success_closes():
+    breakers = DeviceBreakers()
+    states = []
+
+    async def probe(device_id):
+        states.append(breakers.get(device_id).state)
+        return True
+
+    breakers._probe = probe
+    for _ in range(3):
+        breakers.record_failure("d1", "device offline")
+    assert await breakers.probe(breakers.get("d1"))
+
+    breaker = breakers.get("d1")
+    assert states == [HALF_OPEN]
+    assert breaker.state == CLOSED
+    assert breaker.failures == 0
+    assert breaker.cooldown == Settings.BREAKER_COOLDOWN
+
+@pytest.mark.asyncio
+async def test_probe_failure_doubles_cooldown_up_to_max():
+    breakers = DeviceBreakers()
+
+    async def probe(device_id):
+        raise ADBException("device offline")
+
+    breakers._probe = probe
+    for _ in range(3):
+        breakers.record_failure("d1", "device offline")
+    breaker = breakers.get("d1")
+    opened_at = breaker.opened_at
+
+    cooldowns = []
+    for _ in range(4):
+        assert not await breakers.probe(breaker)
+        assert breaker.state == OPEN
+        cooldowns.append(breaker.cooldown)
+    assert cooldowns == [20.0, 40.0, 40.0, 40.0]
+    assert breaker.opened_at == opened_at
+    assert "device offline" in breaker.last_error
+
+@pytest.mark.asyncio
+async def test_open_breaker_rejects_commands_without_running_them(fake_adb):
+    device = fake_adb.add_device(serial="emulator-5554")
+    for _ in range(3):
+        device_breakers.record_failure("emulator-5554", "device offline")
+
+    with pytest.raises(DeviceUnavailableError):
+        await adb.execute_device_command_async("emulator-5554", ["shell", "true"])
+    assert device.stats["shell"] == 0
+
+@pytest.mark.asyncio
+async def test_device_failures_open_breaker(fake_adb):
+    for _ in range(3):
+        with pytest.raises(ADBException):
+            await adb.execute_device_command_async("missing-device", ["shell", "true"])
+    assert device_breakers.get("missing-device").state == OPEN
+
+    with pytest.raises(DeviceUnavailableError):
+        await adb.execute_device_command_async("missing-device", ["shell", "true"])
+
+@pytest.mark.asyncio
+async def test_probe_with_stale_connection_keeps_backing_off(fake_adb, monkeypatch):
+    """
+    掉线的 TCP/IP 设备仍残留连接时 adb connect 返回 already connected，
+    探测命令的这次成功不能关闭熔断器，否则每次探测都会重置冷却时间
+    """
+    device = fake_adb.add_device(serial=TCP_SERIAL)
+    device.connected = True
+    set_offline(device, True)
+    monkeypatch.setattr(device_breakers, "_probe", adb.probe_device_async)
+    for _ in range(3):
+        device_breakers.record_failure(TCP_SERIAL, "device offline")
+    breaker = device_breakers.get(TCP_SERIAL)
+    opened_at = breaker.opened_at
+
+    cooldowns = []
+    for _ in range(3):
+        assert not await device_breakers.probe(breaker)
+        assert breaker.state == OPEN
+        cooldowns.append(breaker.cooldown)
+    assert cooldowns == [20.0, 40.0, 40.0]
+    assert breaker.opened_at == opened_at
+    assert breaker.failures == 3
+    assert fake_adb.server.stats["connect"] == 3
+
+@pytest.mark.asyncio
+async def test_probe_recovers_after_device_comes_back(fake_adb, monkeypatch):
+    device = fake_adb.add_device(serial=TCP_SERIAL)
+    set_offline(device, True)
+    monkeypatch.setattr(device_breakers, "_probe", adb.probe_device_async)
+    for _ in range(3):
+        device_breakers.record_failure(TCP_SERIAL, "device offline")
+    breaker = device_breakers.get(TCP_SERIAL)
+
+    assert not await device_breakers.probe(breaker)
+    assert not device.connected
+
+    set_offline(device, False)
+    assert await device_breakers.probe(breaker)
+    assert breaker.state == CLOSED
+    assert breaker.cooldown == Settings.BREAKER_COOLDOWN
+    assert device.connected
+    assert await adb.execute_device_command_async(TCP_SERIAL, ["shell", "echo", "ok"]) == "ok"
+
+@pytest.mark.asyncio
+async def test_background_task_probes_due_devices(fake_adb, monkeypatch):
+    monkeypatch.setattr(Settings, "BREAKER_COOLDOWN", 0.0)
+    monkeypatch.setattr(Settings, "BREAKER_PROBE_INTERVAL", 0.05)
+    fake_adb.add_device(serial="emulator-5554")
+    for _ in range(3):
+        device_breakers.record_failure("emulator-5554", "device offline")
+
+    device_breakers.start(adb.probe_device_async)
+    try:
+        for _ in range(100):
+            if device_breakers.get("emulator-5554").state == CLOSED:
+                break
+            await asyncio.sleep(0.05)
+    finally:
+        await device_breakers.stop()
+    assert device_breakers.get("emulator-5554").state == CLOSED
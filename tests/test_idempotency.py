@@ -0,0 +1,132 @@
+"""幂等上传测试"""
+
+import asyncio
+import base64
+import uuid
+
+import pytest
+
+from app.core.exceptions import IdempotencyError
+from app.models.request import FileBase64, UploadRequest
+from app.services.idempotency import _inflight, run_idempotent
+
+def make_request(content: str = "正文") -> UploadRequest:
+    return UploadRequest(
+        device_name="deviceA",
+        timestamp=1700000100,
+        title="标题",
+        content=content,
+        files=[FileBase64(filename="0.jpg", data=base64.b64encode(b"image").decode())],
+    )
+
+def new_key() -> str:
+    return uuid.uuid4().hex
+
+class CountingHandler:
+    """记录调用次数的上传处理函数"""
+
+    def __init__(self, delay: float = 0.0):
+        self.calls = 0
+        self.delay = delay
+        self.started = asyncio.Event()
+
+    async def __call__(self) -> dict:
+        self.calls += 1
+        self.started.set()
+        await asyncio.sleep(self.delay)
+        return {"code": 1, "call": self.calls}
+
+@pytest.mark.asyncio
+async def test_completed_request_is_replayed():
+    key = new_key()
+    handler = CountingHandler()
+
+    assert await run_idempotent(make_request(), key, handler) == ({"code": 1, "call": 1}, False)
+    assert await run_idempotent(make_request(), key, handler) == ({"code": 1, "call": 1}, True)
+    assert handler.calls == 1
+
+@pytest.mark.asyncio
+async def test_requests_without_key_use_content_hash():
+    handler = CountingHandler()
+    content = new_key()
+
+    await run_idempotent(make_request(content), None, handler)
+    _, replayed = await run_idempotent(make_request(content), None, handler)
+    assert replayed
+    _, replayed = await run_idempotent(make_request(content + "!"), None, handler)
+    assert not replayed
+    assert handler.calls == 2
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_run_once():
+    key = new_key()
+    handler = CountingHandler(delay=0.1)
+
+    results = await asyncio.gather(*(run_idempotent(make_request(), key, handler) for _ in range(10)))
+    assert handler.calls == 1
+    assert [replayed for _, replayed in results].count(False) == 1
+    assert all(response == {"code": 1, "call": 1} for response, _ in results)
+    assert not _inflight
+
+@pytest.mark.asyncio
+async def test_key_reused_with_different_content():
+    key = new_key()
+    handler = CountingHandler(delay=0.1)
+
+    first = asyncio.ensure_future(run_idempotent(make_request("A"), key, handler))
+    await handler.started.wait()
+    with pytest.raises(IdempotencyError):
+        await run_idempotent(make_request("B"), key, handler)
+    await first
+
+    with pytest.raises(IdempotencyError):
+        await run_idempotent(make_request("B"), key, handler)
+    assert handler.calls == 1
+
+@pytest.mark.asyncio
+async def test_failed_request_is_not_stored():
+    key = new_key()
+    handler = CountingHandler()
+
+    async def failing():
+        raise RuntimeError("disk full")
+
+    with pytest.raises(RuntimeError):
+        await run_idempotent(make_request(), key, failing)
+    assert await run_idempotent(make_request(), key, handler) == ({"code": 1, "call": 1}, False)
+
+@pytest.mark.asyncio
+async def test_waiters_take_over_when_first_request_is_cancelled():
+    key = new_key()
+    slow = CountingHandler(delay=10)
+    fast = CountingHandler()
+
+    first = asyncio.ensure_future(run_idempotent(make_request(), key, slow))
+    await slow.started.wait()
+    waiters = [asyncio.ensure_future(run_idempotent(make_request(), key, fast)) for _ in range(3)]
+    await asyncio.sleep(0.05)
+
+    first.cancel()
+    results = await asyncio.gather(*waiters)
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+    assert fast.calls == 1
+    assert sorted(replayed for _, replayed in results) == [False, True, True]
+    assert all(response == {"code": 1, "call": 1} for response, _ in results)
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_affect_first_request():
+    key = new_key()
+    handler = CountingHandler(delay=0.1)
+
+    first = asyncio.ensure_future(run_idempotent(make_request(), key, handler))
+    await handler.started.wait()
+    waiter = asyncio.ensure_future(run_idempotent(make_request(), key, handler))
+    await asyncio.sleep(0.01)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert await first == ({"code": 1, "call": 1}, False)
+    assert handler.calls == 1
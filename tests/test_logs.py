@@ -0,0 +1,118 @@
+"""日志读取、旁路索引和实时日志流测试"""
+
+import logging
+import os
+
+import pytest
+
+from app.core.log_index import IndexedRotatingFileHandler, get_stat_id, load_blocks
+from app.core.logging import LOG_FORMAT
+from app.services import log_reader, log_stream
+from app.services.log_reader import LogQuery, read_logs
+
+BACKUP_COUNT = 3
+MAX_BYTES = 2000
+
+@pytest.fixture
+def log_file(tmp_path, monkeypatch):
+    """写入临时目录的日志记录器，日志读取和日志流都指向该目录"""
+    path = tmp_path / "app.log"
+    index_path = tmp_path / "app.log.idx"
+    monkeypatch.setattr(log_reader, "LOG_FILE", path)
+    monkeypatch.setattr(log_reader, "LOG_INDEX_FILE", index_path)
+    monkeypatch.setattr(log_reader, "LOG_BACKUP_COUNT", BACKUP_COUNT)
+    monkeypatch.setattr(log_stream, "LOG_FILE", path)
+
+    handler = IndexedRotatingFileHandler(path, index_path=index_path, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    test_logger = logging.getLogger("tests.logs")
+    test_logger.setLevel(logging.DEBUG)
+    test_logger.propagate = False
+    test_logger.addHandler(handler)
+    yield test_logger
+    test_logger.removeHandler(handler)
+    handler.close()
+
+def write_records(test_logger: logging.Logger, start: int, count: int, error_every: int = 0):
+    for i in range(start, start + count):
+        if error_every and i % error_every == 0:
+            test_logger.error(f"message {i:04d}")
+        else:
+            test_logger.info(f"message {i:04d}")
+
+def message_numbers(records) -> list:
+    return [int(record.rsplit(" ", 1)[1]) for record in records]
+
+def read_all(query=None, limit: int = 7, cursor=None) -> list:
+    """按页读取全部日志"""
+    records = []
+    while True:
+        page, cursor = read_logs(limit, cursor, query)
+        assert len(page) <= limit
+        records += page
+        if cursor is None:
+            return records
+
+def test_pages_cover_rotated_files_newest_first(log_file):
+    write_records(log_file, 0, 300)
+    files = log_reader.get_log_files()
+    assert len(files) == BACKUP_COUNT + 1
+
+    numbers = message_numbers(read_all())
+    assert numbers[0] == 299
+    assert numbers == list(range(299, 299 - len(numbers), -1))
+    # 与文件中实际保留的记录一致
+    kept = sum(path.read_text(encoding="utf-8").count("\n") for path in files)
+    assert len(numbers) == kept
+
+def test_cursor_survives_rotation(log_file):
+    write_records(log_file, 0, 50)
+    page, cursor = read_logs(10)
+    assert message_numbers(page) == list(range(49, 39, -1))
+
+    # 轮转一次，游标所在的文件被改名为 app.log.1
+    write_records(log_file, 50, 40)
+    assert log_reader.get_log_files()[1].name == "app.log.1"
+    page, _ = read_logs(10, cursor)
+    assert message_numbers(page) == list(range(39, 29, -1))
+
+def test_filtered_reads_match_full_scan(log_file):
+    write_records(log_file, 0, 200, error_every=7)
+    query = LogQuery(levels={"ERROR"})
+
+    numbers = message_numbers(read_all(query, limit=4))
+    expected = [n for n in message_numbers(read_all()) if n % 7 == 0]
+    assert numbers == expected
+    assert numbers
+
+def test_index_is_pruned_on_rollover(log_file, tmp_path):
+    write_records(log_file, 0, 500)
+    valid_ids = {get_stat_id(os.stat(path)) for path in log_reader.get_log_files()}
+    blocks = load_blocks(tmp_path / "app.log.idx")
+    assert blocks
+    assert {block["f"] for block in blocks} <= valid_ids
+
+def test_follower_holds_multiline_record_until_complete(log_file, monkeypatch):
+    monkeypatch.setattr(log_stream, "RECORD_FLUSH_DELAY", 3600)
+    follower = log_stream.LogFollower()
+    follower._open(False)
+    try:
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            log_file.exception("message 0000")
+        # 异常堆栈可能还有后续的行，暂不输出
+        assert follower._poll() == []
+
+        log_file.info("message 0001")
+        records = follower._poll()
+        assert len(records) == 1
+        assert records[0].level == "ERROR"
+        assert "ValueError: boom" in records[0].text
+
+        # 文件轮转时输出暂存的最后一条记录
+        write_records(log_file, 2, 60)
+        numbers = [int(record.text.rsplit(" ", 1)[1]) for record in follower._poll()]
+        assert numbers[0] == 1
+    finally:
+        follower._close()
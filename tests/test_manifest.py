@@ -0,0 +1,112 @@
+"""相册清单测试"""
+
+import asyncio
+import base64
+
+import pytest
+
+from app.core.config import format_folder_name
+from app.models.request import FileBase64, UploadRequest
+from app.scheduler.tasks import record_album_stage
+from app.services.album_index import album_index
+from app.services.manifest_service import (
+    MANIFEST_NAME, build_manifest, get_album_dir, read_manifest, update_manifest_state, write_manifest
+)
+from app.services.upload_service import process_upload
+
+DEVICE = "deviceA"
+
+def make_request(timestamp: int, title: str, images: int = 2) -> UploadRequest:
+    return UploadRequest(
+        device_name=DEVICE,
+        timestamp=timestamp,
+        title=title,
+        content=f"{title} 正文",
+        files=[
+            FileBase64(filename=f"{i}.jpg", data=base64.b64encode(f"{title}-{i}".encode()).decode())
+            for i in range(images)
+        ],
+    )
+
+def create_album(timestamp: int, album_id: str = "a1") -> dict:
+    album_dir = get_album_dir(DEVICE, timestamp)
+    (album_dir / "imgs").mkdir(parents=True)
+    manifest = build_manifest(DEVICE, timestamp, "标题", "正文", [], album_id)
+    write_manifest(album_dir, manifest)
+    return manifest
+
+@pytest.mark.asyncio
+async def test_concurrent_updates_keep_every_field():
+    timestamp = 1700000001
+    create_album(timestamp)
+
+    results = await asyncio.gather(*(
+        update_manifest_state(DEVICE, timestamp, "pushed", **{f"field_{i}": i}) for i in range(50)
+    ))
+    assert all(result is not None for result in results)
+
+    album_dir = get_album_dir(DEVICE, timestamp)
+    state = read_manifest(album_dir)["state"]
+    assert state["stage"] == "pushed"
+    assert all(state[f"field_{i}"] == i for i in range(50))
+    assert [p.name for p in album_dir.iterdir() if p.name.endswith(".tmp")] == []
+
+@pytest.mark.asyncio
+async def test_update_ignores_other_album():
+    timestamp = 1700000002
+    create_album(timestamp, "a1")
+
+    assert await update_manifest_state(DEVICE, timestamp, "pushed", album_id="old") is None
+    assert read_manifest(get_album_dir(DEVICE, timestamp))["state"]["stage"] == "stored"
+
+    manifest = await update_manifest_state(DEVICE, timestamp, "pushed", album_id="a1")
+    assert manifest["state"]["stage"] == "pushed"
+    # 升级前创建的任务没有 album_id，不做检查
+    assert await update_manifest_state(DEVICE, timestamp, "scanned") is not None
+
+@pytest.mark.asyncio
+async def test_missing_album_returns_none():
+    assert await update_manifest_state(DEVICE, 1700000003, "pushed") is None
+
+@pytest.mark.asyncio
+async def test_reupload_is_not_updated_by_stale_tasks():
+    timestamp = 1700000004
+    first = await process_upload(make_request(timestamp, "旧相册"))
+    second = await process_upload(make_request(timestamp, "新相册", images=3))
+    assert first["album_id"] != second["album_id"]
+
+    await record_album_stage(DEVICE, timestamp, "pushed", album_id=first["album_id"])
+
+    manifest = read_manifest(get_album_dir(DEVICE, timestamp))
+    assert manifest["album_id"] == second["album_id"]
+    assert manifest["title"] == "新相册"
+    assert len(manifest["files"]) == 3
+    assert manifest["state"]["stage"] == "stored"
+    album = await album_index.get_album(DEVICE, format_folder_name(timestamp))
+    assert album["status"] == "stored"
+    assert len(album["files"]) == 3
+
+    await record_album_stage(DEVICE, timestamp, "pushed", album_id=second["album_id"])
+    assert read_manifest(get_album_dir(DEVICE, timestamp))["state"]["stage"] == "pushed"
+    album = await album_index.get_album(DEVICE, format_folder_name(timestamp))
+    assert album["status"] == "pushed"
+
+@pytest.mark.asyncio
+async def test_stale_updates_during_reupload():
+    """旧相册的状态更新与重复上传并发执行时，新相册的清单始终完整且不带旧相册的状态"""
+    timestamp = 1700000005
+    first = await process_upload(make_request(timestamp, "旧相册"))
+
+    results = await asyncio.gather(
+        process_upload(make_request(timestamp, "新相册")),
+        *(update_manifest_state(DEVICE, timestamp, "pushed", album_id=first["album_id"], stale=True)
+          for _ in range(20)),
+    )
+    second = results[0]
+
+    album_dir = get_album_dir(DEVICE, timestamp)
+    manifest = read_manifest(album_dir)
+    assert manifest["album_id"] == second["album_id"]
+    assert manifest["state"]["stage"] == "stored"
+    assert "stale" not in manifest["state"]
+    assert (album_dir / MANIFEST_NAME).exists()
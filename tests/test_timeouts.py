@@ -0,0 +1,103 @@
+"""ADB命令超时估计测试"""
+
+import asyncio
+
+import pytest
+
+from app.core.config import Settings
+from app.device.adb import adb
+from app.device.timeouts import (
+    DEFAULT_COMMAND_LATENCY, MIN_SAMPLES, CommandTimeouts, command_timeouts, describe_command, percentile
+)
+
+@pytest.fixture(autouse=True)
+def timeout_settings(monkeypatch):
+    monkeypatch.setattr(Settings, "ADB_TIMEOUT_DEFAULT", 30.0)
+    monkeypatch.setattr(Settings, "ADB_TIMEOUT_MIN", 1.0)
+    monkeypatch.setattr(Settings, "ADB_TIMEOUT_MAX", 600.0)
+    monkeypatch.setattr(Settings, "ADB_TIMEOUT_MULTIPLIER", 3.0)
+    monkeypatch.setattr(Settings, "ADB_TIMEOUT_PERCENTILE", 100.0)
+    monkeypatch.setattr(Settings, "ADB_PUSH_MIN_THROUGHPUT", 1024 * 1024)
+    monkeypatch.setattr(Settings, "ADB_THROUGHPUT_EWMA_ALPHA", 0.5)
+
+def test_percentile_interpolates():
+    assert percentile([], 50) == 0.0
+    assert percentile([3, 1, 2], 50) == 2
+    assert percentile([0, 10], 25) == 2.5
+
+def test_describe_command(tmp_path):
+    a, b = tmp_path / "a.jpg", tmp_path / "b.jpg"
+    a.write_bytes(b"x" * 100)
+    b.write_bytes(b"x" * 50)
+
+    assert describe_command(["adb", "devices"]) == ("", "devices", 0)
+    assert describe_command(["adb", "connect", "10.0.0.2:5555"]) == ("10.0.0.2:5555", "connect", 0)
+    assert describe_command(["adb", "-s", "d1", "shell", "/system/bin/mkdir -p /sdcard/x"]) == ("d1", "shell:mkdir", 0)
+    assert describe_command(["adb", "-s", "d1", "push", "-z", "brotli", str(a), str(b), "/sdcard/x/"]) == ("d1", "push", 150)
+
+def test_estimate_uses_default_until_enough_samples():
+    timeouts = CommandTimeouts()
+    for _ in range(MIN_SAMPLES - 1):
+        timeouts.record("d1", "shell:mkdir", 2.0)
+    assert timeouts.estimate("d1", "shell:mkdir") == 30.0
+
+    timeouts.record("d1", "shell:mkdir", 2.0)
+    assert timeouts.estimate("d1", "shell:mkdir") == 6.0
+    # 其他设备和其他命令类别不受影响
+    assert timeouts.estimate("d2", "shell:mkdir") == 30.0
+    assert timeouts.estimate("d1", "shell:dumpsys") == 30.0
+
+def test_estimate_is_clamped():
+    timeouts = CommandTimeouts()
+    for _ in range(MIN_SAMPLES):
+        timeouts.record("d1", "shell:true", 0.01)
+        timeouts.record("d1", "shell:dumpsys", 1000.0)
+    assert timeouts.estimate("d1", "shell:true") == Settings.ADB_TIMEOUT_MIN
+    assert timeouts.estimate("d1", "shell:dumpsys") == Settings.ADB_TIMEOUT_MAX
+
+def test_push_without_throughput_uses_minimum_bandwidth():
+    timeouts = CommandTimeouts()
+    assert timeouts.estimate("d1", "push", 1024 * 1024) == 30.0
+    assert timeouts.estimate("d1", "push", 100 * 1024 * 1024) == 100.0
+
+def test_push_uses_fastest_shell_latency():
+    timeouts = CommandTimeouts()
+    timeouts.record("d1", "push", 2.0, 4 * 1024 * 1024)
+    assert timeouts.throughput["d1"] == 2 * 1024 * 1024
+    assert timeouts.estimate("d1", "push", 2 * 1024 * 1024) == pytest.approx(3 * (DEFAULT_COMMAND_LATENCY + 1))
+
+    for _ in range(MIN_SAMPLES):
+        timeouts.record("d1", "shell:mkdir", 0.5)
+        timeouts.record("d1", "shell:dumpsys", 8.0)
+    assert timeouts.estimate("d1", "push", 2 * 1024 * 1024) == pytest.approx(3 * (0.5 + 1))
+
+def test_throughput_ewma_and_timed_out_push():
+    timeouts = CommandTimeouts()
+    timeouts.record("d1", "push", 1.0, 1024 * 1024)
+    # 小文件主要受命令延迟影响，不计入吞吐量
+    timeouts.record("d1", "push", 10.0, 1024)
+    assert timeouts.throughput["d1"] == 1024 * 1024
+
+    # 超时的推送按超时时长计入，估计向下调整
+    timeouts.record("d1", "push", 4.0, 1024 * 1024, timed_out=True)
+    assert timeouts.throughput["d1"] == pytest.approx(0.5 * 256 * 1024 + 0.5 * 1024 * 1024)
+
+def test_snapshot_lists_latency_per_class():
+    timeouts = CommandTimeouts()
+    for _ in range(MIN_SAMPLES):
+        timeouts.record("d1", "shell:mkdir", 0.5)
+    timeouts.record("d1", "shell:rm", 0.5)
+    assert timeouts.snapshot() == {"d1": {"throughput": None, "latency": {"shell:mkdir": 0.5}}}
+
+@pytest.mark.asyncio
+async def test_queue_time_is_not_recorded(fake_adb, monkeypatch):
+    """排队等待设备信号量的时间不计入命令耗时"""
+    monkeypatch.setattr(Settings, "ADB_MAX_INFLIGHT_PER_DEVICE", 1)
+    fake_adb.add_device(serial="emulator-5554", latency=0.3)
+
+    await asyncio.gather(*(
+        adb.execute_device_command_async("emulator-5554", ["shell", "true"]) for _ in range(3)
+    ))
+    samples = list(command_timeouts.samples[("emulator-5554", "shell:true")])
+    assert len(samples) == 3
+    assert max(samples) < 0.6